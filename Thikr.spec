@@ -13,6 +13,7 @@ a = Analysis(
         'PyQt6.QtGui', 
         'PyQt6.QtWidgets',
         'PyQt6.sip',
+        'tzdata',  # zoneinfo loads it by name for IANA time zones
     ],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# The modules live at the repository root; thikr_core picks its data
+# directory (and debug log) from APPDATA at import, so point it at a
+# scratch directory before any test imports it
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ['APPDATA'] = tempfile.mkdtemp(prefix='thikr-tests-')
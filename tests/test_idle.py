@@ -0,0 +1,120 @@
+"""Idle deferral on a virtual clock: FakeIdleDetector stands in for the
+keyboard and mouse, thikr_sim (or a bare ReminderService) for the app."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from thikr_core import get_app_timezone
+from thikr_idle import FakeIdleDetector
+from thikr_reminders import ReminderService
+from thikr_sim import DEFAULT_SETTINGS, SimulatedSettings, VirtualClock, simulate
+
+TZ = get_app_timezone('UTC+3')
+START = datetime(2026, 3, 2, 0, 0, tzinfo=TZ)
+AWAY_AT = START + timedelta(hours=10)
+AWAY_FOR = 3 * 3600
+BACK_AT = AWAY_AT + timedelta(seconds=AWAY_FOR)
+# Half-hourly thikr only; sessions and surahs would add popups of their own
+OVERRIDES = {'reminder.interval_minutes': 30, 'morning_evening.enabled': False,
+             'surah_reminder.enabled': False}
+
+
+def _run(catch_up='one', threshold_minutes=5):
+    overrides = dict(OVERRIDES, **{'reminder.catch_up': catch_up,
+                                   'reminder.idle.threshold_minutes': threshold_minutes})
+    return simulate(overrides=overrides, days=1, start=START, away=[(AWAY_AT, AWAY_FOR)])
+
+
+def _reminders(timeline, lo, hi):
+    return [e for e in timeline if e.kind == 'reminder' and lo <= e.time < hi]
+
+
+def test_nothing_is_shown_while_away():
+    timeline = _run()
+    threshold = timedelta(minutes=5)
+    assert _reminders(timeline, AWAY_AT + threshold, BACK_AT) == []
+    # Before and after the absence the half-hourly rhythm is untouched
+    assert len(_reminders(timeline, START + timedelta(hours=8), AWAY_AT)) == 4
+
+
+@pytest.mark.parametrize('catch_up, detail', [('one', 'thikr'), ('digest', 'digest:6')])
+def test_held_reminders_come_back_as_one(catch_up, detail):
+    timeline = _run(catch_up)
+    returned = _reminders(timeline, BACK_AT, BACK_AT + timedelta(minutes=1))
+    # 10:30 .. 13:00 came due while away: six slots, merged into one popup
+    assert [e.detail for e in returned] == [detail]
+    # The next one counts from that popup, not from the held slots
+    following = _reminders(timeline, BACK_AT + timedelta(minutes=1), BACK_AT + timedelta(minutes=61))
+    assert len(following) == 2
+    assert following[0].time - returned[0].time == timedelta(minutes=30)
+
+
+def test_idle_detection_off_shows_everything():
+    timeline = _run(threshold_minutes=0)
+    assert len(_reminders(timeline, AWAY_AT, BACK_AT)) == 6
+
+
+def test_counters_count_only_popups_that_were_seen():
+    timeline = _run()
+    counters = [e for e in timeline if e.kind == 'counter']
+    assert len(counters) == len([e for e in timeline if e.kind == 'reminder'])
+    # Nothing was counted for the slots missed while away
+    during = [e.detail for e in counters if AWAY_AT + timedelta(minutes=5) <= e.time < BACK_AT]
+    assert during == []
+    daily, total = counters[-1].detail
+    assert daily == total == len(counters)
+
+
+def _service():
+    clock = VirtualClock(START.timestamp())
+    settings = SimulatedSettings(DEFAULT_SETTINGS, clock.time)
+    settings.set('reminder.interval_minutes', 30)
+    idle = FakeIdleDetector(clock.time)
+    shown = []
+    service = ReminderService(settings, idle, lambda data, is_surah: shown.append(data),
+                              clock=clock.monotonic, wall_clock=clock.time)
+    service.first_run = False
+    return service, clock, idle, shown
+
+
+def _advance(service, clock, idle, seconds, present=True):
+    """Move the clock to `seconds` later, dispatching what falls due on the way"""
+    end = clock.wall + seconds
+    while True:
+        deadline = service.scheduler.next_deadline()
+        step = min(end - clock.wall, max(0, deadline - clock.mono)) if deadline is not None else end - clock.wall
+        clock.advance(step)
+        if present:
+            idle.touch()
+        service.scheduler.run_pending()
+        if clock.wall >= end:
+            return
+
+
+def test_snooze_waits_for_the_user():
+    service, clock, idle, shown = _service()
+    service.start()
+    service.queue_snooze({'text': 'snoozed'}, False, 10)
+    _advance(service, clock, idle, 5 * 60)
+    assert {'text': 'snoozed'} not in shown
+    # Away when the snooze runs out: held until there is input again
+    _advance(service, clock, idle, 20 * 60, present=False)
+    assert {'text': 'snoozed'} not in shown
+    assert idle.is_away(5 * 60)
+    _advance(service, clock, idle, 60)
+    assert shown.count({'text': 'snoozed'}) == 1
+
+
+def test_fake_detector():
+    clock = VirtualClock(0)
+    idle = FakeIdleDetector(clock.time)
+    clock.advance(299)
+    assert not idle.is_away(300)
+    clock.advance(1)
+    assert idle.is_away(300)
+    assert not idle.is_away(0)
+    idle.touch()
+    assert idle.idle_seconds() == 0
+    idle.idle_for(600)
+    assert idle.is_away(300)
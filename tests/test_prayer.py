@@ -0,0 +1,84 @@
+"""Prayer times against published timetables, one case per method.
+
+Expected times are local wall-clock minutes as printed in the usual
+timetables for that city and method. Tables round differently and some
+add a precautionary minute, so each time may be off by TOLERANCE.
+"""
+
+import math
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from thikr_prayer import PRAYER_METHOD_PARAMS, PrayerTimes, sun_position
+
+TOLERANCE = timedelta(minutes=2)
+
+# (city, latitude, longitude, method, asr factor, UTC offset, date,
+#  {column: 'HH:MM'})
+PUBLISHED = [
+    ('Makkah', 21.4225, 39.8262, 'Makkah', 1, 3, date(2024, 1, 1),
+     {'fajr': '05:38', 'sunrise': '06:58', 'dhuhr': '12:25', 'asr': '15:29',
+      'maghrib': '17:51', 'isha': '19:21'}),
+    ('London', 51.5074, -0.1278, 'MWL', 1, 0, date(2024, 1, 1),
+     {'fajr': '06:03', 'sunrise': '08:06', 'dhuhr': '12:04', 'asr': '13:45',
+      'maghrib': '16:02', 'isha': '17:59'}),
+    ('New York', 40.7128, -74.0060, 'ISNA', 1, -4, date(2024, 6, 21),
+     {'fajr': '03:46', 'sunrise': '05:25', 'dhuhr': '12:58', 'asr': '16:58',
+      'maghrib': '20:31', 'isha': '22:11'}),
+    ('Cairo', 30.0444, 31.2357, 'Egypt', 1, 3, date(2024, 6, 21),
+     {'fajr': '04:08', 'sunrise': '05:54', 'dhuhr': '12:57', 'asr': '16:32',
+      'maghrib': '19:59', 'isha': '21:33'}),
+    ('Karachi', 24.8607, 67.0011, 'Karachi', 2, 5, date(2024, 1, 1),
+     {'fajr': '05:55', 'sunrise': '07:17', 'dhuhr': '12:35', 'asr': '16:18',
+      'maghrib': '17:54', 'isha': '19:15'}),
+    ('Karachi', 24.8607, 67.0011, 'Karachi', 1, 5, date(2024, 1, 1),
+     {'asr': '15:34'}),
+]
+
+
+def _local(epoch, offset):
+    return datetime.fromtimestamp(epoch, timezone(timedelta(hours=offset)))
+
+
+@pytest.mark.parametrize('city, lat, lon, method, asr_factor, offset, day, expected', PUBLISHED,
+                         ids=[f"{case[0]}-{case[3]}-asr{case[4]}" for case in PUBLISHED])
+def test_matches_published_timetable(tmp_path, city, lat, lon, method, asr_factor, offset, day, expected):
+    times = PrayerTimes(lat, lon, method, asr_factor, cache_dir=tmp_path).times_on(day)
+    for column, hhmm in expected.items():
+        want = datetime.combine(day, datetime.strptime(hhmm, '%H:%M').time(),
+                                tzinfo=timezone(timedelta(hours=offset)))
+        got = _local(times[column], offset)
+        assert abs(got - want) <= TOLERANCE, f"{city} {column}: {got:%H:%M}, published {hhmm}"
+
+
+def test_hanafi_asr_is_later(tmp_path):
+    shafii = PrayerTimes(24.8607, 67.0011, 'Karachi', 1, cache_dir=tmp_path).times_on(date(2024, 1, 1))
+    hanafi = PrayerTimes(24.8607, 67.0011, 'Karachi', 2, cache_dir=tmp_path).times_on(date(2024, 1, 1))
+    assert hanafi['asr'] - shafii['asr'] > 30 * 60
+    assert {k: v for k, v in hanafi.items() if k != 'asr'} == {k: v for k, v in shafii.items() if k != 'asr'}
+
+
+def _altitude(epoch, lat, lon):
+    """Sun altitude in degrees at `epoch`, straight from the solar position"""
+    jd = epoch / 86400 + 2440587.5
+    decl, eqt = sun_position(jd)
+    hour = (epoch % 86400) / 3600
+    hour_angle = math.radians((hour + lon / 15 + eqt - 12) * 15)
+    lat, decl = math.radians(lat), math.radians(decl)
+    return math.degrees(math.asin(math.sin(lat) * math.sin(decl)
+                                  + math.cos(lat) * math.cos(decl) * math.cos(hour_angle)))
+
+
+@pytest.mark.parametrize('method', sorted(PRAYER_METHOD_PARAMS))
+def test_twilight_angles(tmp_path, method):
+    """Fajr (and angle-based Isha) is when the sun is the method's angle below
+    the horizon; a minute of rounding is a quarter degree at most"""
+    lat, lon, day = 21.4225, 39.8262, date(2024, 3, 20)
+    fajr_angle, isha = PRAYER_METHOD_PARAMS[method]
+    times = PrayerTimes(lat, lon, method, cache_dir=tmp_path).times_on(day)
+    assert _altitude(times['fajr'], lat, lon) == pytest.approx(-fajr_angle, abs=0.3)
+    if isinstance(isha, int):
+        assert times['isha'] - times['maghrib'] == isha * 60
+    else:
+        assert _altitude(times['isha'], lat, lon) == pytest.approx(-isha, abs=0.3)
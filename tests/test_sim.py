@@ -0,0 +1,25 @@
+"""Whole days of the reminder service replayed by thikr_sim."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from thikr_core import get_app_timezone
+from thikr_sim import simulate
+
+START = datetime(2026, 3, 2, 0, 0, tzinfo=get_app_timezone('UTC+3'))
+
+
+@pytest.mark.parametrize('catch_up', ['drop', 'one', 'digest'])
+def test_min_gap_is_not_missed_time(catch_up):
+    # Slots coalesced into the min_gap are held back, not missed: the user
+    # was present all day, so nothing is dropped or digested
+    overrides = {'reminder.interval_minutes': 5, 'reminder.min_gap_minutes': 30,
+                 'reminder.catch_up': catch_up, 'morning_evening.enabled': False,
+                 'surah_reminder.enabled': False}
+    timeline = simulate(overrides=overrides, days=1, start=START)
+    reminders = [e for e in timeline if e.kind == 'reminder']
+    assert [e.detail for e in reminders] == ['thikr'] * len(reminders)
+    assert len(reminders) == 48
+    gaps = {b.time - a.time for a, b in zip(reminders, reminders[1:])}
+    assert gaps == {timedelta(minutes=30)}
@@ -12,42 +12,33 @@ Thikr - Islamic Remembrance Reminder
 
 import sys
 import os
-import json
-import random
-import time
 import subprocess
 import winsound
 import threading
-from datetime import datetime, timedelta, timezone
+import time
 from pathlib import Path
 import winreg
 import tempfile
 import atexit
 import msvcrt
+from datetime import datetime
 
-# Timezone support
-try:
-    from zoneinfo import ZoneInfo
-except ImportError:
-    # Fallback for Python < 3.9
-    try:
-        from backports.zoneinfo import ZoneInfo
-    except ImportError:
-        # If no timezone library available, create a simple UTC offset class
-        class ZoneInfo:
-            def __init__(self, tz_string):
-                # Simple UTC+3 implementation as fallback
-                self.offset = timedelta(hours=3)
-                self.name = tz_string
+from thikr_cli import CLI_COMMANDS
 
-            def utcoffset(self, dt):
-                return self.offset
+# Headless subcommands (config / stats / athkar / backup) must not pay for Qt,
+# take the single-instance lock, or run the GUI start-up side effects
+if __name__ == "__main__" and len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+    from thikr_cli import main as cli_main
+    sys.exit(cli_main(sys.argv[1:]))
 
-            def tzname(self, dt):
-                return self.name
-
-            def dst(self, dt):
-                return timedelta(0)
+from thikr_reminders import ReminderService
+from thikr_scheduler import PeriodicTasks
+from thikr_idle import get_idle_detector
+from thikr_core import (
+    APP_VERSION, THEMES, DEFAULT_ATHKAR, MORNING_ATHKAR, EVENING_ATHKAR,
+    SettingsManager, ensure_data_directory, clear_old_logs, log_debug,
+    get_now, get_app_timezone,
+)
 
 # ============================================
 # Single Instance Lock (Robust - handles stale locks)
@@ -141,15 +132,15 @@ def release_lock():
 try:
     from PyQt6.QtWidgets import (
         QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-        QLabel, QPushButton, QSlider, QComboBox, QSpinBox, QCheckBox,
+        QLabel, QPushButton, QSlider, QComboBox, QSpinBox, QDoubleSpinBox, QCheckBox,
         QTabWidget, QGroupBox, QFrame, QLineEdit,
         QListWidget, QSystemTrayIcon,
         QMenu, QMessageBox, QTimeEdit, QProgressBar,
-        QGraphicsDropShadowEffect
+        QGraphicsDropShadowEffect, QFileDialog, QScrollArea
     )
     from PyQt6.QtCore import (
         Qt, QTimer, QPropertyAnimation, QEasingCurve,
-        QThread, pyqtSignal, QTime, QObject
+        QThread, pyqtSignal, QTime, QObject, QFileSystemWatcher
     )
     from PyQt6.QtGui import (
         QFont, QColor, QIcon, QPixmap, QPainter, QBrush,
@@ -169,118 +160,6 @@ except ImportError as e:
     sys.exit(1)
 
 
-# ============================================
-# الثوابت والمسارات
-# ============================================
-
-def get_base_path():
-    """الحصول على المسار الأساسي للتطبيق - يدعم التجميع والتطوير"""
-    if getattr(sys, 'frozen', False):
-        # تشغيل من ملف مجمّع (PyInstaller)
-        return Path(sys.executable).parent
-    return Path(__file__).parent.resolve()
-
-def get_appdata_path():
-    """الحصول على مسار AppData لحفظ بيانات المستخدم"""
-    # استخدام متغير البيئة APPDATA (أكثر موثوقية)
-    appdata = os.environ.get('APPDATA')
-    if appdata:
-        return Path(appdata) / "Thikr"
-    
-    # Fallback: استخدام مجلد المستخدم
-    try:
-        return Path.home() / "AppData" / "Roaming" / "Thikr"
-    except Exception:
-        # Fallback نهائي: المجلد الحالي
-        return get_base_path() / "data"
-
-APP_NAME = "ذِكْر"
-APP_VERSION = "1.0.0"
-APP_DIR = get_base_path()
-
-# بيانات المستخدم في AppData (تبقى عند تحديث التطبيق)
-DATA_DIR = get_appdata_path()
-
-# لا نحتاج مجلد sounds منفصل في النسخة المجمّعة
-SOUNDS_DIR = APP_DIR / "sounds"
-
-# إنشاء مجلد البيانات مع معالجة الأخطاء
-def ensure_data_directory():
-    """التأكد من وجود مجلد البيانات"""
-    try:
-        DATA_DIR.mkdir(parents=True, exist_ok=True)
-        return True
-    except PermissionError:
-        print(f"تحذير: لا يمكن إنشاء مجلد البيانات في {DATA_DIR}")
-        return False
-    except Exception as e:
-        print(f"خطأ غير متوقع: {e}")
-        return False
-
-# إنشاء المجلدات عند بدء التشغيل
-ensure_data_directory()
-
-
-# ============================================
-# Simple Debug Logging (for troubleshooting)
-# ============================================
-
-LOG_FILE = DATA_DIR / "thikr_debug.log"
-DEBUG_ENABLED = True  # Set to False to disable logging
-
-def log_debug(message):
-    """Write debug message to log file"""
-    if not DEBUG_ENABLED:
-        return
-    try:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(LOG_FILE, 'a', encoding='utf-8') as f:
-            f.write(f"[{timestamp}] {message}\n")
-    except:
-        pass
-
-def clear_old_logs():
-    """Clear log file if it gets too large (>1MB)"""
-    try:
-        if LOG_FILE.exists() and LOG_FILE.stat().st_size > 1024 * 1024:
-            LOG_FILE.unlink()
-    except:
-        pass
-
-# Clear old logs on startup
-clear_old_logs()
-log_debug("=" * 50)
-log_debug("App starting...")
-
-
-# ============================================
-# Timezone Helper Functions
-# ============================================
-
-def get_app_timezone(tz_string="UTC+3"):
-    """Get the application timezone (default UTC+3)"""
-    try:
-        # Try to parse custom UTC offset format
-        if tz_string.startswith("UTC"):
-            offset_str = tz_string[3:]  # Remove 'UTC' prefix
-            if offset_str:
-                sign = 1 if offset_str[0] == '+' else -1
-                hours = int(offset_str[1:]) if len(offset_str) > 1 else 0
-                offset = timedelta(hours=sign * hours)
-                return timezone(offset, name=tz_string)
-        # For standard timezone names, use ZoneInfo
-        return ZoneInfo(tz_string)
-    except:
-        # Fallback to UTC+3
-        return timezone(timedelta(hours=3), name="UTC+3")
-
-
-def get_now(tz_string="UTC+3"):
-    """Get current datetime with timezone awareness"""
-    tz = get_app_timezone(tz_string)
-    return datetime.now(tz)
-
-
 # ============================================
 # وظائف التشغيل التلقائي (Windows Registry)
 # ============================================
@@ -556,340 +435,6 @@ def verify_and_fix_autostart_path():
         log_debug(f"verify_and_fix_autostart_path error: {e}")
 
 
-# ============================================
-# الأذكار الافتراضية
-# ============================================
-
-DEFAULT_ATHKAR = [
-    {"id": 1, "text": "سُبْحَانَ اللَّهِ", "category": "تسبيح", "virtue": "من قال سبحان الله مائة مرة غفرت له ذنوبه"},
-    {"id": 2, "text": "الْحَمْدُ لِلَّهِ", "category": "تحميد", "virtue": "الحمد لله تملأ الميزان"},
-    {"id": 3, "text": "لَا إِلَٰهَ إِلَّا اللَّهُ", "category": "تهليل", "virtue": "أفضل ما قلت أنا والنبيون من قبلي"},
-    {"id": 4, "text": "اللَّهُ أَكْبَرُ", "category": "تكبير", "virtue": "كلمة عظيمة ثقيلة في الميزان"},
-    {"id": 5, "text": "سُبْحَانَ اللَّهِ وَبِحَمْدِهِ", "category": "تسبيح", "virtue": "من قالها مائة مرة حين يصبح وحين يمسي لم يأت أحد يوم القيامة بأفضل مما جاء به"},
-    {"id": 6, "text": "سُبْحَانَ اللَّهِ الْعَظِيمِ وَبِحَمْدِهِ", "category": "تسبيح", "virtue": "كلمتان خفيفتان على اللسان ثقيلتان في الميزان حبيبتان إلى الرحمن"},
-    {"id": 7, "text": "لَا حَوْلَ وَلَا قُوَّةَ إِلَّا بِاللَّهِ", "category": "حوقلة", "virtue": "كنز من كنوز الجنة"},
-    {"id": 8, "text": "أَسْتَغْفِرُ اللَّهَ الْعَظِيمَ وَأَتُوبُ إِلَيْهِ", "category": "استغفار", "virtue": "من لزم الاستغفار جعل الله له من كل هم فرجا"},
-    {"id": 9, "text": "اللَّهُمَّ صَلِّ وَسَلِّمْ عَلَى نَبِيِّنَا مُحَمَّدٍ", "category": "صلاة على النبي", "virtue": "من صلى علي صلاة صلى الله عليه بها عشرا"},
-    {"id": 10, "text": "لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "category": "تهليل", "virtue": "من قالها عشر مرات كان كمن أعتق أربعة أنفس من ولد إسماعيل"},
-    {"id": 11, "text": "سُبْحَانَ اللَّهِ، وَالْحَمْدُ لِلَّهِ، وَلَا إِلَٰهَ إِلَّا اللَّهُ، وَاللَّهُ أَكْبَرُ", "category": "الباقيات الصالحات", "virtue": "أحب الكلام إلى الله"},
-    {"id": 12, "text": "رَبِّ اغْفِرْ لِي وَتُبْ عَلَيَّ إِنَّكَ أَنْتَ التَّوَّابُ الرَّحِيمُ", "category": "استغفار", "virtue": "دعاء التوبة"},
-    {"id": 13, "text": "اللَّهُمَّ إِنِّي أَسْأَلُكَ الْعَفْوَ وَالْعَافِيَةَ", "category": "دعاء", "virtue": "ما سُئل الله شيئاً أحب إليه من العافية"},
-    {"id": 14, "text": "حَسْبُنَا اللَّهُ وَنِعْمَ الْوَكِيلُ", "category": "توكل", "virtue": "قالها إبراهيم حين ألقي في النار"},
-    {"id": 15, "text": "يَا حَيُّ يَا قَيُّومُ بِرَحْمَتِكَ أَسْتَغِيثُ", "category": "دعاء", "virtue": "دعاء الكرب"},
-    {"id": 16, "text": "رَبَّنَا آتِنَا فِي الدُّنْيَا حَسَنَةً وَفِي الْآخِرَةِ حَسَنَةً وَقِنَا عَذَابَ النَّارِ", "category": "دعاء قرآني", "virtue": "أكثر دعاء النبي ﷺ"},
-    {"id": 17, "text": "اللَّهُمَّ أَعِنِّي عَلَى ذِكْرِكَ وَشُكْرِكَ وَحُسْنِ عِبَادَتِكَ", "category": "دعاء", "virtue": "وصية النبي ﷺ لمعاذ"},
-    {"id": 18, "text": "رَبِّ زِدْنِي عِلْمًا", "category": "دعاء قرآني", "virtue": "دعاء طلب العلم"},
-    {"id": 19, "text": "بِسْمِ اللَّهِ الَّذِي لَا يَضُرُّ مَعَ اسْمِهِ شَيْءٌ فِي الْأَرْضِ وَلَا فِي السَّمَاءِ وَهُوَ السَّمِيعُ الْعَلِيمُ", "category": "حماية", "virtue": "من قالها ثلاثاً لم تصبه فجأة بلاء"},
-    {"id": 20, "text": "اللَّهُمَّ إِنِّي أَعُوذُ بِكَ مِنَ الْهَمِّ وَالْحَزَنِ", "category": "تعوذ", "virtue": "دعاء الهم والحزن"},
-]
-
-DEFAULT_SURAHS = [
-    {"id": 1, "name": "سورة الإخلاص", "number": 112, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "قُلْ هُوَ اللَّهُ أَحَدٌ", "اللَّهُ الصَّمَدُ", "لَمْ يَلِدْ وَلَمْ يُولَدْ", "وَلَمْ يَكُن لَّهُ كُفُوًا أَحَدٌ"], "virtue": "تعدل ثلث القرآن"},
-    {"id": 2, "name": "سورة الفلق", "number": 113, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "قُلْ أَعُوذُ بِرَبِّ الْفَلَقِ", "مِن شَرِّ مَا خَلَقَ", "وَمِن شَرِّ غَاسِقٍ إِذَا وَقَبَ", "وَمِن شَرِّ النَّفَّاثَاتِ فِي الْعُقَدِ", "وَمِن شَرِّ حَاسِدٍ إِذَا حَسَدَ"], "virtue": "المعوذتان"},
-    {"id": 3, "name": "سورة الناس", "number": 114, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "قُلْ أَعُوذُ بِرَبِّ النَّاسِ", "مَلِكِ النَّاسِ", "إِلَٰهِ النَّاسِ", "مِن شَرِّ الْوَسْوَاسِ الْخَنَّاسِ", "الَّذِي يُوَسْوِسُ فِي صُدُورِ النَّاسِ", "مِنَ الْجِنَّةِ وَالنَّاسِ"], "virtue": "المعوذتان"},
-    {"id": 4, "name": "سورة الفاتحة", "number": 1, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "الْحَمْدُ لِلَّهِ رَبِّ الْعَالَمِينَ", "الرَّحْمَٰنِ الرَّحِيمِ", "مَالِكِ يَوْمِ الدِّينِ", "إِيَّاكَ نَعْبُدُ وَإِيَّاكَ نَسْتَعِينُ", "اهْدِنَا الصِّرَاطَ الْمُسْتَقِيمَ", "صِرَاطَ الَّذِينَ أَنْعَمْتَ عَلَيْهِمْ غَيْرِ الْمَغْضُوبِ عَلَيْهِمْ وَلَا الضَّالِّينَ"], "virtue": "أعظم سورة في القرآن"},
-    {"id": 5, "name": "آية الكرسي", "number": 255, "verses": ["اللَّهُ لَا إِلَٰهَ إِلَّا هُوَ الْحَيُّ الْقَيُّومُ ۚ لَا تَأْخُذُهُ سِنَةٌ وَلَا نَوْمٌ ۚ لَّهُ مَا فِي السَّمَاوَاتِ وَمَا فِي الْأَرْضِ ۗ مَن ذَا الَّذِي يَشْفَعُ عِندَهُ إِلَّا بِإِذْنِهِ ۚ يَعْلَمُ مَا بَيْنَ أَيْدِيهِمْ وَمَا خَلْفَهُمْ ۖ وَلَا يُحِيطُونَ بِشَيْءٍ مِّنْ عِلْمِهِ إِلَّا بِمَا شَاءَ ۚ وَسِعَ كُرْسِيُّهُ السَّمَاوَاتِ وَالْأَرْضَ ۖ وَلَا يَئُودُهُ حِفْظُهُمَا ۚ وَهُوَ الْعَلِيُّ الْعَظِيمُ"], "virtue": "أعظم آية في القرآن"},
-    {"id": 6, "name": "سورة الكوثر", "number": 108, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "إِنَّا أَعْطَيْنَاكَ الْكَوْثَرَ", "فَصَلِّ لِرَبِّكَ وَانْحَرْ", "إِنَّ شَانِئَكَ هُوَ الْأَبْتَرُ"], "virtue": "أقصر سورة في القرآن"},
-    {"id": 7, "name": "سورة العصر", "number": 103, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "وَالْعَصْرِ", "إِنَّ الْإِنسَانَ لَفِي خُسْرٍ", "إِلَّا الَّذِينَ آمَنُوا وَعَمِلُوا الصَّالِحَاتِ وَتَوَاصَوْا بِالْحَقِّ وَتَوَاصَوْا بِالصَّبْرِ"], "virtue": "لو تدبرها الناس لكفتهم"},
-]
-
-# ============================================
-# أذكار الصباح والمساء
-# ============================================
-
-MORNING_ATHKAR = [
-    {"id": 1, "text": "أَصْبَحْنَا وَأَصْبَحَ الْمُلْكُ لِلَّهِ، وَالْحَمْدُ لِلَّهِ، لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "repeat": 1, "virtue": ""},
-    {"id": 2, "text": "اللَّهُمَّ بِكَ أَصْبَحْنَا، وَبِكَ أَمْسَيْنَا، وَبِكَ نَحْيَا، وَبِكَ نَمُوتُ، وَإِلَيْكَ النُّشُورُ", "repeat": 1, "virtue": ""},
-    {"id": 3, "text": "اللَّهُمَّ أَنْتَ رَبِّي لَا إِلَٰهَ إِلَّا أَنْتَ، خَلَقْتَنِي وَأَنَا عَبْدُكَ، وَأَنَا عَلَىٰ عَهْدِكَ وَوَعْدِكَ مَا اسْتَطَعْتُ، أَعُوذُ بِكَ مِنْ شَرِّ مَا صَنَعْتُ، أَبُوءُ لَكَ بِنِعْمَتِكَ عَلَيَّ، وَأَبُوءُ بِذَنْبِي فَاغْفِرْ لِي فَإِنَّهُ لَا يَغْفِرُ الذُّنُوبَ إِلَّا أَنْتَ", "repeat": 1, "virtue": "سيد الاستغفار"},
-    {"id": 4, "text": "اللَّهُمَّ إِنِّي أَصْبَحْتُ أُشْهِدُكَ، وَأُشْهِدُ حَمَلَةَ عَرْشِكَ، وَمَلَائِكَتَكَ، وَجَمِيعَ خَلْقِكَ، أَنَّكَ أَنْتَ اللَّهُ لَا إِلَٰهَ إِلَّا أَنْتَ وَحْدَكَ لَا شَرِيكَ لَكَ، وَأَنَّ مُحَمَّدًا عَبْدُكَ وَرَسُولُكَ", "repeat": 4, "virtue": "من قالها أعتقه الله من النار"},
-    {"id": 5, "text": "اللَّهُمَّ مَا أَصْبَحَ بِي مِنْ نِعْمَةٍ أَوْ بِأَحَدٍ مِنْ خَلْقِكَ فَمِنْكَ وَحْدَكَ لَا شَرِيكَ لَكَ، فَلَكَ الْحَمْدُ وَلَكَ الشُّكْرُ", "repeat": 1, "virtue": "من قالها أدى شكر يومه"},
-    {"id": 6, "text": "اللَّهُمَّ عَافِنِي فِي بَدَنِي، اللَّهُمَّ عَافِنِي فِي سَمْعِي، اللَّهُمَّ عَافِنِي فِي بَصَرِي، لَا إِلَٰهَ إِلَّا أَنْتَ", "repeat": 3, "virtue": ""},
-    {"id": 7, "text": "اللَّهُمَّ إِنِّي أَعُوذُ بِكَ مِنَ الْكُفْرِ، وَالْفَقْرِ، وَأَعُوذُ بِكَ مِنْ عَذَابِ الْقَبْرِ، لَا إِلَٰهَ إِلَّا أَنْتَ", "repeat": 3, "virtue": ""},
-    {"id": 8, "text": "حَسْبِيَ اللَّهُ لَا إِلَٰهَ إِلَّا هُوَ عَلَيْهِ تَوَكَّلْتُ وَهُوَ رَبُّ الْعَرْشِ الْعَظِيمِ", "repeat": 7, "virtue": "من قالها كفاه الله ما أهمه"},
-    {"id": 9, "text": "بِسْمِ اللَّهِ الَّذِي لَا يَضُرُّ مَعَ اسْمِهِ شَيْءٌ فِي الْأَرْضِ وَلَا فِي السَّمَاءِ وَهُوَ السَّمِيعُ الْعَلِيمُ", "repeat": 3, "virtue": "لم يضره شيء"},
-    {"id": 10, "text": "رَضِيتُ بِاللَّهِ رَبًّا، وَبِالْإِسْلَامِ دِينًا، وَبِمُحَمَّدٍ صَلَّى اللَّهُ عَلَيْهِ وَسَلَّمَ نَبِيًّا", "repeat": 3, "virtue": "حق على الله أن يرضيه يوم القيامة"},
-    {"id": 11, "text": "سُبْحَانَ اللَّهِ وَبِحَمْدِهِ", "repeat": 100, "virtue": "حُطت خطاياه وإن كانت مثل زبد البحر"},
-    {"id": 12, "text": "لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ، وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "repeat": 10, "virtue": "كمن أعتق أربع رقاب"},
-    {"id": 13, "text": "اللَّهُمَّ صَلِّ وَسَلِّمْ عَلَى نَبِيِّنَا مُحَمَّدٍ", "repeat": 10, "virtue": "من صلى علي صلاة صلى الله عليه بها عشرا"},
-]
-
-EVENING_ATHKAR = [
-    {"id": 1, "text": "أَمْسَيْنَا وَأَمْسَى الْمُلْكُ لِلَّهِ، وَالْحَمْدُ لِلَّهِ، لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "repeat": 1, "virtue": ""},
-    {"id": 2, "text": "اللَّهُمَّ بِكَ أَمْسَيْنَا، وَبِكَ أَصْبَحْنَا، وَبِكَ نَحْيَا، وَبِكَ نَمُوتُ، وَإِلَيْكَ الْمَصِيرُ", "repeat": 1, "virtue": ""},
-    {"id": 3, "text": "اللَّهُمَّ أَنْتَ رَبِّي لَا إِلَٰهَ إِلَّا أَنْتَ، خَلَقْتَنِي وَأَنَا عَبْدُكَ، وَأَنَا عَلَىٰ عَهْدِكَ وَوَعْدِكَ مَا اسْتَطَعْتُ، أَعُوذُ بِكَ مِنْ شَرِّ مَا صَنَعْتُ، أَبُوءُ لَكَ بِنِعْمَتِكَ عَلَيَّ، وَأَبُوءُ بِذَنْبِي فَاغْفِرْ لِي فَإِنَّهُ لَا يَغْفِرُ الذُّنُوبَ إِلَّا أَنْتَ", "repeat": 1, "virtue": "سيد الاستغفار"},
-    {"id": 4, "text": "اللَّهُمَّ إِنِّي أَمْسَيْتُ أُشْهِدُكَ، وَأُشْهِدُ حَمَلَةَ عَرْشِكَ، وَمَلَائِكَتَكَ، وَجَمِيعَ خَلْقِكَ، أَنَّكَ أَنْتَ اللَّهُ لَا إِلَٰهَ إِلَّا أَنْتَ وَحْدَكَ لَا شَرِيكَ لَكَ، وَأَنَّ مُحَمَّدًا عَبْدُكَ وَرَسُولُكَ", "repeat": 4, "virtue": "من قالها أعتقه الله من النار"},
-    {"id": 5, "text": "اللَّهُمَّ مَا أَمْسَى بِي مِنْ نِعْمَةٍ أَوْ بِأَحَدٍ مِنْ خَلْقِكَ فَمِنْكَ وَحْدَكَ لَا شَرِيكَ لَكَ، فَلَكَ الْحَمْدُ وَلَكَ الشُّكْرُ", "repeat": 1, "virtue": "من قالها أدى شكر ليلته"},
-    {"id": 6, "text": "اللَّهُمَّ عَافِنِي فِي بَدَنِي، اللَّهُمَّ عَافِنِي فِي سَمْعِي، اللَّهُمَّ عَافِنِي فِي بَصَرِي، لَا إِلَٰهَ إِلَّا أَنْتَ", "repeat": 3, "virtue": ""},
-    {"id": 7, "text": "اللَّهُمَّ إِنِّي أَعُوذُ بِكَ مِنَ الْكُفْرِ، وَالْفَقْرِ، وَأَعُوذُ بِكَ مِنْ عَذَابِ الْقَبْرِ، لَا إِلَٰهَ إِلَّا أَنْتَ", "repeat": 3, "virtue": ""},
-    {"id": 8, "text": "حَسْبِيَ اللَّهُ لَا إِلَٰهَ إِلَّا هُوَ عَلَيْهِ تَوَكَّلْتُ وَهُوَ رَبُّ الْعَرْشِ الْعَظِيمِ", "repeat": 7, "virtue": "من قالها كفاه الله ما أهمه"},
-    {"id": 9, "text": "بِسْمِ اللَّهِ الَّذِي لَا يَضُرُّ مَعَ اسْمِهِ شَيْءٌ فِي الْأَرْضِ وَلَا فِي السَّمَاءِ وَهُوَ السَّمِيعُ الْعَلِيمُ", "repeat": 3, "virtue": "لم يضره شيء"},
-    {"id": 10, "text": "رَضِيتُ بِاللَّهِ رَبًّا، وَبِالْإِسْلَامِ دِينًا، وَبِمُحَمَّدٍ صَلَّى اللَّهُ عَلَيْهِ وَسَلَّمَ نَبِيًّا", "repeat": 3, "virtue": "حق على الله أن يرضيه يوم القيامة"},
-    {"id": 11, "text": "أَعُوذُ بِكَلِمَاتِ اللَّهِ التَّامَّاتِ مِنْ شَرِّ مَا خَلَقَ", "repeat": 3, "virtue": "لم يضره شيء تلك الليلة"},
-    {"id": 12, "text": "سُبْحَانَ اللَّهِ وَبِحَمْدِهِ", "repeat": 100, "virtue": "حُطت خطاياه وإن كانت مثل زبد البحر"},
-    {"id": 13, "text": "لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ، وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "repeat": 10, "virtue": "كمن أعتق أربع رقاب"},
-    {"id": 14, "text": "اللَّهُمَّ صَلِّ وَسَلِّمْ عَلَى نَبِيِّنَا مُحَمَّدٍ", "repeat": 10, "virtue": "من صلى علي صلاة صلى الله عليه بها عشرا"},
-]
-
-
-# ============================================
-# الثيمات
-# ============================================
-
-THEMES = {
-    "cyberpunk_dark": {
-        "name": "سايبربنك داكن",
-        "background": "#0a0a0f",
-        "bg_gradient": ["#0a0a0f", "#1a1a2e", "#0f0f1a"],
-        "text": "#00ffff",
-        "accent": "#ff00ff",
-        "secondary": "#00ff88",
-        "border": "#00ffff",
-        "glow": "#00ffff"
-    },
-    "cyberpunk_neon": {
-        "name": "نيون متوهج",
-        "background": "#0d0221",
-        "bg_gradient": ["#0d0221", "#150734", "#0d0221"],
-        "text": "#f72585",
-        "accent": "#7209b7",
-        "secondary": "#4cc9f0",
-        "border": "#f72585",
-        "glow": "#f72585"
-    },
-    "islamic_gold": {
-        "name": "ذهبي إسلامي",
-        "background": "#1a1a2e",
-        "bg_gradient": ["#1a1a2e", "#16213e", "#0f0f23"],
-        "text": "#ffd700",
-        "accent": "#daa520",
-        "secondary": "#f4e4bc",
-        "border": "#ffd700",
-        "glow": "#ffd700"
-    },
-    "ocean_depth": {
-        "name": "أعماق المحيط",
-        "background": "#0c1821",
-        "bg_gradient": ["#0c1821", "#1b2838", "#0c1821"],
-        "text": "#4fc3f7",
-        "accent": "#0288d1",
-        "secondary": "#81d4fa",
-        "border": "#4fc3f7",
-        "glow": "#4fc3f7"
-    },
-    "emerald_night": {
-        "name": "ليل زمردي",
-        "background": "#0a1612",
-        "bg_gradient": ["#0a1612", "#1a2f28", "#0a1612"],
-        "text": "#50fa7b",
-        "accent": "#00d26a",
-        "secondary": "#98fb98",
-        "border": "#50fa7b",
-        "glow": "#50fa7b"
-    },
-    "royal_purple": {
-        "name": "بنفسجي ملكي",
-        "background": "#1a0a2e",
-        "bg_gradient": ["#1a0a2e", "#2d1b4e", "#1a0a2e"],
-        "text": "#bb86fc",
-        "accent": "#9c27b0",
-        "secondary": "#e1bee7",
-        "border": "#bb86fc",
-        "glow": "#bb86fc"
-    },
-    "sunset_warm": {
-        "name": "غروب دافئ",
-        "background": "#1a0f0a",
-        "bg_gradient": ["#1a0f0a", "#2d1810", "#1a0f0a"],
-        "text": "#ff7043",
-        "accent": "#ff5722",
-        "secondary": "#ffab91",
-        "border": "#ff7043",
-        "glow": "#ff7043"
-    },
-    "minimal_light": {
-        "name": "فاتح بسيط",
-        "background": "#f5f5f5",
-        "bg_gradient": ["#ffffff", "#f5f5f5", "#eeeeee"],
-        "text": "#1a1a1a",
-        "accent": "#2196f3",
-        "secondary": "#666666",
-        "border": "#cccccc",
-        "glow": "#2196f3",
-        "is_light": True
-    },
-    "clean_white": {
-        "name": "أبيض نظيف",
-        "background": "#ffffff",
-        "bg_gradient": ["#ffffff", "#fafafa", "#f5f5f5"],
-        "text": "#212121",
-        "accent": "#1976d2",
-        "secondary": "#757575",
-        "border": "#e0e0e0",
-        "glow": "#1976d2",
-        "is_light": True
-    },
-    "soft_cream": {
-        "name": "كريمي ناعم",
-        "background": "#fffef5",
-        "bg_gradient": ["#fffef5", "#faf8f0", "#f5f3eb"],
-        "text": "#3e2723",
-        "accent": "#8d6e63",
-        "secondary": "#6d4c41",
-        "border": "#d7ccc8",
-        "glow": "#8d6e63",
-        "is_light": True
-    },
-    "mint_fresh": {
-        "name": "نعناعي منعش",
-        "background": "#f1f8f6",
-        "bg_gradient": ["#f1f8f6", "#e8f5e9", "#e0f2f1"],
-        "text": "#1b5e20",
-        "accent": "#2e7d32",
-        "secondary": "#4caf50",
-        "border": "#a5d6a7",
-        "glow": "#4caf50",
-        "is_light": True
-    },
-    "sky_blue": {
-        "name": "سماوي صافي",
-        "background": "#f0f8ff",
-        "bg_gradient": ["#f0f8ff", "#e3f2fd", "#e1f5fe"],
-        "text": "#0d47a1",
-        "accent": "#1565c0",
-        "secondary": "#1976d2",
-        "border": "#90caf9",
-        "glow": "#2196f3",
-        "is_light": True
-    },
-    "rose_light": {
-        "name": "وردي فاتح",
-        "background": "#fff5f5",
-        "bg_gradient": ["#fff5f5", "#fce4ec", "#f8bbd9"],
-        "text": "#880e4f",
-        "accent": "#c2185b",
-        "secondary": "#e91e63",
-        "border": "#f48fb1",
-        "glow": "#e91e63",
-        "is_light": True
-    }
-}
-
-
-# ============================================
-# مدير الإعدادات
-# ============================================
-
-class SettingsManager:
-    def __init__(self):
-        self.settings_file = DATA_DIR / "user_settings.json"
-        self.settings = self.load_settings()
-    
-    def load_settings(self):
-        defaults = {
-            "reminder": {
-                "enabled": True,
-                "interval_minutes": 1,  # Default to 1 minute
-                "random_order": True,
-                "show_virtue": True,
-                "quiet_hours": {"enabled": False, "start": "23:00", "end": "06:00"}
-            },
-            "surah_reminder": {
-                "enabled": True,
-                "interval_days": 3,
-                "last_shown": None
-            },
-            "popup": {
-                "theme": "cyberpunk_dark",
-                "position": "bottom_right",
-                "width": 450,
-                "height": 220,
-                "duration_seconds": 8,
-                "font_size": 20,
-                "opacity": 0.95,
-                "border_radius": 15
-            },
-            "sound": {
-                "enabled": True,
-                "volume": 30
-            },
-            "stats": {
-                "daily_count": 0,
-                "total_count": 0,
-                "last_reset": None
-            },
-            "timezone": "UTC+3",  # Default timezone
-            "custom_athkar": [],
-            "first_run_complete": False  # Track if first run setup is done
-        }
-        
-        if self.settings_file.exists():
-            try:
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    saved = json.load(f)
-                    return self._merge(defaults, saved)
-            except:
-                pass
-        return defaults
-    
-    def _merge(self, defaults, saved):
-        result = defaults.copy()
-        for key, value in saved.items():
-            if key in result and isinstance(value, dict) and isinstance(result[key], dict):
-                result[key] = self._merge(result[key], value)
-            else:
-                result[key] = value
-        return result
-    
-    def save(self):
-        try:
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"Error saving: {e}")
-    
-    def get(self, path, default=None):
-        keys = path.split('.')
-        val = self.settings
-        for k in keys:
-            if isinstance(val, dict) and k in val:
-                val = val[k]
-            else:
-                return default
-        return val
-    
-    def set(self, path, value):
-        keys = path.split('.')
-        s = self.settings
-        for k in keys[:-1]:
-            s = s.setdefault(k, {})
-        s[keys[-1]] = value
-        self.save()
-    
-    def get_theme(self):
-        name = self.get('popup.theme', 'cyberpunk_dark')
-        return THEMES.get(name, THEMES['cyberpunk_dark'])
-    
-    def get_random_thikr(self):
-        all_athkar = DEFAULT_ATHKAR + self.get('custom_athkar', [])
-        return random.choice(all_athkar) if all_athkar else DEFAULT_ATHKAR[0]
-    
-    def get_random_surah(self):
-        return random.choice(DEFAULT_SURAHS) if DEFAULT_SURAHS else None
-    
-    def increment_counter(self):
-        tz = self.get('timezone', 'UTC+3')
-        today = get_now(tz).strftime("%Y-%m-%d")
-        if self.get('stats.last_reset') != today:
-            self.set('stats.daily_count', 0)
-            self.set('stats.last_reset', today)
-
-        daily = self.get('stats.daily_count', 0) + 1
-        total = self.get('stats.total_count', 0) + 1
-        self.set('stats.daily_count', daily)
-        self.set('stats.total_count', total)
-        return daily, total
-
-
 # ============================================
 # نافذة الإعداد الأول (First Run)
 # ============================================
@@ -1093,25 +638,48 @@ class FirstRunDialog(QWidget):
 
 class ReminderPopup(QWidget):
     closed = pyqtSignal()
+    snoozed = pyqtSignal(dict, bool)  # The shown item, to come back later
+
+    # Built stylesheets keyed by the (hashable, frozen) popup config
+    _stylesheet_cache = {}
+    PROGRESS_STEPS = 100           # Countdown bar updates per popup
+    LOW_POWER_PROGRESS_STEPS = 20  # ...in low-power mode (each one wakes the CPU)
+
+    @classmethod
+    def invalidate_style_cache(cls, changes=None):
+        cls._stylesheet_cache.clear()
     
     def __init__(self, settings):
         super().__init__(None, Qt.WindowType.FramelessWindowHint | 
                         Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool)
         self.settings = settings
+        self.data, self.is_surah = {}, False
+        # How the popup went away; decides whether it counts as seen
+        self.dismissed = False
+        self.was_snoozed = False
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.setAttribute(Qt.WidgetAttribute.WA_ShowWithoutActivating)
         self.setup_ui()
         
+        low_power = self.settings.config.power.low_power
         self.close_timer = QTimer(self)
+        self.close_timer.setSingleShot(True)
         self.close_timer.timeout.connect(self.start_close)
         
         self.progress_timer = QTimer(self)
         self.progress_timer.timeout.connect(self.update_progress)
         self.progress_value = 100
+        self.progress_step = 100 // (self.LOW_POWER_PROGRESS_STEPS if low_power else self.PROGRESS_STEPS)
+        self.ticks = 0  # Timer wakeups spent on this popup
+        if low_power:
+            # A second either way is invisible for an 8 s popup; the OS can batch the wakeups
+            self.close_timer.setTimerType(Qt.TimerType.VeryCoarseTimer)
+            self.progress_timer.setTimerType(Qt.TimerType.CoarseTimer)
     
     def setup_ui(self):
-        w = self.settings.get('popup.width', 450)
-        h = self.settings.get('popup.height', 220)
+        popup_cfg = self.settings.config.popup
+        w = popup_cfg.width
+        h = popup_cfg.height
         self.setFixedSize(w, h)
         
         self.container = QFrame(self)
@@ -1131,10 +699,19 @@ class ReminderPopup(QWidget):
         self.close_btn.setObjectName("closeBtn")
         self.close_btn.setFixedSize(28, 28)
         self.close_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
-        self.close_btn.clicked.connect(self.start_close)
+        self.close_btn.clicked.connect(self.dismiss)
+
+        snooze_minutes = self.settings.config.reminder.idle.snooze_minutes
+        self.snooze_btn = QPushButton("⏰")
+        self.snooze_btn.setObjectName("snoozeBtn")
+        self.snooze_btn.setFixedSize(28, 28)
+        self.snooze_btn.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.snooze_btn.setToolTip(f"ذكّرني بعد {snooze_minutes} دقيقة")
+        self.snooze_btn.clicked.connect(self.snooze)
         
         header.addWidget(self.title)
         header.addStretch()
+        header.addWidget(self.snooze_btn)
         header.addWidget(self.close_btn)
         
         # Content
@@ -1166,7 +743,7 @@ class ReminderPopup(QWidget):
         self.show_anim = QPropertyAnimation(self, b"windowOpacity")
         self.show_anim.setDuration(300)
         self.show_anim.setStartValue(0.0)
-        self.show_anim.setEndValue(self.settings.get('popup.opacity', 0.95))
+        self.show_anim.setEndValue(popup_cfg.opacity)
         self.show_anim.setEasingCurve(QEasingCurve.Type.OutCubic)
         
         self.hide_anim = QPropertyAnimation(self, b"windowOpacity")
@@ -1176,14 +753,30 @@ class ReminderPopup(QWidget):
         self.hide_anim.finished.connect(self.on_closed)
     
     def apply_theme(self):
-        t = self.settings.get_theme()
-        fs = self.settings.get('popup.font_size', 20)
-        br = self.settings.get('popup.border_radius', 15)
+        popup_cfg = self.settings.config.popup
+        t = THEMES[popup_cfg.theme]
+        stylesheet = self._stylesheet_cache.get(popup_cfg)
+        if stylesheet is None:
+            stylesheet = self._stylesheet_cache[popup_cfg] = self.build_stylesheet(popup_cfg, t)
+        self.setStyleSheet(stylesheet)
+        
+        # Glow effect
+        glow = QGraphicsDropShadowEffect(self)
+        glow.setBlurRadius(25)
+        glow.setColor(QColor(t['glow']))
+        glow.setOffset(0, 0)
+        self.container.setGraphicsEffect(glow)
+
+    @staticmethod
+    def build_stylesheet(popup_cfg, t):
+        fs = popup_cfg.font_size
+        br = popup_cfg.border_radius
+        font = f"font-family: '{popup_cfg.font_family}';" if popup_cfg.font_family else ""
         
         bg = t['bg_gradient']
         gradient = f"qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 {bg[0]}, stop:0.5 {bg[1]}, stop:1 {bg[2]})"
         
-        self.setStyleSheet(f"""
+        return f"""
             #container {{
                 background: {gradient};
                 border: 2px solid {t['border']};
@@ -1194,24 +787,26 @@ class ReminderPopup(QWidget):
                 font-size: 14px;
                 font-weight: bold;
             }}
-            #closeBtn {{
+            #closeBtn, #snoozeBtn {{
                 background: transparent;
                 color: {t['secondary']};
                 border: none;
                 font-size: 16px;
                 border-radius: 14px;
             }}
-            #closeBtn:hover {{
+            #closeBtn:hover, #snoozeBtn:hover {{
                 background: rgba(255,255,255,0.1);
                 color: {t['text']};
             }}
             #thikr {{
                 color: {t['text']};
+                {font}
                 font-size: {fs}px;
                 padding: 10px;
             }}
             #virtue {{
                 color: {t['secondary']};
+                {font}
                 font-size: {fs-4}px;
                 font-style: italic;
             }}
@@ -1224,16 +819,10 @@ class ReminderPopup(QWidget):
                 background: {t['accent']};
                 border-radius: 2px;
             }}
-        """)
-        
-        # Glow effect
-        glow = QGraphicsDropShadowEffect(self)
-        glow.setBlurRadius(25)
-        glow.setColor(QColor(t['glow']))
-        glow.setOffset(0, 0)
-        self.container.setGraphicsEffect(glow)
+        """
     
     def show_thikr(self, data, is_surah=False):
+        self.data, self.is_surah = data, is_surah
         if is_surah:
             self.title.setText(f"📖 {data.get('name', 'سورة')}")
             verses = data.get('verses', [])
@@ -1244,7 +833,7 @@ class ReminderPopup(QWidget):
             self.thikr_label.setText(data.get('text', ''))
             virtue = data.get('virtue', '')
             self.virtue_label.setText(virtue)
-            self.virtue_label.setVisible(bool(virtue) and self.settings.get('reminder.show_virtue', True))
+            self.virtue_label.setVisible(bool(virtue) and self.settings.config.reminder.show_virtue)
         
         self.position_popup()
 
@@ -1260,21 +849,21 @@ class ReminderPopup(QWidget):
             QTimer.singleShot(500, self.ensure_visible)
         except Exception as e:
             log_debug(f"Animation error, forcing visibility: {e}")
-            self.setWindowOpacity(self.settings.get('popup.opacity', 0.95))
+            self.setWindowOpacity(self.settings.config.popup.opacity)
             self.show()
             self.raise_()
 
-        duration = self.settings.get('popup.duration_seconds', 8) * 1000
+        duration = self.settings.config.popup.duration_seconds * 1000
         self.close_timer.start(duration)
         self.progress_value = 100
         self.progress.setValue(100)
-        self.progress_timer.start(duration // 100)
+        self.progress_timer.start(duration * self.progress_step // 100)
 
     def ensure_visible(self):
         """Fallback to ensure popup is visible if animation failed"""
         if self.isVisible() and self.windowOpacity() < 0.1:
             log_debug("Forcing popup visibility (animation may have failed)")
-            self.setWindowOpacity(self.settings.get('popup.opacity', 0.95))
+            self.setWindowOpacity(self.settings.config.popup.opacity)
 
     def position_popup(self):
         try:
@@ -1290,7 +879,7 @@ class ReminderPopup(QWidget):
                 self.move(100, 100)
                 return
 
-            pos = self.settings.get('popup.position', 'bottom_right')
+            pos = self.settings.config.popup.position
             margin = 20
 
             positions = {
@@ -1314,11 +903,21 @@ class ReminderPopup(QWidget):
             self.move(100, 100)
     
     def update_progress(self):
-        self.progress_value -= 1
+        self.ticks += 1
+        self.progress_value -= self.progress_step
         self.progress.setValue(max(0, self.progress_value))
         if self.progress_value <= 0:
             self.progress_timer.stop()
     
+    def dismiss(self):
+        self.dismissed = True
+        self.start_close()
+
+    def snooze(self):
+        self.was_snoozed = True
+        self.snoozed.emit(self.data, self.is_surah)
+        self.start_close()
+
     def start_close(self):
         self.close_timer.stop()
         self.progress_timer.stop()
@@ -1343,148 +942,63 @@ class ReminderPopup(QWidget):
 # ============================================
 
 class ReminderThread(QThread):
+    """Runs a ReminderService on its own thread; the service's callbacks
+    become signals, delivered to the GUI thread through queued connections"""
     show_reminder = pyqtSignal(dict, bool)
+    start_session = pyqtSignal(str)  # 'morning' / 'evening' athkar session is due
     thread_error = pyqtSignal(str)  # Signal for error reporting
     thread_started = pyqtSignal()   # Signal when thread starts successfully
 
-    def __init__(self, settings):
+    def __init__(self, settings, idle=None):
         super().__init__()
-        self.settings = settings
-        self.running = True
-        self.paused = False
-        self.error_count = 0
-        self.max_errors = 5  # Max consecutive errors before giving up
-        self.first_run = True  # Flag for showing reminder sooner on first run
+        self.service = ReminderService(settings, idle, on_reminder=self.show_reminder.emit,
+                                       on_session=self.start_session.emit,
+                                       on_error=self.thread_error.emit)
 
     def run(self):
         log_debug("ReminderThread started")
         self.thread_started.emit()
+        self.service.run()
+        log_debug(f"ReminderThread stopped after {self.service.scheduler.wakeups} wakeups")
 
-        while self.running:
-            try:
-                enabled = self.settings.get('reminder.enabled', True)
-                paused = self.paused
-                quiet = self.is_quiet_time()
-
-                log_debug(f"ReminderThread loop: enabled={enabled}, paused={paused}, quiet={quiet}, first_run={self.first_run}")
-
-                # On first run, show reminder after a short delay (10 seconds)
-                if self.first_run:
-                    self.first_run = False
-                    log_debug("First run - waiting 10 seconds...")
-                    # Wait 10 seconds before first reminder (instead of full interval)
-                    for _ in range(10):
-                        if not self.running:
-                            break
-                        time.sleep(1)
-
-                    if self.running and not paused and enabled:
-                        if not quiet:
-                            thikr = self.settings.get_random_thikr()
-                            log_debug(f"Emitting first reminder: {thikr.get('text', '')[:30]}...")
-                            self.show_reminder.emit(thikr, False)
-                            self.error_count = 0
-                        else:
-                            log_debug("Skipped first reminder - quiet time")
-                    else:
-                        log_debug(f"Skipped first reminder - running={self.running}, paused={paused}, enabled={enabled}")
-                else:
-                    # Normal reminder cycle (not first run)
-                    if not paused and enabled:
-                        if not quiet:
-                            if self.should_show_surah():
-                                surah = self.settings.get_random_surah()
-                                if surah:
-                                    log_debug(f"Emitting surah reminder: {surah.get('name', '')}")
-                                    self.show_reminder.emit(surah, True)
-                                    tz = self.settings.get('timezone', 'UTC+3')
-                                    self.settings.set('surah_reminder.last_shown', get_now(tz).isoformat())
-                            else:
-                                thikr = self.settings.get_random_thikr()
-                                log_debug(f"Emitting thikr reminder: {thikr.get('text', '')[:30]}...")
-                                self.show_reminder.emit(thikr, False)
-                            self.error_count = 0
-                        else:
-                            log_debug("Skipped reminder - quiet time")
-                    else:
-                        log_debug(f"Skipped reminder - paused={paused}, enabled={enabled}")
-
-                # Wait for interval before next reminder
-                interval = self.settings.get('reminder.interval_minutes', 1) * 60
-                log_debug(f"Waiting {interval} seconds until next reminder...")
-                for _ in range(interval):
-                    if not self.running:
-                        break
-                    time.sleep(1)
-
-            except Exception as e:
-                self.error_count += 1
-                error_msg = f"ReminderThread error ({self.error_count}/{self.max_errors}): {str(e)}"
-                self.thread_error.emit(error_msg)
-
-                if self.error_count >= self.max_errors:
-                    # Too many errors - signal for restart
-                    self.thread_error.emit("CRITICAL: Max errors reached, thread needs restart")
-                    break
-
-                # Wait before retrying to avoid rapid error loops
-                time.sleep(5)
-
-    def is_quiet_time(self):
-        try:
-            q = self.settings.get('reminder.quiet_hours', {})
-            if not q.get('enabled'):
-                return False
-
-            tz = self.settings.get('timezone', 'UTC+3')
-            now = get_now(tz).time()
-            start = datetime.strptime(q.get('start', '23:00'), '%H:%M').time()
-            end = datetime.strptime(q.get('end', '06:00'), '%H:%M').time()
+    # The GUI thread's handle on the service (all safe from any thread)
 
-            if start <= end:
-                return start <= now <= end
-            return now >= start or now <= end
-        except:
-            return False  # Default to not quiet time if there's an error
+    @property
+    def paused(self):
+        return self.service.paused
 
-    def should_show_surah(self):
-        try:
-            if not self.settings.get('surah_reminder.enabled', True):
-                return False
+    @property
+    def first_run(self):
+        return self.service.first_run
 
-            last = self.settings.get('surah_reminder.last_shown')
-            if not last:
-                return True
+    @first_run.setter
+    def first_run(self, value):
+        self.service.first_run = value
 
-            last_date = datetime.fromisoformat(last)
-            tz = self.settings.get('timezone', 'UTC+3')
-            now = get_now(tz)
+    def upcoming(self, n=5):
+        return self.service.upcoming(n)
 
-            # Make last_date timezone-aware if it isn't already
-            if last_date.tzinfo is None:
-                tz_obj = get_app_timezone(tz)
-                last_date = last_date.replace(tzinfo=tz_obj)
+    def snooze(self, data, is_surah, minutes):
+        self.service.snooze(data, is_surah, minutes)
 
-            days = self.settings.get('surah_reminder.interval_days', 3)
-            return now - last_date >= timedelta(days=days)
-        except:
-            return False  # Default to regular thikr if there's an error
-
-    def stop(self):
-        self.running = False
+    def rearm(self):
+        self.service.rearm()
 
     def pause(self):
-        self.paused = True
+        self.service.pause()
 
     def resume(self):
-        self.paused = False
+        self.service.resume()
 
-    def reset_for_restart(self):
-        """Reset state for thread restart"""
-        self.running = True
-        self.paused = False
-        self.error_count = 0
-        self.first_run = False  # Don't show immediate reminder on restart
+    def stop(self):
+        self.service.stop()
+
+    def next_deadline(self):
+        """Monotonic time of the scheduler's next wakeup, or None"""
+        return self.service.scheduler.next_deadline()
+
+    def wakeups(self):
+        return self.service.scheduler.wakeups
 
 
 # ============================================
@@ -1524,12 +1038,23 @@ def create_app_icon():
 # نافذة الإعدادات
 # ============================================
 
+ARABIC_WEEKDAYS = ('الاثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت', 'الأحد')
+STREAM_TITLES = {'main': 'ذكر', 'surah': 'سورة'}
+
+
 class SettingsWindow(QMainWindow):
     settings_changed = pyqtSignal()
     
-    def __init__(self, settings):
+    def __init__(self, settings, upcoming=None, wakeups=None):
         super().__init__()
         self.settings = settings
+        # upcoming(n) -> [(epoch seconds, stream)] from the running reminder thread
+        self.upcoming = upcoming
+        # wakeups() -> timer wakeups per hour of the running app
+        self.wakeups = wakeups
+        # Edits are staged here: preview reads them, save commits, cancel drops them
+        self.pending = settings.begin()
+        self.preview_popup = None
         self.setup_ui()
         self.load_values()
     
@@ -1663,6 +1188,8 @@ class SettingsWindow(QMainWindow):
         
         self.autostart_cb = QCheckBox("تشغيل البرنامج مع بدء Windows")
         l0.addWidget(self.autostart_cb)
+        self.low_power_cb = QCheckBox("وضع توفير الطاقة (مؤقتات أقل دقة وتنبيهات أقل للمعالج)")
+        l0.addWidget(self.low_power_cb)
         
         # زر للتحقق من الحالة
         self.autostart_status = QLabel("")
@@ -1688,10 +1215,56 @@ class SettingsWindow(QMainWindow):
         h.addStretch()
         l1.addLayout(h)
         
-        self.random_cb = QCheckBox("ترتيب عشوائي")
+        h_order = QHBoxLayout()
+        h_order.addWidget(QLabel("ترتيب الأذكار:"))
+        self.order_combo = QComboBox()
+        for key, name in [('shuffle', 'عشوائي دون تكرار حتى تكتمل الدورة'), ('random', 'عشوائي'),
+                          ('sequential', 'بالترتيب')]:
+            self.order_combo.addItem(name, key)
+        h_order.addWidget(self.order_combo)
+        h_order.addWidget(QLabel("لا يتكرر خلال آخر:"))
+        self.no_repeat_spin = QSpinBox()
+        self.no_repeat_spin.setRange(0, 50)
+        self.no_repeat_spin.setFixedWidth(80)
+        h_order.addWidget(self.no_repeat_spin)
+        h_order.addStretch()
+        l1.addLayout(h_order)
+        # The window only applies to plain random order
+        self.order_combo.currentIndexChanged.connect(
+            lambda: self.no_repeat_spin.setEnabled(self.order_combo.currentData() == 'random'
+                                                   and not self.settings.is_locked('reminder.no_repeat')))
+        
         self.virtue_cb = QCheckBox("إظهار الفضيلة")
-        l1.addWidget(self.random_cb)
         l1.addWidget(self.virtue_cb)
+        self.occasions_cb = QCheckBox("أذكار المناسبات (الجمعة، رمضان، عشر ذي الحجة، الأيام البيض)")
+        l1.addWidget(self.occasions_cb)
+        
+        h_catch = QHBoxLayout()
+        h_catch.addWidget(QLabel("ما فات أثناء الغياب أو إيقاف الجهاز:"))
+        self.catch_up_combo = QComboBox()
+        for key, name in [('one', 'تذكير واحد'), ('digest', 'ملخص ما فات'), ('drop', 'تجاهل ما فات')]:
+            self.catch_up_combo.addItem(name, key)
+        h_catch.addWidget(self.catch_up_combo)
+        h_catch.addStretch()
+        l1.addLayout(h_catch)
+
+        h_idle = QHBoxLayout()
+        h_idle.addWidget(QLabel("تأجيل التذكير عند الغياب بعد (دقيقة، 0 للتعطيل):"))
+        self.idle_spin = QSpinBox()
+        self.idle_spin.setRange(0, 120)
+        self.idle_spin.setFixedWidth(80)
+        h_idle.addWidget(self.idle_spin)
+        h_idle.addStretch()
+        l1.addLayout(h_idle)
+
+        h_snooze = QHBoxLayout()
+        h_snooze.addWidget(QLabel("زر التأجيل ⏰ (دقيقة):"))
+        self.snooze_spin = QSpinBox()
+        self.snooze_spin.setRange(1, 120)
+        self.snooze_spin.setFixedWidth(80)
+        h_snooze.addWidget(self.snooze_spin)
+        h_snooze.addStretch()
+        l1.addLayout(h_snooze)
         layout.addWidget(g1)
         
         # Quiet hours
@@ -1716,6 +1289,29 @@ class SettingsWindow(QMainWindow):
         l2.addLayout(h2)
         layout.addWidget(g2)
         
+        # Busy calendar (.ics)
+        g_cal = QGroupBox("التقويم (أوقات الانشغال)")
+        l_cal = QVBoxLayout(g_cal)
+        
+        h_cal = QHBoxLayout()
+        self.calendar_input = QLineEdit()
+        self.calendar_input.setPlaceholderText("ملف .ics - اتركه فارغاً للتعطيل")
+        h_cal.addWidget(self.calendar_input)
+        browse_btn = QPushButton("استعراض...")
+        browse_btn.clicked.connect(self.browse_calendar)
+        h_cal.addWidget(browse_btn)
+        l_cal.addLayout(h_cal)
+        
+        h_mode = QHBoxLayout()
+        h_mode.addWidget(QLabel("أثناء المواعيد:"))
+        self.busy_mode_combo = QComboBox()
+        for key, name in [('defer', 'تأجيل التذكير حتى انتهاء الموعد'), ('suppress', 'تخطي التذكير')]:
+            self.busy_mode_combo.addItem(name, key)
+        h_mode.addWidget(self.busy_mode_combo)
+        h_mode.addStretch()
+        l_cal.addLayout(h_mode)
+        layout.addWidget(g_cal)
+        
         # Surah reminder
         g3 = QGroupBox("تذكير السور")
         l3 = QVBoxLayout(g3)
@@ -1733,8 +1329,93 @@ class SettingsWindow(QMainWindow):
         l3.addLayout(h3)
         layout.addWidget(g3)
         
+        # Morning / evening sessions
+        g_me = QGroupBox("أذكار الصباح والمساء")
+        l_me = QVBoxLayout(g_me)
+        
+        self.sessions_cb = QCheckBox("عرض أذكار الصباح والمساء تلقائياً")
+        l_me.addWidget(self.sessions_cb)
+        
+        h_me = QHBoxLayout()
+        h_me.addWidget(QLabel("الصباح:"))
+        self.morning_time = QTimeEdit()
+        self.morning_time.setDisplayFormat("HH:mm")
+        self.morning_time.setFixedWidth(80)
+        h_me.addWidget(self.morning_time)
+        h_me.addWidget(QLabel("المساء:"))
+        self.evening_time = QTimeEdit()
+        self.evening_time.setDisplayFormat("HH:mm")
+        self.evening_time.setFixedWidth(80)
+        h_me.addWidget(self.evening_time)
+        h_me.addStretch()
+        l_me.addLayout(h_me)
+        
+        h_grace = QHBoxLayout()
+        h_grace.addWidget(QLabel("إن فات الوقت والجهاز مغلق، اعرضها خلال (دقيقة):"))
+        self.grace_spin = QSpinBox()
+        self.grace_spin.setRange(0, 720)
+        self.grace_spin.setFixedWidth(80)
+        h_grace.addWidget(self.grace_spin)
+        h_grace.addStretch()
+        l_me.addLayout(h_grace)
+        layout.addWidget(g_me)
+        
+        # Prayer times (for reminders after the prayers, see reminder.streams)
+        g_pr = QGroupBox("مواقيت الصلاة")
+        l_pr = QVBoxLayout(g_pr)
+        
+        self.prayer_cb = QCheckBox("حساب مواقيت الصلاة لموقعي")
+        l_pr.addWidget(self.prayer_cb)
+        
+        h_loc = QHBoxLayout()
+        h_loc.addWidget(QLabel("خط العرض:"))
+        self.latitude_spin = QDoubleSpinBox()
+        self.latitude_spin.setRange(-90, 90)
+        self.latitude_spin.setDecimals(4)
+        self.latitude_spin.setFixedWidth(100)
+        h_loc.addWidget(self.latitude_spin)
+        h_loc.addWidget(QLabel("خط الطول:"))
+        self.longitude_spin = QDoubleSpinBox()
+        self.longitude_spin.setRange(-180, 180)
+        self.longitude_spin.setDecimals(4)
+        self.longitude_spin.setFixedWidth(100)
+        h_loc.addWidget(self.longitude_spin)
+        h_loc.addStretch()
+        l_pr.addLayout(h_loc)
+        
+        h_method = QHBoxLayout()
+        h_method.addWidget(QLabel("طريقة الحساب:"))
+        self.method_combo = QComboBox()
+        for key, name in [('Makkah', 'أم القرى'), ('MWL', 'رابطة العالم الإسلامي'),
+                          ('Egypt', 'الهيئة المصرية العامة للمساحة'), ('Karachi', 'جامعة العلوم الإسلامية بكراتشي'),
+                          ('ISNA', 'الجمعية الإسلامية لأمريكا الشمالية')]:
+            self.method_combo.addItem(name, key)
+        h_method.addWidget(self.method_combo)
+        self.asr_combo = QComboBox()
+        self.asr_combo.addItem("العصر: الجمهور", 1)
+        self.asr_combo.addItem("العصر: الحنفي", 2)
+        h_method.addWidget(self.asr_combo)
+        h_method.addStretch()
+        l_pr.addLayout(h_method)
+        layout.addWidget(g_pr)
+        
+        # Upcoming reminders (all streams, as currently scheduled)
+        g4 = QGroupBox("التذكيرات القادمة")
+        l4 = QVBoxLayout(g4)
+        self.hijri_label = QLabel("")
+        l4.addWidget(self.hijri_label)
+        self.upcoming_label = QLabel("")
+        self.upcoming_label.setObjectName("statusLabel")
+        l4.addWidget(self.upcoming_label)
+        layout.addWidget(g4)
+        
         layout.addStretch()
-        return w
+        # More groups than fit the window height
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setFrameShape(QFrame.Shape.NoFrame)
+        scroll.setWidget(w)
+        return scroll
     
     def create_appearance_tab(self):
         w = QWidget()
@@ -1856,6 +1537,19 @@ class SettingsWindow(QMainWindow):
             self.category_filter.addItem(cat, cat)
         self.category_filter.currentIndexChanged.connect(self.filter_athkar_list)
         filter_layout.addWidget(self.category_filter)
+        # How often the selected category comes up in reminders (1 = as the rest, 0 = never)
+        filter_layout.addWidget(QLabel("الوزن:"))
+        self.category_weight_spin = QSpinBox()
+        self.category_weight_spin.setRange(0, 10)
+        self.category_weight_spin.setFixedWidth(60)
+        self.category_weight_spin.setEnabled(False)
+        self.category_weight_spin.valueChanged.connect(self.on_category_weight_changed)
+        filter_layout.addWidget(self.category_weight_spin)
+        filter_layout.addWidget(QLabel("وزن المفضلة ❤️:"))
+        self.favourite_weight_spin = QSpinBox()
+        self.favourite_weight_spin.setRange(1, 10)
+        self.favourite_weight_spin.setFixedWidth(60)
+        filter_layout.addWidget(self.favourite_weight_spin)
         filter_layout.addStretch()
         layout.addWidget(filter_group)
         
@@ -1878,9 +1572,12 @@ class SettingsWindow(QMainWindow):
         self.del_btn.clicked.connect(self.del_thikr)
         self.clear_btn = QPushButton("🔄 جديد")
         self.clear_btn.clicked.connect(self.clear_thikr_form)
+        self.fav_btn = QPushButton("❤️ مفضل")
+        self.fav_btn.clicked.connect(self.toggle_favourite)
         h1.addWidget(self.add_btn)
         h1.addWidget(self.edit_btn)
         h1.addWidget(self.del_btn)
+        h1.addWidget(self.fav_btn)
         h1.addWidget(self.clear_btn)
         h1.addStretch()
         l.addLayout(h1)
@@ -1914,50 +1611,27 @@ class SettingsWindow(QMainWindow):
         
         # Track editing state
         self.editing_thikr_id = None
-        self.editing_is_custom = False
         
         return w
     
-    def get_all_athkar(self):
-        """Get combined list of default + custom athkar"""
-        deleted_ids = self.settings.get('deleted_default_athkar', [])
-        modified = self.settings.get('modified_athkar', {})
-        
-        all_athkar = []
-        
-        # Add default athkar (with modifications applied)
-        for thikr in DEFAULT_ATHKAR:
-            if thikr['id'] in deleted_ids:
-                continue
-            thikr_copy = thikr.copy()
-            thikr_copy['is_custom'] = False
-            # Apply modifications if any
-            if str(thikr['id']) in modified:
-                thikr_copy.update(modified[str(thikr['id'])])
-            all_athkar.append(thikr_copy)
-        
-        # Add custom athkar
-        custom = self.settings.get('custom_athkar', [])
-        for i, thikr in enumerate(custom):
-            thikr_copy = thikr.copy()
-            thikr_copy['id'] = f'custom_{i}'
-            thikr_copy['is_custom'] = True
-            thikr_copy['category'] = thikr.get('category', 'مخصص')
-            all_athkar.append(thikr_copy)
-        
-        return all_athkar
-    
     def filter_athkar_list(self):
         """Filter and display athkar based on selected category"""
         self.athkar_list.clear()
         selected_cat = self.category_filter.currentData()
+        catalog = self.settings.athkar
         
-        for thikr in self.get_all_athkar():
-            if selected_cat != "all" and thikr.get('category', 'مخصص') != selected_cat:
-                continue
-            
+        # Weights are staged like the other settings and saved with them
+        self.category_weight_spin.blockSignals(True)
+        self.category_weight_spin.setValue(self.category_weights.get(selected_cat, 1))
+        self.category_weight_spin.blockSignals(False)
+        self.category_weight_spin.setEnabled(selected_cat != "all"
+                                             and not self.settings.is_locked('reminder.category_weights'))
+        
+        for thikr in catalog.all() if selected_cat == "all" else catalog.by_category(selected_cat):
             # Display with icon
             icon = "⭐" if thikr.get('is_custom') else "📌"
+            if catalog.is_favourite(thikr['id']):
+                icon += "❤️"
             cat = thikr.get('category', 'مخصص')
             display_text = f"{icon} {thikr['text'][:50]}{'...' if len(thikr['text']) > 50 else ''} [{cat}]"
             
@@ -1979,7 +1653,21 @@ class SettingsWindow(QMainWindow):
                 self.category_input.setCurrentIndex(idx)
             
             self.editing_thikr_id = thikr.get('id')
-            self.editing_is_custom = thikr.get('is_custom', False)
+    
+    def toggle_favourite(self):
+        """Mark / unmark the selected thikr as a favourite"""
+        if self.editing_thikr_id is None:
+            QMessageBox.warning(self, "تنبيه", "الرجاء اختيار ذكر")
+            return
+        catalog = self.settings.athkar
+        catalog.set_favourite(self.editing_thikr_id, not catalog.is_favourite(self.editing_thikr_id))
+        self.filter_athkar_list()
+        self.clear_thikr_form()
+    
+    def on_category_weight_changed(self, value):
+        category = self.category_filter.currentData()
+        if category != "all":
+            self.category_weights[category] = value
     
     def clear_thikr_form(self):
         """Clear the form for new entry"""
@@ -1987,7 +1675,6 @@ class SettingsWindow(QMainWindow):
         self.virtue_input.clear()
         self.category_input.setCurrentIndex(0)
         self.editing_thikr_id = None
-        self.editing_is_custom = False
         self.athkar_list.clearSelection()
     
     def edit_thikr(self):
@@ -2004,18 +1691,8 @@ class SettingsWindow(QMainWindow):
         virtue = self.virtue_input.text().strip()
         category = self.category_input.currentData()
         
-        if self.editing_is_custom:
-            # Edit custom thikr
-            custom = self.settings.get('custom_athkar', [])
-            idx = int(str(self.editing_thikr_id).replace('custom_', ''))
-            if 0 <= idx < len(custom):
-                custom[idx] = {'text': text, 'virtue': virtue, 'category': category}
-                self.settings.set('custom_athkar', custom)
-        else:
-            # Edit default thikr (store modification)
-            modified = self.settings.get('modified_athkar', {})
-            modified[str(self.editing_thikr_id)] = {'text': text, 'virtue': virtue, 'category': category}
-            self.settings.set('modified_athkar', modified)
+        # Custom athkar are updated, default ones get a stored modification
+        self.settings.athkar.update(self.editing_thikr_id, text, virtue, category)
         
         self.filter_athkar_list()
         self.clear_thikr_form()
@@ -2033,8 +1710,13 @@ class SettingsWindow(QMainWindow):
         self.total_label = QLabel("الإجمالي: 0")
         self.total_label.setObjectName("statLabel")
         
+        self.wakeups_label = QLabel("")
+        self.wakeups_label.setObjectName("statusLabel")
+        self.wakeups_label.setToolTip("عدد مرات إيقاظ المعالج في الساعة (المؤقتات والتذكيرات)")
+        
         l.addWidget(self.daily_label)
         l.addWidget(self.total_label)
+        l.addWidget(self.wakeups_label)
         
         reset_btn = QPushButton("🔄 إعادة تعيين")
         reset_btn.clicked.connect(self.reset_stats)
@@ -2048,16 +1730,48 @@ class SettingsWindow(QMainWindow):
         # Reminders
         self.reminder_cb.setChecked(self.settings.get('reminder.enabled', True))
         self.interval_spin.setValue(self.settings.get('reminder.interval_minutes', 1))
-        self.random_cb.setChecked(self.settings.get('reminder.random_order', True))
+        idx = self.order_combo.findData(self.settings.get('reminder.order', 'shuffle'))
+        if idx >= 0:
+            self.order_combo.setCurrentIndex(idx)
+        self.no_repeat_spin.setValue(self.settings.get('reminder.no_repeat', 3))
+        self.no_repeat_spin.setEnabled(self.order_combo.currentData() == 'random')
         self.virtue_cb.setChecked(self.settings.get('reminder.show_virtue', True))
+        self.occasions_cb.setChecked(self.settings.get('hijri.occasions', True))
+        idx = self.catch_up_combo.findData(self.settings.get('reminder.catch_up', 'one'))
+        if idx >= 0:
+            self.catch_up_combo.setCurrentIndex(idx)
+        self.idle_spin.setValue(self.settings.get('reminder.idle.threshold_minutes', 5))
+        self.snooze_spin.setValue(self.settings.get('reminder.idle.snooze_minutes', 10))
         
         self.quiet_cb.setChecked(self.settings.get('reminder.quiet_hours.enabled', False))
         self.quiet_start.setTime(QTime.fromString(self.settings.get('reminder.quiet_hours.start', '23:00'), 'HH:mm'))
         self.quiet_end.setTime(QTime.fromString(self.settings.get('reminder.quiet_hours.end', '06:00'), 'HH:mm'))
         
+        self.calendar_input.setText(self.settings.get('reminder.busy_calendar.file', ''))
+        idx = self.busy_mode_combo.findData(self.settings.get('reminder.busy_calendar.mode', 'defer'))
+        if idx >= 0:
+            self.busy_mode_combo.setCurrentIndex(idx)
+        
         self.surah_cb.setChecked(self.settings.get('surah_reminder.enabled', True))
         self.surah_spin.setValue(self.settings.get('surah_reminder.interval_days', 3))
         
+        self.sessions_cb.setChecked(self.settings.get('morning_evening.enabled', True))
+        self.morning_time.setTime(QTime.fromString(self.settings.get('morning_evening.morning_time', '06:00'), 'HH:mm'))
+        self.evening_time.setTime(QTime.fromString(self.settings.get('morning_evening.evening_time', '18:00'), 'HH:mm'))
+        self.grace_spin.setValue(self.settings.get('morning_evening.grace_minutes', 120))
+        
+        latitude = self.settings.get('prayer.latitude')
+        longitude = self.settings.get('prayer.longitude')
+        self.prayer_cb.setChecked(latitude is not None and longitude is not None)
+        self.latitude_spin.setValue(latitude or 0.0)
+        self.longitude_spin.setValue(longitude or 0.0)
+        idx = self.method_combo.findData(self.settings.get('prayer.method', 'Makkah'))
+        if idx >= 0:
+            self.method_combo.setCurrentIndex(idx)
+        idx = self.asr_combo.findData(self.settings.get('prayer.asr_factor', 1))
+        if idx >= 0:
+            self.asr_combo.setCurrentIndex(idx)
+        
         # Appearance
         idx = self.theme_combo.findData(self.settings.get('popup.theme', 'cyberpunk_dark'))
         if idx >= 0:
@@ -2076,43 +1790,141 @@ class SettingsWindow(QMainWindow):
         # Sound
         self.sound_cb.setChecked(self.settings.get('sound.enabled', True))
         self.volume_slider.setValue(self.settings.get('sound.volume', 30))
+        self.low_power_cb.setChecked(self.settings.get('power.low_power', False))
         
         # Athkar - populate the enhanced list
+        self.category_weights = {w['category']: w['weight']
+                                 for w in self.settings.get('reminder.category_weights', [])}
+        self.favourite_weight_spin.setValue(self.settings.get('reminder.favourite_weight', 3))
         self.filter_athkar_list()
         
         # Stats
         self.update_stats()
+        self.update_upcoming()
+
+        self.apply_policy_locks()
+
+    def browse_calendar(self):
+        path, _ = QFileDialog.getOpenFileName(self, "اختر ملف التقويم", self.calendar_input.text(),
+                                              "iCalendar (*.ics)")
+        if path:
+            self.calendar_input.setText(path)
+
+    def update_upcoming(self):
+        today = get_now(self.settings.config.timezone).date()
+        try:
+            self.hijri_label.setText(f"اليوم: {self.settings.hijri_calendar().format(today)}")
+        except ValueError:
+            self.hijri_label.setText("")
+        if self.upcoming is None:
+            self.upcoming_label.setText("")
+            return
+        tz = get_app_timezone(self.settings.config.timezone)
+        lines = []
+        for t, stream in self.upcoming(5):
+            when = datetime.fromtimestamp(t, tz)
+            name = STREAM_TITLES.get(stream.name, stream.name)
+            lines.append(f"{ARABIC_WEEKDAYS[when.weekday()]} {when.strftime('%H:%M')}  •  {name}")
+        self.upcoming_label.setText('\n'.join(lines) or "لا توجد تذكيرات مجدولة")
+
+    def apply_policy_locks(self):
+        """Grey out the settings pinned by the administrator's policy file"""
+        widgets = {
+            'reminder.enabled': self.reminder_cb,
+            'reminder.interval_minutes': self.interval_spin,
+            'reminder.order': self.order_combo,
+            'reminder.no_repeat': self.no_repeat_spin,
+            'reminder.favourite_weight': self.favourite_weight_spin,
+            'reminder.show_virtue': self.virtue_cb,
+            'hijri.occasions': self.occasions_cb,
+            'reminder.catch_up': self.catch_up_combo,
+            'reminder.idle.threshold_minutes': self.idle_spin,
+            'reminder.idle.snooze_minutes': self.snooze_spin,
+            'reminder.quiet_hours.enabled': self.quiet_cb,
+            'reminder.quiet_hours.start': self.quiet_start,
+            'reminder.quiet_hours.end': self.quiet_end,
+            'reminder.busy_calendar.file': self.calendar_input,
+            'reminder.busy_calendar.mode': self.busy_mode_combo,
+            'surah_reminder.enabled': self.surah_cb,
+            'surah_reminder.interval_days': self.surah_spin,
+            'morning_evening.enabled': self.sessions_cb,
+            'morning_evening.morning_time': self.morning_time,
+            'morning_evening.evening_time': self.evening_time,
+            'morning_evening.grace_minutes': self.grace_spin,
+            'prayer.latitude': self.latitude_spin,
+            'prayer.longitude': self.longitude_spin,
+            'prayer.method': self.method_combo,
+            'prayer.asr_factor': self.asr_combo,
+            'popup.theme': self.theme_combo,
+            'popup.position': self.pos_combo,
+            'popup.font_size': self.font_spin,
+            'popup.duration_seconds': self.duration_spin,
+            'popup.width': self.width_spin,
+            'popup.height': self.height_spin,
+            'popup.opacity': self.opacity_slider,
+            'sound.enabled': self.sound_cb,
+            'sound.volume': self.volume_slider,
+            'power.low_power': self.low_power_cb,
+        }
+        for path, widget in widgets.items():
+            if self.settings.is_locked(path):
+                widget.setEnabled(False)
+                widget.setToolTip("🔒 هذا الإعداد مُقفل من قبل مسؤول النظام")
     
     def update_stats(self):
-        self.daily_label.setText(f"أذكار اليوم: {self.settings.get('stats.daily_count', 0)}")
-        self.total_label.setText(f"الإجمالي: {self.settings.get('stats.total_count', 0)}")
+        stats = self.settings.get_stats()
+        self.daily_label.setText(f"أذكار اليوم: {stats['daily_count']}")
+        self.total_label.setText(f"الإجمالي: {stats['total_count']}")
+        if self.wakeups:
+            self.wakeups_label.setText(f"مرات التنبيه في الساعة: {self.wakeups():.1f}")
     
     def save_settings(self):
         # حفظ إعداد التشغيل التلقائي
         self.set_autostart(self.autostart_cb.isChecked())
         
-        self.settings.set('reminder.enabled', self.reminder_cb.isChecked())
-        self.settings.set('reminder.interval_minutes', self.interval_spin.value())
-        self.settings.set('reminder.random_order', self.random_cb.isChecked())
-        self.settings.set('reminder.show_virtue', self.virtue_cb.isChecked())
-        
-        self.settings.set('reminder.quiet_hours.enabled', self.quiet_cb.isChecked())
-        self.settings.set('reminder.quiet_hours.start', self.quiet_start.time().toString('HH:mm'))
-        self.settings.set('reminder.quiet_hours.end', self.quiet_end.time().toString('HH:mm'))
-        
-        self.settings.set('surah_reminder.enabled', self.surah_cb.isChecked())
-        self.settings.set('surah_reminder.interval_days', self.surah_spin.value())
-        
-        self.settings.set('popup.theme', self.theme_combo.currentData())
-        self.settings.set('popup.position', self.pos_combo.currentData())
-        self.settings.set('popup.font_size', self.font_spin.value())
-        self.settings.set('popup.duration_seconds', self.duration_spin.value())
-        self.settings.set('popup.width', self.width_spin.value())
-        self.settings.set('popup.height', self.height_spin.value())
-        self.settings.set('popup.opacity', self.opacity_slider.value() / 100)
-        
-        self.settings.set('sound.enabled', self.sound_cb.isChecked())
-        self.settings.set('sound.volume', self.volume_slider.value())
+        # Committed as one snapshot so the reminder thread never sees a partial save
+        self.pending.update({
+            'reminder.enabled': self.reminder_cb.isChecked(),
+            'reminder.interval_minutes': self.interval_spin.value(),
+            'reminder.order': self.order_combo.currentData(),
+            'reminder.no_repeat': self.no_repeat_spin.value(),
+            'reminder.category_weights': [{'category': category, 'weight': weight}
+                                          for category, weight in sorted(self.category_weights.items())
+                                          if weight != 1],
+            'reminder.favourite_weight': self.favourite_weight_spin.value(),
+            'reminder.show_virtue': self.virtue_cb.isChecked(),
+            'hijri.occasions': self.occasions_cb.isChecked(),
+            'reminder.catch_up': self.catch_up_combo.currentData(),
+            'reminder.idle.threshold_minutes': self.idle_spin.value(),
+            'reminder.idle.snooze_minutes': self.snooze_spin.value(),
+
+            'reminder.quiet_hours.enabled': self.quiet_cb.isChecked(),
+            'reminder.quiet_hours.start': self.quiet_start.time().toString('HH:mm'),
+            'reminder.quiet_hours.end': self.quiet_end.time().toString('HH:mm'),
+
+            'reminder.busy_calendar.file': self.calendar_input.text().strip(),
+            'reminder.busy_calendar.mode': self.busy_mode_combo.currentData(),
+
+            'surah_reminder.enabled': self.surah_cb.isChecked(),
+            'surah_reminder.interval_days': self.surah_spin.value(),
+
+            'morning_evening.enabled': self.sessions_cb.isChecked(),
+            'morning_evening.morning_time': self.morning_time.time().toString('HH:mm'),
+            'morning_evening.evening_time': self.evening_time.time().toString('HH:mm'),
+            'morning_evening.grace_minutes': self.grace_spin.value(),
+
+            'prayer.latitude': self.latitude_spin.value() if self.prayer_cb.isChecked() else None,
+            'prayer.longitude': self.longitude_spin.value() if self.prayer_cb.isChecked() else None,
+            'prayer.method': self.method_combo.currentData(),
+            'prayer.asr_factor': self.asr_combo.currentData(),
+
+            **self.popup_values(),
+
+            'sound.enabled': self.sound_cb.isChecked(),
+            'sound.volume': self.volume_slider.value(),
+            'power.low_power': self.low_power_cb.isChecked(),
+        })
+        self.pending.commit()
         
         self.settings_changed.emit()
         QMessageBox.information(self, "تم", "تم حفظ الإعدادات!")
@@ -2128,9 +1940,7 @@ class SettingsWindow(QMainWindow):
         virtue = self.virtue_input.text().strip()
         category = self.category_input.currentData() if hasattr(self, 'category_input') else 'مخصص'
         
-        custom = self.settings.get('custom_athkar', [])
-        custom.append({'text': text, 'virtue': virtue, 'category': category})
-        self.settings.set('custom_athkar', custom)
+        self.settings.athkar.add(text, virtue, category)
         
         self.filter_athkar_list()
         self.clear_thikr_form()
@@ -2145,19 +1955,8 @@ class SettingsWindow(QMainWindow):
         if QMessageBox.question(self, "تأكيد", "هل تريد حذف هذا الذكر؟") != QMessageBox.StandardButton.Yes:
             return
         
-        if self.editing_is_custom:
-            # Delete custom thikr
-            custom = self.settings.get('custom_athkar', [])
-            idx = int(str(self.editing_thikr_id).replace('custom_', ''))
-            if 0 <= idx < len(custom):
-                custom.pop(idx)
-                self.settings.set('custom_athkar', custom)
-        else:
-            # Mark default thikr as deleted
-            deleted = self.settings.get('deleted_default_athkar', [])
-            if self.editing_thikr_id not in deleted:
-                deleted.append(self.editing_thikr_id)
-                self.settings.set('deleted_default_athkar', deleted)
+        # Custom athkar are deleted, default ones marked as deleted
+        self.settings.athkar.delete(self.editing_thikr_id)
         
         self.filter_athkar_list()
         self.clear_thikr_form()
@@ -2165,21 +1964,32 @@ class SettingsWindow(QMainWindow):
     
     def reset_stats(self):
         if QMessageBox.question(self, "تأكيد", "إعادة تعيين الإحصائيات؟") == QMessageBox.StandardButton.Yes:
-            self.settings.set('stats.daily_count', 0)
-            self.settings.set('stats.total_count', 0)
+            self.settings.store.reset_stats()
             self.update_stats()
     
+    def popup_values(self):
+        """Popup appearance fields as currently entered in the window"""
+        return {
+            'popup.theme': self.theme_combo.currentData(),
+            'popup.position': self.pos_combo.currentData(),
+            'popup.font_size': self.font_spin.value(),
+            'popup.duration_seconds': self.duration_spin.value(),
+            'popup.width': self.width_spin.value(),
+            'popup.height': self.height_spin.value(),
+            'popup.opacity': self.opacity_slider.value() / 100,
+        }
+
     def preview(self):
-        self.settings.set('popup.theme', self.theme_combo.currentData())
-        self.settings.set('popup.position', self.pos_combo.currentData())
-        self.settings.set('popup.font_size', self.font_spin.value())
-        self.settings.set('popup.duration_seconds', self.duration_spin.value())
-        self.settings.set('popup.width', self.width_spin.value())
-        self.settings.set('popup.height', self.height_spin.value())
-        self.settings.set('popup.opacity', self.opacity_slider.value() / 100)
-        
-        popup = ReminderPopup(self.settings)
-        popup.show_thikr({'text': 'سُبْحَانَ اللَّهِ وَبِحَمْدِهِ', 'virtue': 'كلمتان خفيفتان على اللسان'})
+        # Staged only - previewing never touches the saved settings or the disk
+        self.pending.update(self.popup_values())
+        
+        self.preview_popup = ReminderPopup(self.pending)
+        self.preview_popup.show_thikr({'text': 'سُبْحَانَ اللَّهِ وَبِحَمْدِهِ', 'virtue': 'كلمتان خفيفتان على اللسان'})
+
+    def closeEvent(self, e):
+        # Closing without saving (cancel / window X) discards previewed changes
+        self.pending.rollback()
+        super().closeEvent(e)
     
     def is_autostart_enabled(self):
         """التحقق من تفعيل التشغيل التلقائي عبر Registry"""
@@ -2453,6 +2263,9 @@ class SettingsWindow(QMainWindow):
 # ============================================
 
 class ThikrApp(QObject):
+    # Housekeeping job -> (period, period in low-power mode), seconds
+    HOUSEKEEPING_PERIODS = {'watchdog': (30, 120), 'policy': (60, 300), 'snapshot': (3600, 3600)}
+
     def __init__(self, existing_app=None, existing_settings=None):
         super().__init__()
         # استخدام تطبيق موجود أو إنشاء جديد
@@ -2465,40 +2278,81 @@ class ThikrApp(QObject):
 
         # استخدام إعدادات موجودة أو إنشاء جديدة
         self.settings = existing_settings if existing_settings else SettingsManager()
+        self.idle = get_idle_detector()  # Shared with the reminder thread
         self.popup = None
         self.settings_window = None
         self.reminder_thread = None
         self.thread_restart_count = 0
         self.max_thread_restarts = 10  # Max restarts before giving up
 
-        # Watchdog timer to ensure reminder thread stays alive
-        self.watchdog_timer = QTimer(self)
-        self.watchdog_timer.timeout.connect(self.check_reminder_thread)
-        self.watchdog_timer.start(30000)  # Check every 30 seconds
-
-        # Backup reminder timer (main thread) - fires if thread signals fail
-        self.last_reminder_time = None
-        self.backup_timer = QTimer(self)
-        self.backup_timer.timeout.connect(self.backup_reminder_check)
-        self.backup_timer.start(60000)  # Check every 60 seconds
+        # Periodic housekeeping shares one coarse timer, ticking when the
+        # reminder thread wakes anyway wherever it can (see PeriodicTasks)
+        self.started_at = time.monotonic()
+        self.popup_ticks = 0  # Progress-bar wakeups of closed popups
+        self.housekeeping = PeriodicTasks()
+        periods = {name: period for name, (period, _) in self.HOUSEKEEPING_PERIODS.items()}
+        # Watchdog: the thread's finished signal restarts it too; this is the backstop
+        self.housekeeping.add('watchdog', periods['watchdog'], self.check_reminder_thread)
+        # Admin policy: a stat(), re-parsed only when the file changes
+        self.housekeeping.add('policy', periods['policy'], self.settings.check_policy)
+        # Rolling data snapshots (free when nothing changed since the last one)
+        self.housekeeping.add('snapshot', periods['snapshot'], self.settings.backup, first=60)
+        self.housekeeping_timer = QTimer(self)
+        self.housekeeping_timer.setSingleShot(True)
+        self.housekeeping_timer.setTimerType(Qt.TimerType.VeryCoarseTimer)
+        self.housekeeping_timer.timeout.connect(self.on_housekeeping)
+        self.apply_power_mode()
+        self.settings.subscribe('power.*', self.apply_power_mode)
+
+        # React only to the settings each component depends on
+        self.settings.subscribe('popup.*', ReminderPopup.invalidate_style_cache)
+        for pattern in ('reminder.enabled', 'reminder.interval_minutes', 'reminder.quiet_hours.*',
+                        'reminder.min_gap_minutes', 'reminder.streams', 'surah_reminder.enabled',
+                        'surah_reminder.interval_days', 'reminder.busy_calendar.*',
+                        'morning_evening.enabled', 'morning_evening.morning_time',
+                        'morning_evening.evening_time', 'morning_evening.grace_minutes', 'prayer.*',
+                        'timezone'):
+            self.settings.subscribe(pattern, self.on_schedule_settings_changed)
+
+        # Hot reload: pick up edits made to user_settings.json by other tools.
+        # The directory is watched too because atomic replaces drop file watches.
+        self.settings_watcher = QFileSystemWatcher(self)
+        self.settings_watcher.addPath(str(self.settings.settings_file.parent))
+        self.settings_watcher.directoryChanged.connect(self.on_settings_file_changed)
+        self.settings_watcher.fileChanged.connect(self.on_settings_file_changed)
+        self.watch_settings_file()
 
         self.setup_tray()
 
         # Delay thread start slightly to ensure Qt event loop is ready
         QTimer.singleShot(2000, self.start_reminder)
-
-        # Show a startup reminder after 15 seconds to confirm app is working
-        QTimer.singleShot(15000, self.show_startup_reminder)
-
-    def show_startup_reminder(self):
-        """Show a reminder shortly after startup to confirm app is working"""
-        if self.settings.get('reminder.enabled', True):
-            # Only show if no reminder has been shown yet
-            if self.last_reminder_time is None:
-                log_debug("Showing startup reminder to confirm app is working")
-                thikr = self.settings.get_random_thikr()
-                self.show_popup(thikr, False)
     
+    def apply_power_mode(self, changes=None):
+        """Housekeeping periods for the current power setting"""
+        low_power = self.settings.config.power.low_power
+        for name, (period, low_power_period) in self.HOUSEKEEPING_PERIODS.items():
+            self.housekeeping.set_period(name, low_power_period if low_power else period)
+        self.arm_housekeeping()
+
+    def arm_housekeeping(self):
+        align = self.reminder_thread.next_deadline() if self.reminder_thread else None
+        t = self.housekeeping.next_tick(align)
+        self.housekeeping_timer.start(max(0, int((t - time.monotonic()) * 1000)))
+
+    def on_housekeeping(self):
+        self.housekeeping.run_due()
+        self.arm_housekeeping()
+
+    def wakeups_per_hour(self):
+        """Timer wakeups of the app (reminder thread, housekeeping, popups) per hour of uptime"""
+        wakeups = self.housekeeping.ticks + self.popup_ticks
+        if self.popup:
+            wakeups += self.popup.ticks
+        if self.reminder_thread:
+            wakeups += self.reminder_thread.wakeups()
+        hours = max(time.monotonic() - self.started_at, 60) / 3600
+        return wakeups / hours
+
     def setup_tray(self):
         self.tray = QSystemTrayIcon(self.app)
         
@@ -2556,7 +2410,7 @@ class ThikrApp(QObject):
             return  # Already running
 
         log_debug("Creating new ReminderThread...")
-        self.reminder_thread = ReminderThread(self.settings)
+        self.reminder_thread = ReminderThread(self.settings, self.idle)
 
         # Use QueuedConnection to ensure signals from thread are properly
         # delivered to main thread's event loop (critical for post-restart reliability)
@@ -2568,6 +2422,10 @@ class ThikrApp(QObject):
             self.on_thread_error,
             Qt.ConnectionType.QueuedConnection
         )
+        self.reminder_thread.start_session.connect(
+            self.on_session_due,
+            Qt.ConnectionType.QueuedConnection
+        )
         self.reminder_thread.finished.connect(self.on_thread_finished)
         self.reminder_thread.start()
         log_debug("ReminderThread started successfully")
@@ -2595,9 +2453,10 @@ class ThikrApp(QObject):
             log_debug(f"Restarting thread (attempt {self.thread_restart_count})")
 
             # Create new thread
-            self.reminder_thread = ReminderThread(self.settings)
+            self.reminder_thread = ReminderThread(self.settings, self.idle)
             self.reminder_thread.show_reminder.connect(self.show_popup)
             self.reminder_thread.thread_error.connect(self.on_thread_error)
+            self.reminder_thread.start_session.connect(self.on_session_due)
             self.reminder_thread.finished.connect(self.on_thread_finished)
             self.reminder_thread.first_run = False  # Don't show immediate reminder on restart
             self.reminder_thread.start()
@@ -2610,45 +2469,15 @@ class ThikrApp(QObject):
             if self.thread_restart_count < self.max_thread_restarts:
                 self.restart_reminder_thread()
 
-    def backup_reminder_check(self):
-        """Backup mechanism: Show reminder from main thread if thread signals failed"""
-        if not self.settings.get('reminder.enabled', True):
-            return
-
-        if self.reminder_thread and self.reminder_thread.paused:
-            return
-
-        interval_minutes = self.settings.get('reminder.interval_minutes', 1)
-        now = datetime.now()
-
-        # If no reminder has been shown for twice the interval, force one
-        if self.last_reminder_time is None:
-            # First check - just set the time
-            self.last_reminder_time = now
-            return
-
-        elapsed_minutes = (now - self.last_reminder_time).total_seconds() / 60
-
-        # If more than 2x interval has passed without a reminder, force one
-        if elapsed_minutes > (interval_minutes * 2):
-            log_debug(f"Backup timer: No reminder for {elapsed_minutes:.1f} min, forcing one")
-            thikr = self.settings.get_random_thikr()
-            self.show_popup(thikr, False)
-
     def show_popup(self, data, is_surah=False):
         log_debug(f"show_popup called! is_surah={is_surah}")
         try:
-            if self.popup:
-                self.popup.close()
-                self.popup.deleteLater()
+            self.retire_popup()
 
             self.popup = ReminderPopup(self.settings)
             self.popup.closed.connect(self.on_popup_closed)
+            self.popup.snoozed.connect(self.on_popup_snoozed)
             self.popup.show_thikr(data, is_surah)
-            self.settings.increment_counter()
-
-            # Track last reminder time for backup mechanism
-            self.last_reminder_time = datetime.now()
 
             # Play notification sound if enabled
             self.play_notification_sound()
@@ -2658,7 +2487,7 @@ class ThikrApp(QObject):
 
     def play_notification_sound(self):
         """Play a notification sound when reminder shows"""
-        if self.settings.get('sound.enabled', True):
+        if self.settings.config.sound.enabled:
             try:
                 # Play Windows default notification sound in background thread
                 def play_sound():
@@ -2671,15 +2500,39 @@ class ThikrApp(QObject):
             except:
                 pass
     
+    def retire_popup(self):
+        """Close the current popup (closed or replaced), counting it if it was seen"""
+        popup, self.popup = self.popup, None
+        if popup is None:
+            return
+        # Seen: closed by hand, or the user was at the computer when it went.
+        # Snoozed ones are counted when they come back.
+        threshold = self.settings.config.reminder.idle.threshold_minutes * 60
+        if not popup.was_snoozed and (popup.dismissed or not self.idle.is_away(threshold)):
+            self.settings.increment_counter()
+        self.popup_ticks += popup.ticks
+        popup.close()
+        popup.deleteLater()
+
     def on_popup_closed(self):
-        if self.popup:
-            self.popup.deleteLater()
-            self.popup = None
+        if self.sender() is self.popup:  # Not one already replaced while fading out
+            self.retire_popup()
+
+    def on_popup_snoozed(self, data, is_surah):
+        if self.reminder_thread:
+            self.reminder_thread.snooze(data, is_surah, self.settings.config.reminder.idle.snooze_minutes)
     
     def show_now(self):
         thikr = self.settings.get_random_thikr()
         self.show_popup(thikr, False)
     
+    def on_session_due(self, name):
+        """Scheduled morning/evening session from the reminder thread"""
+        if name == 'morning':
+            self.show_morning_athkar()
+        else:
+            self.show_evening_athkar()
+
     def show_morning_athkar(self):
         """عرض أذكار الصباح"""
         self.current_athkar_list = MORNING_ATHKAR.copy()
@@ -2711,15 +2564,13 @@ class ThikrApp(QObject):
                 'title': f"{title} {progress}"
             }
             
-            if self.popup:
-                self.popup.close()
-                self.popup.deleteLater()
+            self.retire_popup()
             
             self.popup = ReminderPopup(self.settings)
             self.popup.title.setText(display_thikr['title'])
+            self.popup.snooze_btn.hide()  # A session moves on; it is not re-enqueued
             self.popup.closed.connect(self.on_athkar_popup_closed)
             self.popup.show_thikr(display_thikr, False)
-            self.settings.increment_counter()
         else:
             # انتهت الأذكار
             type_name = "الصباح" if self.athkar_type == "morning" else "المساء"
@@ -2728,9 +2579,9 @@ class ThikrApp(QObject):
     
     def on_athkar_popup_closed(self):
         """عند إغلاق نافذة الذكر، عرض التالي"""
-        if self.popup:
-            self.popup.deleteLater()
-            self.popup = None
+        if self.sender() is not self.popup:
+            return
+        self.retire_popup()
         
         if hasattr(self, 'current_athkar_list'):
             self.current_athkar_index += 1
@@ -2750,18 +2601,39 @@ class ThikrApp(QObject):
     
     def show_settings(self):
         if not self.settings_window or not self.settings_window.isVisible():
-            self.settings_window = SettingsWindow(self.settings)
-            self.settings_window.settings_changed.connect(self.on_settings_changed)
+            self.settings_window = SettingsWindow(self.settings, upcoming=self.upcoming_reminders,
+                                                  wakeups=self.wakeups_per_hour)
         self.settings_window.show()
         self.settings_window.activateWindow()
     
-    def on_settings_changed(self):
+    def upcoming_reminders(self, n=5):
+        if self.reminder_thread is None:
+            return []
+        return self.reminder_thread.upcoming(n)
+
+    def watch_settings_file(self):
+        path = str(self.settings.settings_file)
+        if path not in self.settings_watcher.files() and self.settings.settings_file.exists():
+            self.settings_watcher.addPath(path)
+
+    def on_settings_file_changed(self, _path):
+        """Cheap stat check; the file is only re-parsed if size/mtime changed"""
+        self.watch_settings_file()
+        try:
+            self.settings.check_for_external_changes()
+        except Exception as e:
+            log_debug(f"Settings hot reload failed: {e}")
+
+    def on_schedule_settings_changed(self, changes):
+        """Re-arm the scheduler as soon as its timing inputs change"""
+        log_debug(f"Schedule settings changed: {sorted(changes)}")
         if self.reminder_thread:
-            self.reminder_thread.settings = self.settings
+            self.reminder_thread.rearm()
     
     def show_stats(self):
-        daily = self.settings.get('stats.daily_count', 0)
-        total = self.settings.get('stats.total_count', 0)
+        stats = self.settings.get_stats()
+        daily = stats['daily_count']
+        total = stats['total_count']
         self.tray.showMessage("📊 الإحصائيات", f"أذكار اليوم: {daily}\nالإجمالي: {total}", 
                              QSystemTrayIcon.MessageIcon.Information, 4000)
     
@@ -2774,10 +2646,7 @@ class ThikrApp(QObject):
     def quit(self):
         log_debug("App quitting...")
         # Stop all timers first
-        if self.watchdog_timer:
-            self.watchdog_timer.stop()
-        if self.backup_timer:
-            self.backup_timer.stop()
+        self.housekeeping_timer.stop()
 
         # Prevent auto-restart during shutdown
         self.max_thread_restarts = 0
@@ -2786,8 +2655,14 @@ class ThikrApp(QObject):
             self.reminder_thread.stop()
             self.reminder_thread.wait(2000)
 
-        if self.popup:
-            self.popup.close()
+        # A popup still on screen counts if it was seen, before the final flush
+        self.retire_popup()
+
+        # Write any pending (debounced) settings changes before exiting
+        self.settings.flush()
+        log_debug(f"Settings write stats: {self.settings.write_stats()}")
+        self.settings.backup()
+
         if self.settings_window:
             self.settings_window.close()
 
@@ -2803,6 +2678,12 @@ class ThikrApp(QObject):
 def main():
     """نقطة الدخول الرئيسية مع دعم الإعداد الأول"""
     try:
+        # إنشاء مجلد البيانات وتنظيف السجل القديم عند بدء التشغيل
+        ensure_data_directory()
+        clear_old_logs()
+        log_debug("=" * 50)
+        log_debug("App starting...")
+
         # دعم التجميد للتطبيقات المجمعة (PyInstaller)
         import multiprocessing
         multiprocessing.freeze_support()
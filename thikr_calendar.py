@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذِكْر - التقويم
+Thikr busy calendar - reminders held back during events of a local .ics file.
+
+The file (exported or synced by another tool) is only re-parsed when its
+mtime/size change, and then only the VEVENT blocks whose text changed are
+parsed again. Recurring events are expanded over the rolling horizon of
+IntervalCalendar, never in full, so a calendar with years of weekly
+meetings costs a few hundred intervals.
+
+Supported: DTSTART/DTEND/DURATION (UTC, TZID with an IANA name, floating
+and all-day), RRULE with FREQ=DAILY/WEEKLY/MONTHLY/YEARLY, INTERVAL,
+COUNT, UNTIL, BYDAY and BYMONTHDAY, RDATE, EXDATE and RECURRENCE-ID
+overrides. Cancelled and free (TRANSP:TRANSPARENT) events are ignored.
+Like thikr_core, this module never imports PyQt6.
+"""
+
+import calendar
+import hashlib
+import os
+import re
+from datetime import datetime, date, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from thikr_core import log_debug
+from thikr_scheduler import IntervalCalendar, CALENDAR_HORIZON_DAYS, _merge_intervals
+
+MAX_OCCURRENCES = 5000  # per event and expansion; guards against runaway rules
+
+ICS_WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+_DURATION_RE = re.compile(r'([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+_BYDAY_RE = re.compile(r'([+-]?\d*)(MO|TU|WE|TH|FR|SA|SU)$')
+
+
+class IcsEvent:
+    """One VEVENT; times are naive local datetimes in `tz`"""
+    __slots__ = ('uid', 'start', 'duration', 'tz', 'rrule', 'rdates', 'exdates',
+                 'recurrence_id', 'overridden', 'busy')
+
+    def __init__(self, uid, start, duration, tz):
+        self.uid = uid
+        self.start = start
+        self.duration = duration
+        self.tz = tz
+        self.rrule = None
+        self.rdates = []
+        self.exdates = set()       # epoch seconds of excluded occurrence starts
+        self.recurrence_id = None  # epoch seconds of the occurrence this overrides
+        self.overridden = frozenset()  # occurrence starts replaced by RECURRENCE-ID events
+        self.busy = True
+
+    def stamp(self, local):
+        return local.replace(tzinfo=self.tz).timestamp()
+
+    def occurrences(self, lo, hi):
+        """[start, end) epoch intervals of the occurrences overlapping [lo, hi)"""
+        out = []
+        starts = self.rdates + [self.start] if self.rrule is None else \
+            list(_expand_rrule(self, lo, hi)) + self.rdates
+        for local in starts:
+            t0 = self.stamp(local)
+            if t0 in self.exdates or t0 in self.overridden:
+                continue
+            t1 = self.stamp(local + self.duration)
+            if t0 < hi and t1 > lo:
+                out.append([t0, max(t1, t0 + 1)])
+        return out
+
+
+# ---------- parsing ----------
+
+def _unfold(lines):
+    """Logical content lines (RFC 5545 folding: continuation lines start with a space/tab)"""
+    current = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _split_line(line):
+    """NAME;PARAM=x;PARAM2=y:value -> (NAME, {PARAM: x}, value)"""
+    head, _, value = line.partition(':')
+    # A quoted parameter value may contain ':' (TZID="a:b")
+    while head.count('"') % 2 and value:
+        more, _, value = value.partition(':')
+        head += ':' + more
+    name, *params = head.split(';')
+    return name.upper(), dict(p.partition('=')[::2] for p in params), value
+
+
+def _tz_for(params, default_tz):
+    tzid = params.get('TZID', '').strip('"')
+    if not tzid:
+        return default_tz
+    try:
+        return ZoneInfo(tzid.lstrip('/'))
+    except (ValueError, KeyError, OSError):
+        # Outlook / Windows zone names ("Arab Standard Time") have no IANA entry
+        return default_tz
+
+
+def _parse_time(value, params, tz):
+    """(naive local datetime in `tz`, all_day) for a DATE or DATE-TIME value"""
+    value = value.strip()
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value[:8], '%Y%m%d'), True
+    if value.endswith('Z'):
+        utc = datetime.strptime(value[:-1], '%Y%m%dT%H%M%S').replace(tzinfo=timezone.utc)
+        return utc.astimezone(tz).replace(tzinfo=None), False
+    local = datetime.strptime(value, '%Y%m%dT%H%M%S')
+    source_tz = _tz_for(params, tz)
+    if source_tz is not tz:
+        local = local.replace(tzinfo=source_tz).astimezone(tz).replace(tzinfo=None)
+    return local, False
+
+
+def _parse_duration(value):
+    match = _DURATION_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"bad DURATION {value!r}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == '-' else delta
+
+
+def _parse_rrule(value, tz):
+    parts = dict(p.partition('=')[::2] for p in value.upper().split(';') if p)
+    rule = {
+        'freq': parts.get('FREQ'),
+        'interval': max(1, int(parts.get('INTERVAL') or 1)),
+        'count': int(parts['COUNT']) if parts.get('COUNT') else None,
+        'until': None,
+        'byday': [],
+        'bymonthday': [int(d) for d in parts.get('BYMONTHDAY', '').split(',') if d],
+    }
+    if rule['freq'] not in ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY'):
+        raise ValueError(f"unsupported FREQ {rule['freq']!r}")
+    for item in parts.get('BYDAY', '').split(','):
+        match = _BYDAY_RE.match(item)
+        if match:
+            rule['byday'].append((int(match.group(1) or 0), ICS_WEEKDAYS.index(match.group(2))))
+    if parts.get('UNTIL'):
+        until, all_day = _parse_time(parts['UNTIL'], {}, tz)
+        # A DATE until includes that whole day
+        rule['until'] = until + timedelta(days=1) - timedelta(seconds=1) if all_day else until
+    return rule
+
+
+def parse_event(lines, default_tz):
+    """IcsEvent for the content lines of one VEVENT, or None to ignore it"""
+    props = [_split_line(line) for line in lines]
+    first = {name: (params, value) for name, params, value in reversed(props)}
+    if 'DTSTART' not in first:
+        return None
+    params, value = first['DTSTART']
+    tz = _tz_for(params, default_tz)
+    start, all_day = _parse_time(value, params, tz)
+    if 'DTEND' in first:
+        end, _ = _parse_time(first['DTEND'][1], first['DTEND'][0], tz)
+        duration = end - start
+    elif 'DURATION' in first:
+        duration = _parse_duration(first['DURATION'][1])
+    else:
+        duration = timedelta(days=1) if all_day else timedelta(0)
+
+    event = IcsEvent(first.get('UID', ({}, ''))[1], start, duration, tz)
+    status = first.get('STATUS', ({}, ''))[1].upper()
+    transp = first.get('TRANSP', ({}, ''))[1].upper()
+    free = first.get('X-MICROSOFT-CDO-BUSYSTATUS', ({}, ''))[1].upper() == 'FREE'
+    event.busy = status != 'CANCELLED' and transp != 'TRANSPARENT' and not free and duration > timedelta(0)
+    if 'RRULE' in first:
+        event.rrule = _parse_rrule(first['RRULE'][1], tz)
+    if 'RECURRENCE-ID' in first:
+        rid, _ = _parse_time(first['RECURRENCE-ID'][1], first['RECURRENCE-ID'][0], tz)
+        event.recurrence_id = event.stamp(rid)
+    for name, params, value in props:
+        if name in ('EXDATE', 'RDATE'):
+            times = [_parse_time(v, params, tz)[0] for v in value.split(',') if v]
+            if name == 'EXDATE':
+                event.exdates.update(event.stamp(t) for t in times)
+            else:
+                event.rdates.extend(times)
+    return event
+
+
+def iter_vevents(path):
+    """Raw content lines of each VEVENT in the file, read line by line"""
+    block = None
+    with open(path, encoding='utf-8-sig', errors='replace') as f:
+        for line in _unfold(f):
+            upper = line.upper()
+            if upper == 'BEGIN:VEVENT':
+                block = []
+            elif upper == 'END:VEVENT':
+                if block is not None:
+                    yield block
+                block = None
+            elif block is not None:
+                block.append(line)
+
+
+# ---------- recurrence ----------
+
+def _add_months(year, month, n):
+    index = year * 12 + month - 1 + n
+    return index // 12, index % 12 + 1
+
+
+def _period_starts(rule, start, k):
+    """Sorted candidate starts (naive local) in the k-th period of the rule"""
+    freq, step = rule['freq'], rule['interval'] * k
+    clock = start.time()
+    if freq == 'DAILY':
+        days = [start.date() + timedelta(days=step)]
+    elif freq == 'WEEKLY':
+        monday = start.date() - timedelta(days=start.weekday()) + timedelta(weeks=step)
+        weekdays = sorted({wd for _, wd in rule['byday']}) or [start.weekday()]
+        days = [monday + timedelta(days=wd) for wd in weekdays]
+    elif freq == 'MONTHLY':
+        year, month = _add_months(start.year, start.month, step)
+        days = _month_days(rule, year, month, start.day)
+    else:
+        # BYDAY / BYMONTHDAY apply within the month of DTSTART (BYMONTH is not supported)
+        days = _month_days(rule, start.year + step, start.month, start.day)
+    return [datetime.combine(d, clock) for d in sorted(days)]
+
+
+def _month_days(rule, year, month, default_day):
+    last = calendar.monthrange(year, month)[1]
+    days = set()
+    for day in rule['bymonthday'] or ([] if rule['byday'] else [default_day]):
+        day = day if day > 0 else last + day + 1
+        if 1 <= day <= last:  # Feb 30th etc. do not exist and are skipped
+            days.add(date(year, month, day))
+    for nth, weekday in rule['byday']:
+        matching = [d for d in range(1, last + 1) if calendar.weekday(year, month, d) == weekday]
+        if nth == 0:  # Every such weekday of the month
+            days.update(date(year, month, d) for d in matching)
+        elif 0 < nth <= len(matching) or 0 < -nth <= len(matching):  # 2MO, -1FR
+            days.add(date(year, month, matching[nth - 1 if nth > 0 else nth]))
+    return days
+
+
+def _first_period(rule, start, target):
+    """A period index no later than the one containing `target` (when COUNT allows skipping)"""
+    if rule['count'] is not None or target <= start:
+        return 0
+    freq = rule['freq']
+    if freq == 'DAILY':
+        span = (target.date() - start.date()).days
+    elif freq == 'WEEKLY':
+        span = (target.date() - start.date()).days // 7
+    elif freq == 'MONTHLY':
+        span = (target.year - start.year) * 12 + target.month - start.month
+    else:
+        span = target.year - start.year
+    return max(0, span // rule['interval'] - 1)
+
+
+def _expand_rrule(event, lo, hi):
+    """Occurrence starts (naive local) of a recurring event that may overlap [lo, hi)"""
+    rule, start = event.rrule, event.start
+    from_local = datetime.fromtimestamp(lo, event.tz).replace(tzinfo=None) - event.duration
+    to_local = datetime.fromtimestamp(hi, event.tz).replace(tzinfo=None)
+    count = 0
+    first = _first_period(rule, start, from_local)
+    for k in range(first, first + MAX_OCCURRENCES):
+        for local in _period_starts(rule, start, k):
+            if local < start:
+                continue
+            if rule['until'] is not None and local > rule['until']:
+                return
+            if local >= to_local:
+                return
+            count += 1
+            if rule['count'] is not None and count > rule['count']:
+                return
+            if local >= from_local:
+                yield local
+
+
+# ---------- the calendar ----------
+
+class BusyCalendar(IntervalCalendar):
+    """Busy events of a local .ics file; call refresh() to pick up changes"""
+
+    def __init__(self, path='', tz=None):
+        super().__init__()
+        self.path = path
+        self.tz = tz
+        self.events = ()
+        self._parsed = {}        # digest of a VEVENT's text -> IcsEvent (or None)
+        self._signature = None   # (mtime_ns, size) of the file last parsed
+
+    def __bool__(self):
+        return bool(self.events)
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """Re-parse the file if it changed since the last call; True if it did"""
+        if not self.path:
+            return False
+        signature = self._file_signature()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        if signature is None:
+            log_debug(f"Busy calendar {self.path} not found")
+            self.events = ()
+            self.invalidate()
+            return True
+        try:
+            self._load()
+        except OSError as e:
+            log_debug(f"Could not read busy calendar {self.path}: {e}")
+            return False
+        self.invalidate()
+        return True
+
+    def _load(self):
+        parsed, events, overridden = {}, [], set()
+        reused = 0
+        for block in iter_vevents(self.path):
+            digest = hashlib.sha1('\n'.join(block).encode('utf-8')).digest()
+            if digest in self._parsed:
+                event = self._parsed[digest]
+                reused += 1
+            else:
+                try:
+                    event = parse_event(block, self.tz)
+                except (ValueError, IndexError) as e:
+                    log_debug(f"Skipped an unreadable calendar event: {e}")
+                    event = None
+            parsed[digest] = event
+            if event is None:
+                continue
+            if event.recurrence_id is not None:
+                overridden.add((event.uid, event.recurrence_id))
+            if event.busy:
+                events.append(event)
+        # A moved or cancelled occurrence replaces the one its series would produce
+        for event in events:
+            if event.rrule is not None:
+                event.overridden = frozenset(t for uid, t in overridden if uid == event.uid)
+        self._parsed = parsed
+        self.events = tuple(events)
+        log_debug(f"Busy calendar loaded: {len(self.events)} events ({reused} unchanged)")
+
+    def _expand(self, t):
+        today = datetime.fromtimestamp(t, self.tz).date()
+        lo = datetime.combine(today, datetime.min.time(), tzinfo=self.tz).timestamp()
+        hi = datetime.combine(today + timedelta(days=CALENDAR_HORIZON_DAYS), datetime.min.time(),
+                              tzinfo=self.tz).timestamp()
+        intervals = []
+        for event in self.events:
+            intervals.extend(event.occurrences(lo, hi))
+        return lo, hi, _merge_intervals(intervals)
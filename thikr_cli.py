@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذِكْر - سطر الأوامر
+Thikr headless command line - edit settings, statistics and athkar without the GUI.
+
+    py thikr.py config list
+    py thikr.py config get reminder.interval_minutes
+    py thikr.py config set reminder.interval_minutes 15
+    py thikr.py stats show
+    py thikr.py athkar add "سبحان الله" --category تسبيح
+    py thikr.py backup restore 20250101T090000
+    py thikr.py prayer times --date 2025-03-01 --days 7
+    py thikr.py simulate --days 365 --set reminder.interval_minutes=30 --suspend 2025-03-01T22:00 8
+
+Only thikr_core is imported (never PyQt6) and the single-instance lock is
+not taken, so this is safe to run while the tray app is open: the app picks
+up settings changes through its file watcher, and statistics/athkar go
+through the shared SQLite store.
+"""
+
+import sys
+import json
+import argparse
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+from thikr_core import (
+    SettingsManager, ConfigError, ensure_data_directory, get_app_timezone, get_now,
+    _json_default,
+)
+from thikr_prayer import TABLE_COLUMNS, compile_prayer_times
+from thikr_sim import simulate
+
+# Subcommands handled here; thikr.py dispatches on these before importing Qt
+CLI_COMMANDS = ('config', 'stats', 'athkar', 'backup', 'prayer', 'simulate')
+
+
+def _out(text=''):
+    # pythonw / the frozen windowed exe has no console
+    if sys.stdout is not None:
+        print(text)
+
+
+def _err(text):
+    if sys.stderr is not None:
+        print(text, file=sys.stderr)
+
+
+def _format_value(value):
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _parse_value(raw):
+    """JSON literal if it parses (15, true, "x", [..]), otherwise the raw string"""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+# ---------- config ----------
+
+def cmd_config_list(manager, args):
+    for path, value in manager.snapshot().leaves():
+        suffix = "  (locked by policy)" if manager.is_locked(path) else ""
+        _out(f"{path} = {_format_value(value)}{suffix}")
+    return 0
+
+
+def cmd_config_get(manager, args):
+    snap = manager.snapshot()
+    if args.path not in snap:
+        _err(f"Unknown setting: {args.path}")
+        return 1
+    _out(_format_value(snap.get(args.path)))
+    return 0
+
+
+def cmd_config_set(manager, args):
+    snap = manager.snapshot()
+    if args.path not in snap or isinstance(snap.get(args.path), Mapping):
+        _err(f"Unknown setting: {args.path}")
+        return 1
+    if manager.is_locked(args.path):
+        _err(f"{args.path} is locked by the administrator policy ({manager.policy.path})")
+        return 1
+    try:
+        manager.set(args.path, _parse_value(args.value))
+    except ConfigError as e:
+        for path, msg in e.errors:
+            _err(f"Invalid value for {path}: {msg}")
+        return 1
+    if not manager.flush():
+        _err(f"Could not write {manager.settings_file}")
+        return 1
+    return 0
+
+
+# ---------- stats ----------
+
+def cmd_stats_show(manager, args):
+    stats = manager.get_stats()
+    if args.json:
+        _out(_format_value(stats))
+        return 0
+    _out(f"daily_count = {stats['daily_count']}")
+    _out(f"total_count = {stats['total_count']}")
+    _out(f"last_reset = {stats['last_reset'] or '-'}")
+    return 0
+
+
+def cmd_stats_reset(manager, args):
+    manager.store.reset_stats()
+    return 0
+
+
+# ---------- athkar ----------
+
+def cmd_athkar_list(manager, args):
+    athkar = manager.get_all_athkar()
+    if args.category:
+        athkar = [a for a in athkar if a.get('category', 'مخصص') == args.category]
+    if args.json:
+        _out(_format_value(athkar))
+        return 0
+    for thikr in athkar:
+        _out(f"{thikr['id']}\t{thikr.get('category', 'مخصص')}\t{thikr['text']}")
+    return 0
+
+
+def cmd_athkar_add(manager, args):
+    text = args.text.strip()
+    if not text:
+        _err("Thikr text must not be empty")
+        return 1
+    _out(manager.athkar.add(text, args.virtue, args.category))
+    return 0
+
+
+def cmd_athkar_favourite(manager, args):
+    try:
+        manager.athkar.set_favourite(args.id, not args.off)
+    except KeyError:
+        _err(f"No thikr with id {args.id}")
+        return 1
+    return 0
+
+
+# ---------- backup ----------
+
+def cmd_backup_list(manager, args):
+    for manifest in manager.backups.list():
+        _out(f"{manifest['id']}\t{manifest['created']}\t{', '.join(sorted(manifest['sections']))}")
+    return 0
+
+
+def cmd_backup_create(manager, args):
+    manifest = manager.backup(force=args.force)
+    _out(manifest['id'] if manifest else "unchanged since the last backup")
+    return 0
+
+
+def cmd_backup_restore(manager, args):
+    try:
+        manifest = manager.restore_backup(args.id)
+    except KeyError:
+        _err(f"No unique backup matches: {args.id or 'latest'}")
+        return 1
+    _out(f"restored {manifest['id']}")
+    return 0
+
+
+# ---------- prayer ----------
+
+def cmd_prayer_times(manager, args):
+    cfg = manager.config
+    prayers = compile_prayer_times(cfg.prayer)
+    if prayers is None:
+        _err("No location set: config set prayer.latitude / prayer.longitude first")
+        return 1
+    if args.date:
+        try:
+            first = datetime.strptime(args.date, '%Y-%m-%d').date()
+        except ValueError:
+            _err(f"Expected a date as YYYY-MM-DD, got {args.date!r}")
+            return 1
+    else:
+        first = get_now(cfg.timezone).date()
+    tz = get_app_timezone(cfg.timezone)
+    _out('date\t' + '\t'.join(TABLE_COLUMNS))
+    for offset in range(max(1, args.days)):
+        day = first + timedelta(days=offset)
+        times = prayers.times_on(day)
+        cells = [datetime.fromtimestamp(times[c], tz).strftime('%H:%M') if times[c] is not None else '-'
+                 for c in TABLE_COLUMNS]
+        _out(f"{day.isoformat()}\t" + '\t'.join(cells))
+    return 0
+
+
+# ---------- simulate ----------
+
+def _parse_local(raw, tz):
+    for fmt in ('%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(raw, fmt).replace(tzinfo=tz)
+        except ValueError:
+            pass
+    raise ValueError(f"Expected YYYY-MM-DD or YYYY-MM-DDTHH:MM, got {raw!r}")
+
+
+def cmd_simulate(manager, args):
+    """Replay the current settings (plus --set overrides) on a virtual clock"""
+    overrides = {}
+    for item in args.set or ():
+        path, sep, raw = item.partition('=')
+        if not sep or path not in manager.snapshot():
+            _err(f"Expected an existing PATH=VALUE, got {item!r}")
+            return 1
+        overrides[path] = _parse_value(raw)
+    tz = get_app_timezone(overrides.get('timezone', manager.config.timezone))
+    try:
+        start = _parse_local(args.start, tz) if args.start else None
+        suspends = [(_parse_local(t, tz), float(hours) * 3600) for t, hours in args.suspend or ()]
+        away = [(_parse_local(t, tz), float(minutes) * 60) for t, minutes in args.away or ()]
+        timeline = simulate(manager.snapshot().tree, overrides, max(1, args.days), start, suspends, away)
+    except ConfigError as e:
+        _err(f"Invalid setting: {e}")
+        return 1
+    except ValueError as e:
+        _err(str(e))
+        return 1
+    kinds = {}
+    for event in timeline:
+        kinds[event.kind] = kinds.get(event.kind, 0) + 1
+        if not args.summary and event.kind != 'counter':
+            detail = '' if event.detail is None else event.detail
+            _out(f"{event.time.strftime('%Y-%m-%d %H:%M:%S')}\t{event.kind}\t{detail}")
+    _out(', '.join(f"{kind}: {count}" for kind, count in sorted(kinds.items())))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='thikr', description="Thikr headless commands")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    config = commands.add_parser('config', help="read or change settings")
+    config_sub = config.add_subparsers(dest='action', metavar='action')
+    config_sub.required = True
+    p = config_sub.add_parser('list', help="print every setting")
+    p.set_defaults(func=cmd_config_list)
+    p = config_sub.add_parser('get', help="print one setting")
+    p.add_argument('path', help="dotted path, e.g. reminder.interval_minutes")
+    p.set_defaults(func=cmd_config_get)
+    p = config_sub.add_parser('set', help="change one setting")
+    p.add_argument('path', help="dotted path, e.g. reminder.interval_minutes")
+    p.add_argument('value', help="JSON value (15, true, \"08:00\"); bare words are strings")
+    p.set_defaults(func=cmd_config_set)
+
+    stats = commands.add_parser('stats', help="reminder statistics")
+    stats_sub = stats.add_subparsers(dest='action', metavar='action')
+    stats_sub.required = True
+    p = stats_sub.add_parser('show', help="print the counters")
+    p.add_argument('--json', action='store_true', help="machine-readable output")
+    p.set_defaults(func=cmd_stats_show)
+    p = stats_sub.add_parser('reset', help="zero the daily and total counters")
+    p.set_defaults(func=cmd_stats_reset)
+
+    athkar = commands.add_parser('athkar', help="list, add or favourite athkar")
+    athkar_sub = athkar.add_subparsers(dest='action', metavar='action')
+    athkar_sub.required = True
+    p = athkar_sub.add_parser('list', help="print default + custom athkar")
+    p.add_argument('--category', help="only this category")
+    p.add_argument('--json', action='store_true', help="machine-readable output")
+    p.set_defaults(func=cmd_athkar_list)
+    p = athkar_sub.add_parser('add', help="add a custom thikr")
+    p.add_argument('text')
+    p.add_argument('--virtue', default='', help="virtue / source text")
+    p.add_argument('--category', default='مخصص')
+    p.set_defaults(func=cmd_athkar_add)
+    p = athkar_sub.add_parser('favourite', help="mark a thikr as a favourite (see reminder.favourite_weight)")
+    p.add_argument('id', help="id as printed by 'athkar list', e.g. 8 or custom_2")
+    p.add_argument('--off', action='store_true', help="unmark it")
+    p.set_defaults(func=cmd_athkar_favourite)
+
+    backup = commands.add_parser('backup', help="snapshots of settings, athkar and statistics")
+    backup_sub = backup.add_subparsers(dest='action', metavar='action')
+    backup_sub.required = True
+    p = backup_sub.add_parser('list', help="print the stored snapshots, newest first")
+    p.set_defaults(func=cmd_backup_list)
+    p = backup_sub.add_parser('create', help="take a snapshot now")
+    p.add_argument('--force', action='store_true', help="even if nothing changed")
+    p.set_defaults(func=cmd_backup_create)
+    p = backup_sub.add_parser('restore', help="restore a snapshot (the newest by default)")
+    p.add_argument('id', nargs='?', help="snapshot id or a unique prefix of it")
+    p.set_defaults(func=cmd_backup_restore)
+
+    prayer = commands.add_parser('prayer', help="prayer times for the configured location")
+    prayer_sub = prayer.add_subparsers(dest='action', metavar='action')
+    prayer_sub.required = True
+    p = prayer_sub.add_parser('times', help="print the timetable (in the app's time zone)")
+    p.add_argument('--date', help="first day, YYYY-MM-DD (default: today)")
+    p.add_argument('--days', type=int, default=1, help="number of days")
+    p.set_defaults(func=cmd_prayer_times)
+
+    p = commands.add_parser('simulate', help="replay the reminder schedule on a virtual clock "
+                                              "(nothing is shown or saved)")
+    p.add_argument('--days', type=int, default=7, help="how long to replay")
+    p.add_argument('--start', help="YYYY-MM-DD[THH:MM] (default: today 00:00)")
+    p.add_argument('--set', action='append', metavar='PATH=VALUE',
+                   help="override a setting for this run, e.g. reminder.interval_minutes=30")
+    p.add_argument('--suspend', nargs=2, action='append', metavar=('WHEN', 'HOURS'),
+                   help="the PC sleeps at WHEN for HOURS")
+    p.add_argument('--away', nargs=2, action='append', metavar=('WHEN', 'MINUTES'),
+                   help="nobody at the PC from WHEN for MINUTES")
+    p.add_argument('--summary', action='store_true', help="only print the totals")
+    p.set_defaults(func=cmd_simulate)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    ensure_data_directory()
+    manager = SettingsManager()
+    try:
+        return args.func(manager, args)
+    finally:
+        manager.flush()
+        manager.store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
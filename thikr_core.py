@@ -0,0 +1,2524 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذِكْر - النواة (بدون واجهة رسومية)
+Thikr core - paths, logging, default content and the settings/data stores.
+
+This module must never import PyQt6: it is shared by the tray app
+(thikr.py) and the headless command line (thikr_cli.py), and importing it
+must have no side effects.
+"""
+
+import sys
+import os
+import re
+import json
+import copy
+import collections
+import sqlite3
+import hashlib
+import zlib
+import shutil
+import random
+import dataclasses
+import functools
+import threading
+import contextlib
+import tempfile
+import atexit
+from datetime import datetime, date, timedelta, timezone, time as dt_time
+from pathlib import Path
+from types import MappingProxyType
+from collections.abc import Mapping
+from typing import Optional, Tuple, get_origin
+
+from thikr_hijri import HijriCalendar, HIJRI_FIRST_YEAR, HIJRI_LAST_YEAR, occasions_on
+
+# Timezone support
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    # Fallback for Python < 3.9
+    try:
+        from backports.zoneinfo import ZoneInfo
+    except ImportError:
+        # If no timezone library available, create a simple UTC offset class
+        class ZoneInfo:
+            def __init__(self, tz_string):
+                # Simple UTC+3 implementation as fallback
+                self.offset = timedelta(hours=3)
+                self.name = tz_string
+
+            def utcoffset(self, dt):
+                return self.offset
+
+            def tzname(self, dt):
+                return self.name
+
+            def dst(self, dt):
+                return timedelta(0)
+
+# ============================================
+# الثوابت والمسارات
+# ============================================
+
+def get_base_path():
+    """الحصول على المسار الأساسي للتطبيق - يدعم التجميع والتطوير"""
+    if getattr(sys, 'frozen', False):
+        # تشغيل من ملف مجمّع (PyInstaller)
+        return Path(sys.executable).parent
+    return Path(__file__).parent.resolve()
+
+def get_appdata_path():
+    """الحصول على مسار AppData لحفظ بيانات المستخدم"""
+    # استخدام متغير البيئة APPDATA (أكثر موثوقية)
+    appdata = os.environ.get('APPDATA')
+    if appdata:
+        return Path(appdata) / "Thikr"
+    
+    # Fallback: استخدام مجلد المستخدم
+    try:
+        return Path.home() / "AppData" / "Roaming" / "Thikr"
+    except Exception:
+        # Fallback نهائي: المجلد الحالي
+        return get_base_path() / "data"
+
+APP_NAME = "ذِكْر"
+APP_VERSION = "1.0.0"
+APP_DIR = get_base_path()
+
+# بيانات المستخدم في AppData (تبقى عند تحديث التطبيق)
+DATA_DIR = get_appdata_path()
+
+# لا نحتاج مجلد sounds منفصل في النسخة المجمّعة
+SOUNDS_DIR = APP_DIR / "sounds"
+
+# إنشاء مجلد البيانات مع معالجة الأخطاء
+def ensure_data_directory():
+    """التأكد من وجود مجلد البيانات"""
+    try:
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        return True
+    except PermissionError:
+        print(f"تحذير: لا يمكن إنشاء مجلد البيانات في {DATA_DIR}")
+        return False
+    except Exception as e:
+        print(f"خطأ غير متوقع: {e}")
+        return False
+
+
+# ============================================
+# Simple Debug Logging (for troubleshooting)
+# ============================================
+
+LOG_FILE = DATA_DIR / "thikr_debug.log"
+DEBUG_ENABLED = True  # Set to False to disable logging
+
+def log_debug(message):
+    """Write debug message to log file"""
+    if not DEBUG_ENABLED:
+        return
+    try:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with open(LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write(f"[{timestamp}] {message}\n")
+    except:
+        pass
+
+def clear_old_logs():
+    """Clear log file if it gets too large (>1MB)"""
+    try:
+        if LOG_FILE.exists() and LOG_FILE.stat().st_size > 1024 * 1024:
+            LOG_FILE.unlink()
+    except:
+        pass
+
+
+# ============================================
+# Timezone Helper Functions
+# ============================================
+
+# UTC, UTC+3, UTC-4, UTC+5:30, UTC+05:45
+UTC_OFFSET_RE = re.compile(r'UTC(?:([+-])(\d{1,2})(?::(\d{2}))?)?')
+DEFAULT_TIMEZONE = timezone(timedelta(hours=3), name="UTC+3")
+TZ_TRANSITION_STEP = 86400  # Offset changes are found to the day, then bisected to the second
+
+
+def parse_timezone(tz_string):
+    """tzinfo for a fixed `UTC±H[:MM]` offset or an IANA name, or None"""
+    if not isinstance(tz_string, str):
+        return None
+    m = UTC_OFFSET_RE.fullmatch(tz_string.strip())
+    if m:
+        sign, hours, minutes = m.groups()
+        if sign is None:
+            return timezone.utc
+        offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        if offset > timedelta(hours=14) or int(minutes or 0) >= 60:
+            return None
+        return timezone(-offset if sign == '-' else offset, name=tz_string.strip())
+    try:
+        return ZoneInfo(tz_string)
+    except Exception:  # Unknown name, or no tz database (pip install tzdata)
+        return None
+
+
+def is_valid_timezone(tz_string):
+    return parse_timezone(tz_string) is not None
+
+
+@functools.lru_cache(maxsize=16)
+def get_app_timezone(tz_string="UTC+3"):
+    """Get the application timezone (default UTC+3); resolved once per string"""
+    tz = parse_timezone(tz_string)
+    if tz is None:
+        log_debug(f"Unknown timezone {tz_string!r}, using UTC+3")
+        return DEFAULT_TIMEZONE
+    return tz
+
+
+def get_now(tz_string="UTC+3", clock=None):
+    """Get current datetime with timezone awareness; `clock` (epoch seconds,
+    e.g. a simulation's virtual clock) stands in for the system clock"""
+    tz = get_app_timezone(tz_string)
+    if clock is not None:
+        return datetime.fromtimestamp(clock(), tz)
+    return datetime.now(tz)
+
+
+def _utcoffset_at(tz, t):
+    return datetime.fromtimestamp(t, tz).utcoffset()
+
+
+@functools.lru_cache(maxsize=8)
+def timezone_transitions(tz_string, year):
+    """Epoch seconds at which the UTC offset of `tz_string` changes during
+    `year` (DST starting/ending), earliest first; () for fixed offsets"""
+    tz = get_app_timezone(tz_string)
+    if isinstance(tz, timezone):
+        return ()
+    t = datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp()
+    transitions = []
+    offset = _utcoffset_at(tz, t)
+    while t < end:
+        step_end = min(t + TZ_TRANSITION_STEP, end)
+        new_offset = _utcoffset_at(tz, step_end)
+        if new_offset != offset:
+            lo, hi = t, step_end  # Offset at lo is the old one, at hi the new one
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if _utcoffset_at(tz, mid) == offset:
+                    lo = mid
+                else:
+                    hi = mid
+            transitions.append(hi)
+            offset = new_offset
+        t = step_end
+    return tuple(transitions)
+
+
+def next_timezone_transition(tz_string, t):
+    """The first UTC offset change of `tz_string` after epoch `t`, or None"""
+    year = datetime.fromtimestamp(t, timezone.utc).year
+    for y in (year, year + 1):
+        for transition in timezone_transitions(tz_string, y):
+            if transition > t:
+                return transition
+    return None
+
+
+# ============================================
+# الأذكار الافتراضية
+# ============================================
+
+DEFAULT_ATHKAR = [
+    {"id": 1, "text": "سُبْحَانَ اللَّهِ", "category": "تسبيح", "virtue": "من قال سبحان الله مائة مرة غفرت له ذنوبه"},
+    {"id": 2, "text": "الْحَمْدُ لِلَّهِ", "category": "تحميد", "virtue": "الحمد لله تملأ الميزان"},
+    {"id": 3, "text": "لَا إِلَٰهَ إِلَّا اللَّهُ", "category": "تهليل", "virtue": "أفضل ما قلت أنا والنبيون من قبلي"},
+    {"id": 4, "text": "اللَّهُ أَكْبَرُ", "category": "تكبير", "virtue": "كلمة عظيمة ثقيلة في الميزان"},
+    {"id": 5, "text": "سُبْحَانَ اللَّهِ وَبِحَمْدِهِ", "category": "تسبيح", "virtue": "من قالها مائة مرة حين يصبح وحين يمسي لم يأت أحد يوم القيامة بأفضل مما جاء به"},
+    {"id": 6, "text": "سُبْحَانَ اللَّهِ الْعَظِيمِ وَبِحَمْدِهِ", "category": "تسبيح", "virtue": "كلمتان خفيفتان على اللسان ثقيلتان في الميزان حبيبتان إلى الرحمن"},
+    {"id": 7, "text": "لَا حَوْلَ وَلَا قُوَّةَ إِلَّا بِاللَّهِ", "category": "حوقلة", "virtue": "كنز من كنوز الجنة"},
+    {"id": 8, "text": "أَسْتَغْفِرُ اللَّهَ الْعَظِيمَ وَأَتُوبُ إِلَيْهِ", "category": "استغفار", "virtue": "من لزم الاستغفار جعل الله له من كل هم فرجا"},
+    {"id": 9, "text": "اللَّهُمَّ صَلِّ وَسَلِّمْ عَلَى نَبِيِّنَا مُحَمَّدٍ", "category": "صلاة على النبي", "virtue": "من صلى علي صلاة صلى الله عليه بها عشرا"},
+    {"id": 10, "text": "لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "category": "تهليل", "virtue": "من قالها عشر مرات كان كمن أعتق أربعة أنفس من ولد إسماعيل"},
+    {"id": 11, "text": "سُبْحَانَ اللَّهِ، وَالْحَمْدُ لِلَّهِ، وَلَا إِلَٰهَ إِلَّا اللَّهُ، وَاللَّهُ أَكْبَرُ", "category": "الباقيات الصالحات", "virtue": "أحب الكلام إلى الله"},
+    {"id": 12, "text": "رَبِّ اغْفِرْ لِي وَتُبْ عَلَيَّ إِنَّكَ أَنْتَ التَّوَّابُ الرَّحِيمُ", "category": "استغفار", "virtue": "دعاء التوبة"},
+    {"id": 13, "text": "اللَّهُمَّ إِنِّي أَسْأَلُكَ الْعَفْوَ وَالْعَافِيَةَ", "category": "دعاء", "virtue": "ما سُئل الله شيئاً أحب إليه من العافية"},
+    {"id": 14, "text": "حَسْبُنَا اللَّهُ وَنِعْمَ الْوَكِيلُ", "category": "توكل", "virtue": "قالها إبراهيم حين ألقي في النار"},
+    {"id": 15, "text": "يَا حَيُّ يَا قَيُّومُ بِرَحْمَتِكَ أَسْتَغِيثُ", "category": "دعاء", "virtue": "دعاء الكرب"},
+    {"id": 16, "text": "رَبَّنَا آتِنَا فِي الدُّنْيَا حَسَنَةً وَفِي الْآخِرَةِ حَسَنَةً وَقِنَا عَذَابَ النَّارِ", "category": "دعاء قرآني", "virtue": "أكثر دعاء النبي ﷺ"},
+    {"id": 17, "text": "اللَّهُمَّ أَعِنِّي عَلَى ذِكْرِكَ وَشُكْرِكَ وَحُسْنِ عِبَادَتِكَ", "category": "دعاء", "virtue": "وصية النبي ﷺ لمعاذ"},
+    {"id": 18, "text": "رَبِّ زِدْنِي عِلْمًا", "category": "دعاء قرآني", "virtue": "دعاء طلب العلم"},
+    {"id": 19, "text": "بِسْمِ اللَّهِ الَّذِي لَا يَضُرُّ مَعَ اسْمِهِ شَيْءٌ فِي الْأَرْضِ وَلَا فِي السَّمَاءِ وَهُوَ السَّمِيعُ الْعَلِيمُ", "category": "حماية", "virtue": "من قالها ثلاثاً لم تصبه فجأة بلاء"},
+    {"id": 20, "text": "اللَّهُمَّ إِنِّي أَعُوذُ بِكَ مِنَ الْهَمِّ وَالْحَزَنِ", "category": "تعوذ", "virtue": "دعاء الهم والحزن"},
+]
+
+DEFAULT_SURAHS = [
+    {"id": 1, "name": "سورة الإخلاص", "number": 112, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "قُلْ هُوَ اللَّهُ أَحَدٌ", "اللَّهُ الصَّمَدُ", "لَمْ يَلِدْ وَلَمْ يُولَدْ", "وَلَمْ يَكُن لَّهُ كُفُوًا أَحَدٌ"], "virtue": "تعدل ثلث القرآن"},
+    {"id": 2, "name": "سورة الفلق", "number": 113, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "قُلْ أَعُوذُ بِرَبِّ الْفَلَقِ", "مِن شَرِّ مَا خَلَقَ", "وَمِن شَرِّ غَاسِقٍ إِذَا وَقَبَ", "وَمِن شَرِّ النَّفَّاثَاتِ فِي الْعُقَدِ", "وَمِن شَرِّ حَاسِدٍ إِذَا حَسَدَ"], "virtue": "المعوذتان"},
+    {"id": 3, "name": "سورة الناس", "number": 114, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "قُلْ أَعُوذُ بِرَبِّ النَّاسِ", "مَلِكِ النَّاسِ", "إِلَٰهِ النَّاسِ", "مِن شَرِّ الْوَسْوَاسِ الْخَنَّاسِ", "الَّذِي يُوَسْوِسُ فِي صُدُورِ النَّاسِ", "مِنَ الْجِنَّةِ وَالنَّاسِ"], "virtue": "المعوذتان"},
+    {"id": 4, "name": "سورة الفاتحة", "number": 1, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "الْحَمْدُ لِلَّهِ رَبِّ الْعَالَمِينَ", "الرَّحْمَٰنِ الرَّحِيمِ", "مَالِكِ يَوْمِ الدِّينِ", "إِيَّاكَ نَعْبُدُ وَإِيَّاكَ نَسْتَعِينُ", "اهْدِنَا الصِّرَاطَ الْمُسْتَقِيمَ", "صِرَاطَ الَّذِينَ أَنْعَمْتَ عَلَيْهِمْ غَيْرِ الْمَغْضُوبِ عَلَيْهِمْ وَلَا الضَّالِّينَ"], "virtue": "أعظم سورة في القرآن"},
+    {"id": 5, "name": "آية الكرسي", "number": 255, "verses": ["اللَّهُ لَا إِلَٰهَ إِلَّا هُوَ الْحَيُّ الْقَيُّومُ ۚ لَا تَأْخُذُهُ سِنَةٌ وَلَا نَوْمٌ ۚ لَّهُ مَا فِي السَّمَاوَاتِ وَمَا فِي الْأَرْضِ ۗ مَن ذَا الَّذِي يَشْفَعُ عِندَهُ إِلَّا بِإِذْنِهِ ۚ يَعْلَمُ مَا بَيْنَ أَيْدِيهِمْ وَمَا خَلْفَهُمْ ۖ وَلَا يُحِيطُونَ بِشَيْءٍ مِّنْ عِلْمِهِ إِلَّا بِمَا شَاءَ ۚ وَسِعَ كُرْسِيُّهُ السَّمَاوَاتِ وَالْأَرْضَ ۖ وَلَا يَئُودُهُ حِفْظُهُمَا ۚ وَهُوَ الْعَلِيُّ الْعَظِيمُ"], "virtue": "أعظم آية في القرآن"},
+    {"id": 6, "name": "سورة الكوثر", "number": 108, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "إِنَّا أَعْطَيْنَاكَ الْكَوْثَرَ", "فَصَلِّ لِرَبِّكَ وَانْحَرْ", "إِنَّ شَانِئَكَ هُوَ الْأَبْتَرُ"], "virtue": "أقصر سورة في القرآن"},
+    {"id": 7, "name": "سورة العصر", "number": 103, "verses": ["بِسْمِ اللَّهِ الرَّحْمَٰنِ الرَّحِيمِ", "وَالْعَصْرِ", "إِنَّ الْإِنسَانَ لَفِي خُسْرٍ", "إِلَّا الَّذِينَ آمَنُوا وَعَمِلُوا الصَّالِحَاتِ وَتَوَاصَوْا بِالْحَقِّ وَتَوَاصَوْا بِالصَّبْرِ"], "virtue": "لو تدبرها الناس لكفتهم"},
+]
+
+# ============================================
+# أذكار الصباح والمساء
+# ============================================
+
+MORNING_ATHKAR = [
+    {"id": 1, "text": "أَصْبَحْنَا وَأَصْبَحَ الْمُلْكُ لِلَّهِ، وَالْحَمْدُ لِلَّهِ، لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "repeat": 1, "virtue": ""},
+    {"id": 2, "text": "اللَّهُمَّ بِكَ أَصْبَحْنَا، وَبِكَ أَمْسَيْنَا، وَبِكَ نَحْيَا، وَبِكَ نَمُوتُ، وَإِلَيْكَ النُّشُورُ", "repeat": 1, "virtue": ""},
+    {"id": 3, "text": "اللَّهُمَّ أَنْتَ رَبِّي لَا إِلَٰهَ إِلَّا أَنْتَ، خَلَقْتَنِي وَأَنَا عَبْدُكَ، وَأَنَا عَلَىٰ عَهْدِكَ وَوَعْدِكَ مَا اسْتَطَعْتُ، أَعُوذُ بِكَ مِنْ شَرِّ مَا صَنَعْتُ، أَبُوءُ لَكَ بِنِعْمَتِكَ عَلَيَّ، وَأَبُوءُ بِذَنْبِي فَاغْفِرْ لِي فَإِنَّهُ لَا يَغْفِرُ الذُّنُوبَ إِلَّا أَنْتَ", "repeat": 1, "virtue": "سيد الاستغفار"},
+    {"id": 4, "text": "اللَّهُمَّ إِنِّي أَصْبَحْتُ أُشْهِدُكَ، وَأُشْهِدُ حَمَلَةَ عَرْشِكَ، وَمَلَائِكَتَكَ، وَجَمِيعَ خَلْقِكَ، أَنَّكَ أَنْتَ اللَّهُ لَا إِلَٰهَ إِلَّا أَنْتَ وَحْدَكَ لَا شَرِيكَ لَكَ، وَأَنَّ مُحَمَّدًا عَبْدُكَ وَرَسُولُكَ", "repeat": 4, "virtue": "من قالها أعتقه الله من النار"},
+    {"id": 5, "text": "اللَّهُمَّ مَا أَصْبَحَ بِي مِنْ نِعْمَةٍ أَوْ بِأَحَدٍ مِنْ خَلْقِكَ فَمِنْكَ وَحْدَكَ لَا شَرِيكَ لَكَ، فَلَكَ الْحَمْدُ وَلَكَ الشُّكْرُ", "repeat": 1, "virtue": "من قالها أدى شكر يومه"},
+    {"id": 6, "text": "اللَّهُمَّ عَافِنِي فِي بَدَنِي، اللَّهُمَّ عَافِنِي فِي سَمْعِي، اللَّهُمَّ عَافِنِي فِي بَصَرِي، لَا إِلَٰهَ إِلَّا أَنْتَ", "repeat": 3, "virtue": ""},
+    {"id": 7, "text": "اللَّهُمَّ إِنِّي أَعُوذُ بِكَ مِنَ الْكُفْرِ، وَالْفَقْرِ، وَأَعُوذُ بِكَ مِنْ عَذَابِ الْقَبْرِ، لَا إِلَٰهَ إِلَّا أَنْتَ", "repeat": 3, "virtue": ""},
+    {"id": 8, "text": "حَسْبِيَ اللَّهُ لَا إِلَٰهَ إِلَّا هُوَ عَلَيْهِ تَوَكَّلْتُ وَهُوَ رَبُّ الْعَرْشِ الْعَظِيمِ", "repeat": 7, "virtue": "من قالها كفاه الله ما أهمه"},
+    {"id": 9, "text": "بِسْمِ اللَّهِ الَّذِي لَا يَضُرُّ مَعَ اسْمِهِ شَيْءٌ فِي الْأَرْضِ وَلَا فِي السَّمَاءِ وَهُوَ السَّمِيعُ الْعَلِيمُ", "repeat": 3, "virtue": "لم يضره شيء"},
+    {"id": 10, "text": "رَضِيتُ بِاللَّهِ رَبًّا، وَبِالْإِسْلَامِ دِينًا، وَبِمُحَمَّدٍ صَلَّى اللَّهُ عَلَيْهِ وَسَلَّمَ نَبِيًّا", "repeat": 3, "virtue": "حق على الله أن يرضيه يوم القيامة"},
+    {"id": 11, "text": "سُبْحَانَ اللَّهِ وَبِحَمْدِهِ", "repeat": 100, "virtue": "حُطت خطاياه وإن كانت مثل زبد البحر"},
+    {"id": 12, "text": "لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ، وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "repeat": 10, "virtue": "كمن أعتق أربع رقاب"},
+    {"id": 13, "text": "اللَّهُمَّ صَلِّ وَسَلِّمْ عَلَى نَبِيِّنَا مُحَمَّدٍ", "repeat": 10, "virtue": "من صلى علي صلاة صلى الله عليه بها عشرا"},
+]
+
+EVENING_ATHKAR = [
+    {"id": 1, "text": "أَمْسَيْنَا وَأَمْسَى الْمُلْكُ لِلَّهِ، وَالْحَمْدُ لِلَّهِ، لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "repeat": 1, "virtue": ""},
+    {"id": 2, "text": "اللَّهُمَّ بِكَ أَمْسَيْنَا، وَبِكَ أَصْبَحْنَا، وَبِكَ نَحْيَا، وَبِكَ نَمُوتُ، وَإِلَيْكَ الْمَصِيرُ", "repeat": 1, "virtue": ""},
+    {"id": 3, "text": "اللَّهُمَّ أَنْتَ رَبِّي لَا إِلَٰهَ إِلَّا أَنْتَ، خَلَقْتَنِي وَأَنَا عَبْدُكَ، وَأَنَا عَلَىٰ عَهْدِكَ وَوَعْدِكَ مَا اسْتَطَعْتُ، أَعُوذُ بِكَ مِنْ شَرِّ مَا صَنَعْتُ، أَبُوءُ لَكَ بِنِعْمَتِكَ عَلَيَّ، وَأَبُوءُ بِذَنْبِي فَاغْفِرْ لِي فَإِنَّهُ لَا يَغْفِرُ الذُّنُوبَ إِلَّا أَنْتَ", "repeat": 1, "virtue": "سيد الاستغفار"},
+    {"id": 4, "text": "اللَّهُمَّ إِنِّي أَمْسَيْتُ أُشْهِدُكَ، وَأُشْهِدُ حَمَلَةَ عَرْشِكَ، وَمَلَائِكَتَكَ، وَجَمِيعَ خَلْقِكَ، أَنَّكَ أَنْتَ اللَّهُ لَا إِلَٰهَ إِلَّا أَنْتَ وَحْدَكَ لَا شَرِيكَ لَكَ، وَأَنَّ مُحَمَّدًا عَبْدُكَ وَرَسُولُكَ", "repeat": 4, "virtue": "من قالها أعتقه الله من النار"},
+    {"id": 5, "text": "اللَّهُمَّ مَا أَمْسَى بِي مِنْ نِعْمَةٍ أَوْ بِأَحَدٍ مِنْ خَلْقِكَ فَمِنْكَ وَحْدَكَ لَا شَرِيكَ لَكَ، فَلَكَ الْحَمْدُ وَلَكَ الشُّكْرُ", "repeat": 1, "virtue": "من قالها أدى شكر ليلته"},
+    {"id": 6, "text": "اللَّهُمَّ عَافِنِي فِي بَدَنِي، اللَّهُمَّ عَافِنِي فِي سَمْعِي، اللَّهُمَّ عَافِنِي فِي بَصَرِي، لَا إِلَٰهَ إِلَّا أَنْتَ", "repeat": 3, "virtue": ""},
+    {"id": 7, "text": "اللَّهُمَّ إِنِّي أَعُوذُ بِكَ مِنَ الْكُفْرِ، وَالْفَقْرِ، وَأَعُوذُ بِكَ مِنْ عَذَابِ الْقَبْرِ، لَا إِلَٰهَ إِلَّا أَنْتَ", "repeat": 3, "virtue": ""},
+    {"id": 8, "text": "حَسْبِيَ اللَّهُ لَا إِلَٰهَ إِلَّا هُوَ عَلَيْهِ تَوَكَّلْتُ وَهُوَ رَبُّ الْعَرْشِ الْعَظِيمِ", "repeat": 7, "virtue": "من قالها كفاه الله ما أهمه"},
+    {"id": 9, "text": "بِسْمِ اللَّهِ الَّذِي لَا يَضُرُّ مَعَ اسْمِهِ شَيْءٌ فِي الْأَرْضِ وَلَا فِي السَّمَاءِ وَهُوَ السَّمِيعُ الْعَلِيمُ", "repeat": 3, "virtue": "لم يضره شيء"},
+    {"id": 10, "text": "رَضِيتُ بِاللَّهِ رَبًّا، وَبِالْإِسْلَامِ دِينًا، وَبِمُحَمَّدٍ صَلَّى اللَّهُ عَلَيْهِ وَسَلَّمَ نَبِيًّا", "repeat": 3, "virtue": "حق على الله أن يرضيه يوم القيامة"},
+    {"id": 11, "text": "أَعُوذُ بِكَلِمَاتِ اللَّهِ التَّامَّاتِ مِنْ شَرِّ مَا خَلَقَ", "repeat": 3, "virtue": "لم يضره شيء تلك الليلة"},
+    {"id": 12, "text": "سُبْحَانَ اللَّهِ وَبِحَمْدِهِ", "repeat": 100, "virtue": "حُطت خطاياه وإن كانت مثل زبد البحر"},
+    {"id": 13, "text": "لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ، وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "repeat": 10, "virtue": "كمن أعتق أربع رقاب"},
+    {"id": 14, "text": "اللَّهُمَّ صَلِّ وَسَلِّمْ عَلَى نَبِيِّنَا مُحَمَّدٍ", "repeat": 10, "virtue": "من صلى علي صلاة صلى الله عليه بها عشرا"},
+]
+
+
+# ============================================
+# أذكار المناسبات (Occasions, see thikr_hijri.OCCASION_RULES)
+# ============================================
+
+# While an occasion applies its athkar join the random pool (with OCCASION_WEIGHT
+# times their category weight) and its surahs, if any, replace the surah pool
+OCCASION_CONTENT = {
+    'friday': {
+        'athkar': [
+            {"id": "occasion_friday", "text": "اللَّهُمَّ صَلِّ وَسَلِّمْ عَلَى نَبِيِّنَا مُحَمَّدٍ", "category": "مناسبات", "virtue": "يوم الجمعة: فأكثروا عليّ من الصلاة فيه، فإن صلاتكم معروضة عليّ"},
+        ],
+        'surahs': [
+            {"id": "occasion_kahf", "name": "سورة الكهف", "number": 18, "verses": ["تذكير بقراءة سورة الكهف يوم الجمعة"], "virtue": "من قرأ سورة الكهف يوم الجمعة أضاء له من النور ما بين الجمعتين"},
+        ],
+    },
+    'ramadan': {
+        'athkar': [
+            {"id": "occasion_iftar", "text": "ذَهَبَ الظَّمَأُ، وَابْتَلَّتِ الْعُرُوقُ، وَثَبَتَ الْأَجْرُ إِنْ شَاءَ اللَّهُ", "category": "مناسبات", "virtue": "دعاء الإفطار"},
+        ],
+    },
+    'ramadan_last_ten': {
+        'athkar': [
+            {"id": "occasion_qadr", "text": "اللَّهُمَّ إِنَّكَ عَفُوٌّ تُحِبُّ الْعَفْوَ فَاعْفُ عَنِّي", "category": "مناسبات", "virtue": "دعاء ليلة القدر"},
+        ],
+    },
+    'dhul_hijjah_ten': {
+        'athkar': [
+            {"id": "occasion_takbir", "text": "اللَّهُ أَكْبَرُ اللَّهُ أَكْبَرُ، لَا إِلَٰهَ إِلَّا اللَّهُ، وَاللَّهُ أَكْبَرُ اللَّهُ أَكْبَرُ، وَلِلَّهِ الْحَمْدُ", "category": "مناسبات", "virtue": "ما من أيام العمل الصالح فيها أحب إلى الله من هذه الأيام العشر"},
+        ],
+    },
+    'arafah': {
+        'athkar': [
+            {"id": "occasion_arafah", "text": "لَا إِلَٰهَ إِلَّا اللَّهُ وَحْدَهُ لَا شَرِيكَ لَهُ، لَهُ الْمُلْكُ وَلَهُ الْحَمْدُ، وَهُوَ عَلَىٰ كُلِّ شَيْءٍ قَدِيرٌ", "category": "مناسبات", "virtue": "خير الدعاء دعاء يوم عرفة"},
+        ],
+    },
+    'ayyam_al_bid': {
+        'athkar': [
+            {"id": "occasion_bid", "text": "تذكير بصيام الأيام البيض: الثالث عشر والرابع عشر والخامس عشر من الشهر الهجري", "category": "مناسبات", "virtue": "صوم ثلاثة أيام من كل شهر صوم الدهر كله"},
+        ],
+    },
+}
+OCCASION_WEIGHT = 5
+
+
+# ============================================
+# الثيمات
+# ============================================
+
+THEMES = {
+    "cyberpunk_dark": {
+        "name": "سايبربنك داكن",
+        "background": "#0a0a0f",
+        "bg_gradient": ["#0a0a0f", "#1a1a2e", "#0f0f1a"],
+        "text": "#00ffff",
+        "accent": "#ff00ff",
+        "secondary": "#00ff88",
+        "border": "#00ffff",
+        "glow": "#00ffff"
+    },
+    "cyberpunk_neon": {
+        "name": "نيون متوهج",
+        "background": "#0d0221",
+        "bg_gradient": ["#0d0221", "#150734", "#0d0221"],
+        "text": "#f72585",
+        "accent": "#7209b7",
+        "secondary": "#4cc9f0",
+        "border": "#f72585",
+        "glow": "#f72585"
+    },
+    "islamic_gold": {
+        "name": "ذهبي إسلامي",
+        "background": "#1a1a2e",
+        "bg_gradient": ["#1a1a2e", "#16213e", "#0f0f23"],
+        "text": "#ffd700",
+        "accent": "#daa520",
+        "secondary": "#f4e4bc",
+        "border": "#ffd700",
+        "glow": "#ffd700"
+    },
+    "ocean_depth": {
+        "name": "أعماق المحيط",
+        "background": "#0c1821",
+        "bg_gradient": ["#0c1821", "#1b2838", "#0c1821"],
+        "text": "#4fc3f7",
+        "accent": "#0288d1",
+        "secondary": "#81d4fa",
+        "border": "#4fc3f7",
+        "glow": "#4fc3f7"
+    },
+    "emerald_night": {
+        "name": "ليل زمردي",
+        "background": "#0a1612",
+        "bg_gradient": ["#0a1612", "#1a2f28", "#0a1612"],
+        "text": "#50fa7b",
+        "accent": "#00d26a",
+        "secondary": "#98fb98",
+        "border": "#50fa7b",
+        "glow": "#50fa7b"
+    },
+    "royal_purple": {
+        "name": "بنفسجي ملكي",
+        "background": "#1a0a2e",
+        "bg_gradient": ["#1a0a2e", "#2d1b4e", "#1a0a2e"],
+        "text": "#bb86fc",
+        "accent": "#9c27b0",
+        "secondary": "#e1bee7",
+        "border": "#bb86fc",
+        "glow": "#bb86fc"
+    },
+    "sunset_warm": {
+        "name": "غروب دافئ",
+        "background": "#1a0f0a",
+        "bg_gradient": ["#1a0f0a", "#2d1810", "#1a0f0a"],
+        "text": "#ff7043",
+        "accent": "#ff5722",
+        "secondary": "#ffab91",
+        "border": "#ff7043",
+        "glow": "#ff7043"
+    },
+    "minimal_light": {
+        "name": "فاتح بسيط",
+        "background": "#f5f5f5",
+        "bg_gradient": ["#ffffff", "#f5f5f5", "#eeeeee"],
+        "text": "#1a1a1a",
+        "accent": "#2196f3",
+        "secondary": "#666666",
+        "border": "#cccccc",
+        "glow": "#2196f3",
+        "is_light": True
+    },
+    "clean_white": {
+        "name": "أبيض نظيف",
+        "background": "#ffffff",
+        "bg_gradient": ["#ffffff", "#fafafa", "#f5f5f5"],
+        "text": "#212121",
+        "accent": "#1976d2",
+        "secondary": "#757575",
+        "border": "#e0e0e0",
+        "glow": "#1976d2",
+        "is_light": True
+    },
+    "soft_cream": {
+        "name": "كريمي ناعم",
+        "background": "#fffef5",
+        "bg_gradient": ["#fffef5", "#faf8f0", "#f5f3eb"],
+        "text": "#3e2723",
+        "accent": "#8d6e63",
+        "secondary": "#6d4c41",
+        "border": "#d7ccc8",
+        "glow": "#8d6e63",
+        "is_light": True
+    },
+    "mint_fresh": {
+        "name": "نعناعي منعش",
+        "background": "#f1f8f6",
+        "bg_gradient": ["#f1f8f6", "#e8f5e9", "#e0f2f1"],
+        "text": "#1b5e20",
+        "accent": "#2e7d32",
+        "secondary": "#4caf50",
+        "border": "#a5d6a7",
+        "glow": "#4caf50",
+        "is_light": True
+    },
+    "sky_blue": {
+        "name": "سماوي صافي",
+        "background": "#f0f8ff",
+        "bg_gradient": ["#f0f8ff", "#e3f2fd", "#e1f5fe"],
+        "text": "#0d47a1",
+        "accent": "#1565c0",
+        "secondary": "#1976d2",
+        "border": "#90caf9",
+        "glow": "#2196f3",
+        "is_light": True
+    },
+    "rose_light": {
+        "name": "وردي فاتح",
+        "background": "#fff5f5",
+        "bg_gradient": ["#fff5f5", "#fce4ec", "#f8bbd9"],
+        "text": "#880e4f",
+        "accent": "#c2185b",
+        "secondary": "#e91e63",
+        "border": "#f48fb1",
+        "glow": "#e91e63",
+        "is_light": True
+    }
+}
+
+
+# ============================================
+# مدير الإعدادات
+# ============================================
+
+SETTINGS_SCHEMA_VERSION = 2
+
+DEFAULT_SETTINGS = {
+    "schema_version": SETTINGS_SCHEMA_VERSION,
+    "reminder": {
+        "enabled": True,
+        "interval_minutes": 1,  # Default to 1 minute
+        "order": "shuffle",  # shuffle: each once per cycle / random (see no_repeat) / sequential
+        "no_repeat": 3,  # random order: not one of the last N again
+        "category_weights": [],  # Relative weights per category, see CATEGORY_WEIGHT_DEFAULTS
+        "favourite_weight": 3,  # Favourite athkar come up this many times as often
+        "show_virtue": True,
+        "quiet_hours": {
+            "enabled": False, "start": "23:00", "end": "06:00",  # Every night
+            "windows": [],     # More quiet windows, see QUIET_WINDOW_DEFAULTS
+            "exceptions": []   # Dated overrides, see QUIET_EXCEPTION_DEFAULTS
+        },
+        "catch_up": "one",  # After sleep/suspend: drop / one / digest of missed reminders
+        "min_gap_minutes": 0,  # Minimum time between any two popups
+        "streams": [],  # Extra reminder streams, see STREAM_DEFAULTS
+        "busy_calendar": {
+            "file": "",       # Local .ics file whose events hold reminders back
+            "mode": "defer"   # defer: show once the event ends; suppress: skip
+        },
+        "idle": {
+            "threshold_minutes": 5,  # Away after this long without input; held until back (0 = off)
+            "snooze_minutes": 10     # The popup's snooze button brings it back this much later
+        }
+    },
+    "surah_reminder": {
+        "enabled": True,
+        "interval_days": 3,
+        "last_shown": None
+    },
+    "morning_evening": {
+        "enabled": True,
+        "morning_time": "06:00",
+        "evening_time": "18:00",
+        "grace_minutes": 120,  # Still start a session this long after its time (machine was off)
+        "last_morning": None,  # Date of the last session started automatically
+        "last_evening": None
+    },
+    "prayer": {
+        "latitude": None,    # Degrees north, e.g. 24.7136 (Riyadh); null = no prayer times
+        "longitude": None,   # Degrees east, e.g. 46.6753
+        "method": "Makkah",  # Calculation method, see PRAYER_METHODS
+        "asr_factor": 1      # Asr shadow length: 1 = standard, 2 = Hanafi
+    },
+    "hijri": {
+        "occasions": True,   # Friday / Ramadan / Dhul Hijjah / Ayyam al-Bid content
+        "adjust_days": 0,    # Shift the tabular calendar to match local sighting
+        "month_starts": []   # Announced month starts, see HIJRI_MONTH_START_DEFAULTS
+    },
+    "popup": {
+        "theme": "cyberpunk_dark",
+        "position": "bottom_right",
+        "width": 450,
+        "height": 220,
+        "duration_seconds": 8,
+        "font_family": "Amiri",
+        "font_size": 20,
+        "opacity": 0.95,
+        "border_radius": 15
+    },
+    "sound": {
+        "enabled": True,
+        "volume": 30
+    },
+    "power": {
+        "low_power": False  # Fewer, coarser timer wakeups (battery); slightly choppier progress bar
+    },
+    "timezone": "UTC+3",  # Default timezone
+    "first_run_complete": False  # Track if first run setup is done
+}
+
+POPUP_POSITIONS = ('top_left', 'top_right', 'top_center', 'bottom_left',
+                   'bottom_right', 'bottom_center', 'center')
+CATCH_UP_POLICIES = ('drop', 'one', 'digest')
+ATHKAR_ORDERS = ('shuffle', 'random', 'sequential')
+BUSY_MODES = ('defer', 'suppress')
+
+# A reminder stream (an item of reminder.streams), e.g.
+#   {"name": "friday", "kind": "schedule", "days": ["fri"], "times": ["10:00"], "source": "surah"}
+#   {"name": "duaa", "kind": "interval", "interval_minutes": 90, "category": "دعاء"}
+#   {"name": "after_maghrib", "kind": "prayer", "prayers": ["maghrib"], "offset_minutes": 15}
+STREAM_DEFAULTS = {
+    "name": "",
+    "enabled": True,
+    "kind": "interval",      # interval: every N minutes; schedule: on days/times
+    "interval_minutes": 60,
+    "days": [],              # schedule weekdays (mon..sun); empty = every day
+    "times": [],             # schedule times, HH:MM
+    "prayers": [],           # prayer: after these prayers (fajr..isha); empty = all five
+    "offset_minutes": 10,    # prayer: minutes after the prayer time (negative = before)
+    "source": "athkar",      # athkar / surah
+    "category": "",          # only athkar of this category ('' = any)
+    "ids": [],               # only these athkar ids ("5", "custom_3"); empty = any
+}
+# Quiet windows on some weekdays; a window with end < start runs past midnight (equal: one minute)
+#   {"days": ["fri"], "start": "11:30", "end": "13:30"}
+QUIET_WINDOW_DEFAULTS = {"days": [], "start": "23:00", "end": "06:00"}
+# Dated exceptions (holidays, Ramadan nights): quiet (or, with "quiet": false,
+# not quiet) between start and end on each day from start_date to end_date;
+# start == end covers the whole day
+#   {"start_date": "2026-02-18", "end_date": "2026-03-19", "start": "20:00", "end": "04:00"}
+QUIET_EXCEPTION_DEFAULTS = {"start_date": None, "end_date": None, "start": "00:00", "end": "00:00",
+                            "quiet": True}
+# An officially announced start of a Hijri month, overriding the tabular calendar
+#   {"year": 1447, "month": 9, "start": "2026-02-18"}
+HIJRI_MONTH_START_DEFAULTS = {"year": 1447, "month": 1, "start": None}
+# How often a category's athkar come up relative to the rest (1; 0 = never)
+#   {"category": "استغفار", "weight": 2}
+CATEGORY_WEIGHT_DEFAULTS = {"category": "", "weight": 1}
+STREAM_KINDS = ('interval', 'schedule', 'prayer')
+STREAM_SOURCES = ('athkar', 'surah')
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+PRAYER_NAMES = ('fajr', 'dhuhr', 'asr', 'maghrib', 'isha')
+PRAYER_METHODS = ('MWL', 'ISNA', 'Egypt', 'Makkah', 'Karachi')
+
+
+# ============================================
+# نموذج الإعدادات (Typed configuration model)
+# ============================================
+
+class ConfigError(ValueError):
+    """Settings failed validation; `errors` is a list of (path, message)"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("; ".join(f"{path}: {msg}" for path, msg in self.errors))
+
+
+@dataclasses.dataclass(frozen=True)
+class QuietWindowConfig:
+    __slots__ = ('days', 'start', 'end')
+    days: Tuple[str, ...]
+    start: dt_time
+    end: dt_time
+
+
+@dataclasses.dataclass(frozen=True)
+class QuietExceptionConfig:
+    __slots__ = ('start_date', 'end_date', 'start', 'end', 'quiet')
+    start_date: Optional[date]
+    end_date: Optional[date]
+    start: dt_time
+    end: dt_time
+    quiet: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class QuietHoursConfig:
+    __slots__ = ('enabled', 'start', 'end', 'windows', 'exceptions')
+    enabled: bool
+    start: dt_time
+    end: dt_time
+    windows: Tuple[QuietWindowConfig, ...]
+    exceptions: Tuple[QuietExceptionConfig, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class BusyCalendarConfig:
+    __slots__ = ('file', 'mode')
+    file: str
+    mode: str
+
+
+@dataclasses.dataclass(frozen=True)
+class IdleConfig:
+    __slots__ = ('threshold_minutes', 'snooze_minutes')
+    threshold_minutes: int
+    snooze_minutes: int
+
+
+@dataclasses.dataclass(frozen=True)
+class CategoryWeightConfig:
+    __slots__ = ('category', 'weight')
+    category: str
+    weight: int
+
+
+@dataclasses.dataclass(frozen=True)
+class StreamConfig:
+    __slots__ = ('name', 'enabled', 'kind', 'interval_minutes', 'days', 'times', 'prayers',
+                 'offset_minutes', 'source', 'category', 'ids')
+    name: str
+    enabled: bool
+    kind: str
+    interval_minutes: int
+    days: Tuple[str, ...]
+    times: Tuple[dt_time, ...]
+    prayers: Tuple[str, ...]
+    offset_minutes: int
+    source: str
+    category: str
+    ids: Tuple[str, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class ReminderConfig:
+    __slots__ = ('enabled', 'interval_minutes', 'order', 'no_repeat', 'category_weights',
+                 'favourite_weight', 'show_virtue', 'quiet_hours', 'catch_up', 'min_gap_minutes',
+                 'streams', 'busy_calendar', 'idle')
+    enabled: bool
+    interval_minutes: int
+    order: str
+    no_repeat: int
+    category_weights: Tuple[CategoryWeightConfig, ...]
+    favourite_weight: int
+    show_virtue: bool
+    quiet_hours: QuietHoursConfig
+    catch_up: str
+    min_gap_minutes: int
+    streams: Tuple[StreamConfig, ...]
+    busy_calendar: BusyCalendarConfig
+    idle: IdleConfig
+
+
+@dataclasses.dataclass(frozen=True)
+class SurahReminderConfig:
+    __slots__ = ('enabled', 'interval_days', 'last_shown')
+    enabled: bool
+    interval_days: int
+    last_shown: Optional[datetime]
+
+
+@dataclasses.dataclass(frozen=True)
+class MorningEveningConfig:
+    __slots__ = ('enabled', 'morning_time', 'evening_time', 'grace_minutes',
+                 'last_morning', 'last_evening')
+    enabled: bool
+    morning_time: dt_time
+    evening_time: dt_time
+    grace_minutes: int
+    last_morning: Optional[date]
+    last_evening: Optional[date]
+
+
+@dataclasses.dataclass(frozen=True)
+class PrayerConfig:
+    __slots__ = ('latitude', 'longitude', 'method', 'asr_factor')
+    latitude: Optional[float]
+    longitude: Optional[float]
+    method: str
+    asr_factor: int
+
+
+@dataclasses.dataclass(frozen=True)
+class HijriMonthStartConfig:
+    __slots__ = ('year', 'month', 'start')
+    year: int
+    month: int
+    start: Optional[date]
+
+
+@dataclasses.dataclass(frozen=True)
+class HijriConfig:
+    __slots__ = ('occasions', 'adjust_days', 'month_starts')
+    occasions: bool
+    adjust_days: int
+    month_starts: Tuple[HijriMonthStartConfig, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class PopupConfig:
+    __slots__ = ('theme', 'position', 'width', 'height', 'duration_seconds',
+                 'font_family', 'font_size', 'opacity', 'border_radius')
+    theme: str
+    position: str
+    width: int
+    height: int
+    duration_seconds: int
+    font_family: str
+    font_size: int
+    opacity: float
+    border_radius: int
+
+
+@dataclasses.dataclass(frozen=True)
+class SoundConfig:
+    __slots__ = ('enabled', 'volume')
+    enabled: bool
+    volume: int
+
+
+@dataclasses.dataclass(frozen=True)
+class PowerConfig:
+    __slots__ = ('low_power',)
+    low_power: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class AppConfig:
+    __slots__ = ('schema_version', 'reminder', 'surah_reminder', 'morning_evening',
+                 'prayer', 'hijri', 'popup', 'sound', 'power', 'timezone', 'first_run_complete')
+    schema_version: int
+    reminder: ReminderConfig
+    surah_reminder: SurahReminderConfig
+    morning_evening: MorningEveningConfig
+    prayer: PrayerConfig
+    hijri: HijriConfig
+    popup: PopupConfig
+    sound: SoundConfig
+    power: PowerConfig
+    timezone: str
+    first_run_complete: bool
+
+
+# Range / choice / predicate constraints beyond the field type (mirrors the settings UI)
+CONFIG_CONSTRAINTS = {
+    'reminder.interval_minutes': (1, 1440),
+    'reminder.order': ATHKAR_ORDERS,
+    'reminder.no_repeat': (0, 50),
+    'reminder.category_weights[].weight': (0, 10),
+    'reminder.favourite_weight': (1, 10),
+    'reminder.catch_up': CATCH_UP_POLICIES,
+    'reminder.min_gap_minutes': (0, 1440),
+    'reminder.streams[].kind': STREAM_KINDS,
+    'reminder.streams[].interval_minutes': (1, 10080),
+    'reminder.streams[].days[]': WEEKDAYS,
+    'reminder.streams[].source': STREAM_SOURCES,
+    'reminder.streams[].prayers[]': PRAYER_NAMES,
+    'reminder.streams[].offset_minutes': (-120, 240),
+    'reminder.quiet_hours.windows[].days[]': WEEKDAYS,
+    'reminder.busy_calendar.mode': BUSY_MODES,
+    'reminder.idle.threshold_minutes': (0, 120),
+    'reminder.idle.snooze_minutes': (1, 120),
+    'surah_reminder.interval_days': (1, 30),
+    'morning_evening.grace_minutes': (0, 720),
+    'prayer.latitude': (-90.0, 90.0),
+    'prayer.longitude': (-180.0, 180.0),
+    'prayer.method': PRAYER_METHODS,
+    'prayer.asr_factor': (1, 2),
+    'hijri.adjust_days': (-2, 2),
+    'hijri.month_starts[].year': (HIJRI_FIRST_YEAR, HIJRI_LAST_YEAR),
+    'hijri.month_starts[].month': (1, 12),
+    'popup.theme': tuple(THEMES),
+    'popup.position': POPUP_POSITIONS,
+    'popup.width': (300, 800),
+    'popup.height': (150, 400),
+    'popup.duration_seconds': (3, 60),
+    'popup.font_size': (14, 36),
+    'popup.opacity': (0.5, 1.0),
+    'popup.border_radius': (0, 50),
+    'sound.volume': (0, 100),
+    'timezone': is_valid_timezone,
+}
+
+
+# Defaults for the items of list-of-object fields
+LIST_ITEM_DEFAULTS = {
+    StreamConfig: STREAM_DEFAULTS,
+    QuietWindowConfig: QUIET_WINDOW_DEFAULTS,
+    QuietExceptionConfig: QUIET_EXCEPTION_DEFAULTS,
+    HijriMonthStartConfig: HIJRI_MONTH_START_DEFAULTS,
+    CategoryWeightConfig: CATEGORY_WEIGHT_DEFAULTS,
+}
+
+
+def _list_item_type(kind):
+    """X for a Tuple[X, ...] field type, else None"""
+    return kind.__args__[0] if get_origin(kind) is tuple else None
+
+
+def _coerce_field(kind, value, path):
+    """Validate one raw JSON value against its field type; returns the typed value"""
+    item_kind = _list_item_type(kind)
+    if item_kind is not None:
+        if not isinstance(value, (list, tuple)):
+            raise ValueError(f"expected a list, got {value!r}")
+        items = []
+        for i, item in enumerate(value):
+            try:
+                items.append(_coerce_field(item_kind, item, f"{path}[{i}]"))
+            except ValueError as e:
+                raise ValueError(f"item {i}: {e}") from None
+        return tuple(items)
+    if kind is bool:
+        if not isinstance(value, bool):
+            raise ValueError(f"expected true/false, got {value!r}")
+    elif kind is int:
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"expected an integer, got {value!r}")
+    elif kind is float:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"expected a number, got {value!r}")
+        value = float(value)
+    elif kind is str:
+        if not isinstance(value, str):
+            raise ValueError(f"expected a string, got {value!r}")
+    elif kind is dt_time:
+        try:
+            value = datetime.strptime(value, '%H:%M').time()
+        except (TypeError, ValueError):
+            raise ValueError(f"expected a time as HH:MM, got {value!r}") from None
+    elif kind == Optional[datetime]:
+        if value is not None:
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"expected an ISO timestamp or null, got {value!r}") from None
+    elif kind == Optional[date]:
+        if value is not None:
+            try:
+                value = datetime.strptime(value, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                raise ValueError(f"expected a date as YYYY-MM-DD or null, got {value!r}") from None
+    elif kind == Optional[str]:
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"expected a string or null, got {value!r}")
+    elif kind == Optional[float]:
+        if value is not None:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"expected a number or null, got {value!r}")
+            value = float(value)
+
+    # Constraints on list items are keyed without the index: streams[].kind
+    rule = CONFIG_CONSTRAINTS.get(re.sub(r'\[\d+\]', '[]', path))
+    if rule is None or value is None:
+        return value
+    if callable(rule):
+        if not rule(value):
+            raise ValueError(f"{value!r} is not recognised")
+    elif kind in (int, float, Optional[float]):
+        lo, hi = rule
+        if (lo is not None and value < lo) or (hi is not None and value > hi):
+            raise ValueError(f"{value!r} is out of range [{lo}, {'' if hi is None else hi}]")
+    elif value not in rule:
+        raise ValueError(f"{value!r} is not one of {', '.join(rule)}")
+    return value
+
+
+def _build_config(cls, tree, defaults, prefix, errors):
+    """Build `cls` from `tree`, recording (path, message) for each invalid
+    field and falling back to the default value for it."""
+    values = {}
+    for f in dataclasses.fields(cls):
+        path = prefix + f.name
+        raw = tree.get(f.name, defaults.get(f.name))
+        if dataclasses.is_dataclass(f.type):
+            if not isinstance(raw, Mapping):
+                errors.append((path, f"expected an object, got {raw!r}"))
+                raw = {}
+            values[f.name] = _build_config(f.type, raw, defaults[f.name], path + '.', errors)
+            continue
+        item_cls = _list_item_type(f.type)
+        if item_cls is not None and dataclasses.is_dataclass(item_cls):
+            if not isinstance(raw, (list, tuple)):
+                errors.append((path, f"expected a list, got {raw!r}"))
+                raw = ()
+            items = []
+            for i, item in enumerate(raw):
+                if not isinstance(item, Mapping):
+                    errors.append((f"{path}[{i}]", f"expected an object, got {item!r}"))
+                    continue
+                items.append(_build_config(item_cls, item, LIST_ITEM_DEFAULTS[item_cls],
+                                           f"{path}[{i}].", errors))
+            values[f.name] = tuple(items)
+            continue
+        try:
+            values[f.name] = _coerce_field(f.type, raw, path)
+        except ValueError as e:
+            errors.append((path, str(e)))
+            values[f.name] = _coerce_field(f.type, defaults.get(f.name), path)
+    return cls(**values)
+
+
+def build_config(tree):
+    """Validate a settings tree; returns (AppConfig, [(path, message), ...])"""
+    errors = []
+    config = _build_config(AppConfig, tree, DEFAULT_SETTINGS, '', errors)
+    return config, errors
+
+
+def _migrate_v0_to_v1(data):
+    """v0 (unversioned): `statistics` -> `stats`, volume 0..1 -> percent"""
+    legacy_stats = data.pop('statistics', None)
+    if isinstance(legacy_stats, dict) and 'stats' not in data:
+        data['stats'] = {k: legacy_stats[k] for k in ('daily_count', 'total_count', 'last_reset')
+                         if k in legacy_stats}
+    sound = data.get('sound')
+    if isinstance(sound, dict) and isinstance(sound.get('volume'), float) and sound['volume'] <= 1.0:
+        sound['volume'] = int(round(sound['volume'] * 100))
+    return data
+
+
+def _migrate_v1_to_v2(data):
+    """v1: reminder.random_order (bool) -> reminder.order"""
+    reminder = data.get('reminder')
+    if isinstance(reminder, dict) and 'random_order' in reminder:
+        reminder.setdefault('order', 'shuffle' if reminder.pop('random_order') else 'sequential')
+    return data
+
+
+# Ordered: SETTINGS_MIGRATIONS[n] upgrades a version-n file to version n+1
+SETTINGS_MIGRATIONS = [
+    _migrate_v0_to_v1,
+    _migrate_v1_to_v2,
+]
+
+
+def migrate_settings(data):
+    """Bring a saved settings dict up to SETTINGS_SCHEMA_VERSION.
+    Returns (data, migrated) where `migrated` is True if anything ran."""
+    version = data.get('schema_version', 0)
+    if not isinstance(version, int) or version < 0:
+        raise ConfigError([('schema_version', f"invalid schema version {version!r}")])
+    if version > SETTINGS_SCHEMA_VERSION:
+        log_debug(f"Settings schema v{version} is newer than supported v{SETTINGS_SCHEMA_VERSION}")
+        return data, False
+    for step in SETTINGS_MIGRATIONS[version:]:
+        data = step(data)
+    data['schema_version'] = SETTINGS_SCHEMA_VERSION
+    return data, version != SETTINGS_SCHEMA_VERSION
+
+
+# Changes are kept in memory and written to disk at most once per window
+SETTINGS_FLUSH_DELAY = 2.0  # seconds
+
+
+class SettingsTransaction:
+    """In-memory overlay on top of a SettingsManager.
+
+    Changes are staged with set()/update() and are visible through this
+    object's get()/config/get_theme() (read-through to the manager for
+    everything else), so it can be handed to a ReminderPopup for preview.
+    commit() publishes all staged changes as one snapshot (one write);
+    rollback() discards them without touching the disk. Used as a context
+    manager it commits on success and rolls back on an exception.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.changes = {}
+        self._base = None
+        self._view = None
+
+    def set(self, path, value):
+        self.changes[path] = value
+        self._view = None
+
+    def update(self, changes):
+        self.changes.update(changes)
+        self._view = None
+
+    def snapshot(self):
+        """Base snapshot with the staged changes applied (cached until either changes)"""
+        base = self.manager.snapshot()
+        if self._view is None or base is not self._base:
+            self._base = base
+            changes = self.manager.unlocked_changes(self.changes)
+            self._view = base.assoc(changes) if changes else base
+        return self._view
+
+    def get(self, path, default=None):
+        return self.snapshot().get(path, default)
+
+    @property
+    def config(self):
+        return self.snapshot().config
+
+    def get_theme(self):
+        return THEMES[self.config.popup.theme]
+
+    def commit(self):
+        if self.changes:
+            self.manager.set_many(self.changes)
+        self.rollback()
+
+    def rollback(self):
+        self.changes = {}
+        self._base = None
+        self._view = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+
+def _freeze(value):
+    """Deep-freeze a JSON-like value: dicts -> read-only mappings, lists -> tuples"""
+    if isinstance(value, MappingProxyType):
+        return value  # Already frozen (only ever created by _freeze)
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _assoc_in(node, keys, value):
+    """Copy-on-write update: return a new frozen tree with `keys` set to `value`.
+    Only the mappings along the path are copied; every other subtree is shared."""
+    items = dict(node) if isinstance(node, Mapping) else {}
+    head = keys[0]
+    if len(keys) == 1:
+        items[head] = _freeze(value)
+    else:
+        items[head] = _assoc_in(items.get(head), keys[1:], value)
+    return MappingProxyType(items)
+
+
+def _json_default(obj):
+    """Let json.dump serialize frozen snapshot mappings"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def write_file_atomic(path, data):
+    """temp file + fsync + rename, so a crash never leaves a truncated file"""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=path.name + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SettingsSnapshot:
+    """Immutable, published view of the settings.
+
+    Readers (e.g. the reminder thread) grab one snapshot and read from it
+    without locks; writers build a new snapshot and swap it in atomically,
+    so a reader never observes a half-applied update.
+    """
+    __slots__ = ('tree', 'config', '_flat')
+
+    def __init__(self, tree, config=None):
+        self.tree = _freeze(tree)
+        if config is None:
+            config, errors = build_config(self.tree)
+            if errors:
+                raise ConfigError(errors)
+        # Typed view for hot-path reads (attribute access instead of path lookups)
+        self.config = config
+        # Every dotted path -> value, so get() is a single dict lookup
+        flat = {}
+        stack = [('', self.tree)]
+        while stack:
+            prefix, node = stack.pop()
+            for k, v in node.items():
+                path = prefix + k
+                flat[path] = v
+                if isinstance(v, Mapping):
+                    stack.append((path + '.', v))
+        self._flat = flat
+
+    def get(self, path, default=None):
+        return self._flat.get(path, default)
+
+    def __contains__(self, path):
+        return path in self._flat
+
+    def leaves(self):
+        """(path, value) for every non-mapping setting, sorted by path"""
+        return sorted((p, v) for p, v in self._flat.items() if not isinstance(v, Mapping))
+
+    def assoc(self, changes):
+        """New snapshot with each dotted path in `changes` set to its value"""
+        tree = self.tree
+        for path, value in changes.items():
+            tree = _assoc_in(tree, path.split('.'), value)
+        return SettingsSnapshot(tree)
+
+    def without(self, keys):
+        """New snapshot with the given top-level keys removed"""
+        return SettingsSnapshot({k: v for k, v in self.tree.items() if k not in keys}, self.config)
+
+    def diff(self, other):
+        """Leaf paths whose value differs in `other`: {path: (old, new)}.
+        Subtrees shared between the two snapshots are skipped by identity."""
+        changed = {}
+        stack = [('', self.tree, other.tree)]
+        while stack:
+            prefix, old_node, new_node = stack.pop()
+            for k in old_node.keys() | new_node.keys():
+                old, new = old_node.get(k), new_node.get(k)
+                if old is new:
+                    continue
+                path = prefix + k
+                old_map, new_map = isinstance(old, Mapping), isinstance(new, Mapping)
+                if old_map and new_map:
+                    stack.append((path + '.', old, new))
+                    continue
+                if old != new:
+                    changed[path] = (old, new)
+                # A subtree that appeared or went away: each of its leaves changed too
+                if old_map:
+                    stack.append((path + '.', old, {}))
+                elif new_map:
+                    stack.append((path + '.', {}, new))
+        return changed
+
+
+def _subscription_keys(path):
+    """Patterns that match `path`: itself, every ancestor + '.*', and '*'"""
+    keys = [path, '*']
+    parts = path.split('.')
+    for i in range(1, len(parts)):
+        keys.append('.'.join(parts[:i]) + '.*')
+    return keys
+
+
+# ============================================
+# مخزن بيانات المستخدم (SQLite)
+# ============================================
+
+USER_DATA_DB = "user_data.db"
+USER_DATA_SCHEMA_VERSION = 2
+# Meta keys of the athkar selectors (+ order + pool, e.g. selection.shuffle.all).
+# Rewritten after every reminder, so they stay out of backups
+SELECTION_META_PREFIX = 'selection.'
+
+# Keys that used to live in user_settings.json and are now kept in the store
+LEGACY_USER_DATA_KEYS = ('custom_athkar', 'modified_athkar', 'deleted_default_athkar', 'stats')
+
+
+class UserDataStore:
+    """Athkar edits and statistics in a local SQLite database (WAL mode).
+
+    Every edit or counter bump is a single small transaction instead of a
+    rewrite of the whole settings file. The connection is shared between the
+    GUI and reminder threads and serialized by a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.persistent = True
+        try:
+            self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error as e:
+            # Keep the app usable; callers must not drop the legacy JSON copy
+            log_debug(f"Cannot open user data store {path}: {e}; using an in-memory store")
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+            self.persistent = False
+        self._conn.row_factory = sqlite3.Row
+        # WAL + NORMAL never corrupts the database on power loss
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        self._create_schema()
+
+    def _create_schema(self):
+        # executescript() manages its own transaction; the DDL is idempotent
+        with self._lock:
+            c = self._conn
+            c.executescript("""
+                CREATE TABLE IF NOT EXISTS custom_athkar (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    text TEXT NOT NULL,
+                    virtue TEXT NOT NULL DEFAULT '',
+                    category TEXT NOT NULL DEFAULT 'مخصص'
+                );
+                CREATE TABLE IF NOT EXISTS modified_athkar (
+                    default_id INTEGER PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    virtue TEXT NOT NULL DEFAULT '',
+                    category TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS deleted_athkar (
+                    default_id INTEGER PRIMARY KEY
+                );
+                CREATE TABLE IF NOT EXISTS favourite_athkar (
+                    thikr_id TEXT PRIMARY KEY
+                );
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+            c.execute(f"PRAGMA user_version={USER_DATA_SCHEMA_VERSION}")
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Serialized BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error)"""
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                yield c
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            c.execute("COMMIT")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def data_version(self):
+        """Changes whenever another connection (another process) commits"""
+        return self._query("PRAGMA data_version")[0][0]
+
+    # --- meta ---
+
+    def get_meta(self, key, default=None):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]['value'] if rows else default
+
+    def set_meta(self, key, value):
+        with self.transaction() as c:
+            c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # --- athkar edits ---
+
+    def custom_athkar(self):
+        """Custom athkar in insertion order: [{'id', 'text', 'virtue', 'category'}]"""
+        return [dict(r) for r in self._query(
+            "SELECT id, text, virtue, category FROM custom_athkar ORDER BY id")]
+
+    def add_custom_athkar(self, text, virtue='', category='مخصص'):
+        with self.transaction() as c:
+            cur = c.execute("INSERT INTO custom_athkar (text, virtue, category) VALUES (?, ?, ?)",
+                            (text, virtue, category))
+            return cur.lastrowid
+
+    def update_custom_athkar(self, thikr_id, text, virtue, category):
+        with self.transaction() as c:
+            c.execute("UPDATE custom_athkar SET text = ?, virtue = ?, category = ? WHERE id = ?",
+                      (text, virtue, category, thikr_id))
+
+    def delete_custom_athkar(self, thikr_id):
+        with self.transaction() as c:
+            c.execute("DELETE FROM custom_athkar WHERE id = ?", (thikr_id,))
+
+    def modified_athkar(self):
+        """Edits to default athkar: {default_id: {'text', 'virtue', 'category'}}"""
+        return {r['default_id']: {'text': r['text'], 'virtue': r['virtue'], 'category': r['category']}
+                for r in self._query("SELECT * FROM modified_athkar")}
+
+    def modify_default_athkar(self, default_id, text, virtue, category):
+        with self.transaction() as c:
+            c.execute("INSERT OR REPLACE INTO modified_athkar (default_id, text, virtue, category) "
+                      "VALUES (?, ?, ?, ?)", (default_id, text, virtue, category))
+
+    def deleted_default_athkar(self):
+        return {r['default_id'] for r in self._query("SELECT default_id FROM deleted_athkar")}
+
+    def delete_default_athkar(self, default_id):
+        with self.transaction() as c:
+            c.execute("INSERT OR IGNORE INTO deleted_athkar (default_id) VALUES (?)", (default_id,))
+
+    def favourite_athkar(self):
+        """Ids (as strings: '3', 'custom_2') of the athkar marked as favourites"""
+        return {r['thikr_id'] for r in self._query("SELECT thikr_id FROM favourite_athkar")}
+
+    def set_favourite(self, thikr_id, favourite=True):
+        with self.transaction() as c:
+            if favourite:
+                c.execute("INSERT OR IGNORE INTO favourite_athkar (thikr_id) VALUES (?)", (str(thikr_id),))
+            else:
+                c.execute("DELETE FROM favourite_athkar WHERE thikr_id = ?", (str(thikr_id),))
+
+    # --- statistics ---
+
+    def get_stats(self):
+        counters = {r['name']: r['value'] for r in self._query("SELECT name, value FROM counters")}
+        return {
+            'daily_count': counters.get('daily_count', 0),
+            'total_count': counters.get('total_count', 0),
+            'last_reset': self.get_meta('stats.last_reset'),
+        }
+
+    def increment_counter(self, today):
+        """Bump daily/total counters (daily resets on a new day); returns (daily, total)"""
+        with self.transaction() as c:
+            row = c.execute("SELECT value FROM meta WHERE key = 'stats.last_reset'").fetchone()
+            if row is None or row['value'] != today:
+                c.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('daily_count', 0)")
+                c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stats.last_reset', ?)", (today,))
+            for name in ('daily_count', 'total_count'):
+                c.execute("INSERT INTO counters (name, value) VALUES (?, 1) "
+                          "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+            counts = dict(c.execute("SELECT name, value FROM counters "
+                                    "WHERE name IN ('daily_count', 'total_count')").fetchall())
+        return counts['daily_count'], counts['total_count']
+
+    def reset_stats(self):
+        with self.transaction() as c:
+            c.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('daily_count', 0)")
+            c.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('total_count', 0)")
+
+    # --- backup / restore ---
+
+    def export_data(self):
+        """The whole store as plain, canonically ordered data (see BackupStore)"""
+        with self.transaction() as c:
+            return {
+                'custom_athkar': [dict(r) for r in c.execute(
+                    "SELECT id, text, virtue, category FROM custom_athkar ORDER BY id")],
+                'modified_athkar': [dict(r) for r in c.execute(
+                    "SELECT default_id, text, virtue, category FROM modified_athkar ORDER BY default_id")],
+                'deleted_athkar': [r['default_id'] for r in c.execute(
+                    "SELECT default_id FROM deleted_athkar ORDER BY default_id")],
+                'favourite_athkar': [r['thikr_id'] for r in c.execute(
+                    "SELECT thikr_id FROM favourite_athkar ORDER BY thikr_id")],
+                'counters': {r['name']: r['value'] for r in c.execute("SELECT name, value FROM counters")},
+                'meta': {r['key']: r['value'] for r in c.execute(
+                    "SELECT key, value FROM meta WHERE substr(key, 1, ?) != ?",
+                    (len(SELECTION_META_PREFIX), SELECTION_META_PREFIX))},
+            }
+
+    def import_data(self, data):
+        """Replace the whole store with an export_data() result"""
+        with self.transaction() as c:
+            for table in ('custom_athkar', 'modified_athkar', 'deleted_athkar', 'favourite_athkar',
+                          'counters'):
+                c.execute(f"DELETE FROM {table}")
+            # Selection state is not in backups: carry on with the current cycles
+            c.execute("DELETE FROM meta WHERE substr(key, 1, ?) != ?",
+                      (len(SELECTION_META_PREFIX), SELECTION_META_PREFIX))
+            c.executemany("INSERT INTO custom_athkar (id, text, virtue, category) VALUES (?, ?, ?, ?)",
+                          [(a['id'], a['text'], a.get('virtue', ''), a.get('category', 'مخصص'))
+                           for a in data.get('custom_athkar', ())])
+            c.executemany("INSERT INTO modified_athkar (default_id, text, virtue, category) "
+                          "VALUES (?, ?, ?, ?)",
+                          [(m['default_id'], m['text'], m.get('virtue', ''), m.get('category', 'مخصص'))
+                           for m in data.get('modified_athkar', ())])
+            c.executemany("INSERT INTO deleted_athkar (default_id) VALUES (?)",
+                          [(i,) for i in data.get('deleted_athkar', ())])
+            c.executemany("INSERT INTO favourite_athkar (thikr_id) VALUES (?)",
+                          [(i,) for i in data.get('favourite_athkar', ())])
+            c.executemany("INSERT INTO counters (name, value) VALUES (?, ?)",
+                          list(data.get('counters', {}).items()))
+            c.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                          [(k, v) for k, v in data.get('meta', {}).items()
+                           if not k.startswith(SELECTION_META_PREFIX)])
+
+    # --- one-time import ---
+
+    def import_legacy(self, tree):
+        """Copy athkar edits and stats out of an old user_settings.json tree.
+        Runs once per database; returns True once the data lives in the store."""
+        if self.get_meta('legacy_import_done'):
+            return True
+        custom = tree.get('custom_athkar') or ()
+        modified = tree.get('modified_athkar') or {}
+        deleted = tree.get('deleted_default_athkar') or ()
+        stats = tree.get('stats') or {}
+        with self.transaction() as c:
+            c.executemany(
+                "INSERT INTO custom_athkar (text, virtue, category) VALUES (?, ?, ?)",
+                [(a.get('text', ''), a.get('virtue', ''), a.get('category', 'مخصص'))
+                 for a in custom if isinstance(a, Mapping) and a.get('text')])
+            c.executemany(
+                "INSERT OR REPLACE INTO modified_athkar (default_id, text, virtue, category) "
+                "VALUES (?, ?, ?, ?)",
+                [(int(k), m.get('text', ''), m.get('virtue', ''), m.get('category', 'مخصص'))
+                 for k, m in modified.items() if str(k).isdigit() and isinstance(m, Mapping)])
+            c.executemany("INSERT OR IGNORE INTO deleted_athkar (default_id) VALUES (?)",
+                          [(int(i),) for i in deleted if str(i).isdigit()])
+            for name in ('daily_count', 'total_count'):
+                value = stats.get(name, 0)
+                if isinstance(value, int) and not isinstance(value, bool):
+                    c.execute("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, value))
+            if stats.get('last_reset'):
+                c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stats.last_reset', ?)",
+                          (str(stats['last_reset']),))
+            c.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_import_done', ?)",
+                      (datetime.now().isoformat(),))
+        log_debug(f"Imported {len(custom)} custom athkar, {len(modified)} edits, "
+                  f"{len(deleted)} deletions and stats into {self.path}")
+        return True
+
+
+# ============================================
+# فهرس الأذكار (Athkar catalog)
+# ============================================
+
+NO_REPEAT_TRIES = 8  # random order: draws before giving up on avoiding a recent thikr
+
+
+class AliasTable:
+    """Walker's alias method: O(n) to build, then O(1) per weighted draw"""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        prob = [w * n / total for w in weights]
+        alias = list(range(n))
+        small = [i for i, p in enumerate(prob) if p < 1]
+        large = [i for i, p in enumerate(prob) if p >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            alias[s] = l
+            prob[l] -= 1 - prob[s]
+            (small if prob[l] < 1 else large).append(l)
+        for i in small + large:  # Rounding leftovers are full columns
+            prob[i] = 1.0
+        self.prob = prob
+        self.alias = alias
+
+    def draw(self):
+        i = random.randrange(len(self.prob))
+        return i if random.random() < self.prob[i] else self.alias[i]
+
+
+class WeightedPool:
+    """Items with integer weights (0 leaves one out) under a stable `name`.
+
+    Random draws go through an alias table; a shuffle bag takes every item
+    `weight` times per cycle. Both are built on first use and live as long
+    as the pool, i.e. until the catalog or the weights change.
+    """
+    __slots__ = ('name', 'items', 'weights', '_alias', '_bag')
+
+    def __init__(self, name, items, weights):
+        kept = [(item, w) for item, w in zip(items, weights) if w > 0]
+        self.name = name
+        self.items = tuple(item for item, _ in kept)
+        self.weights = tuple(w for _, w in kept)
+        self._alias = None
+        self._bag = None
+
+    def __len__(self):
+        return len(self.items)
+
+    def draw(self):
+        if self._alias is None:
+            self._alias = AliasTable(self.weights)
+        return self.items[self._alias.draw()]
+
+    @property
+    def bag(self):
+        if self._bag is None:
+            self._bag = tuple(item for item, w in zip(self.items, self.weights) for _ in range(w))
+        return self._bag
+
+
+class SequentialSelector:
+    """The pool in catalog order, wrapping around (weights only leave items
+    out). State: the cursor"""
+
+    def __init__(self, state=None):
+        self.cursor = int(state) if state and state.isdigit() else 0
+
+    def next(self, pool):
+        items = pool.items
+        self.cursor %= len(items)
+        item = items[self.cursor]
+        self.cursor += 1
+        return item
+
+    def state(self):
+        return str(self.cursor)
+
+
+class ShuffleBag:
+    """Every item `weight` times per cycle, in a new random order each cycle.
+
+    The order is a permutation drawn from a seed, so the state is just
+    'seed:cursor:size' and the permutation is rebuilt once per cycle (or
+    restart) rather than stored. A changed bag size starts a new cycle.
+    """
+
+    def __init__(self, state=None):
+        try:
+            self.seed, self.cursor, self.size = (int(x) for x in state.split(':'))
+        except (AttributeError, ValueError):
+            self.seed, self.cursor, self.size = None, 0, 0
+        self._order = None
+
+    def _permutation(self, seed):
+        order = list(range(self.size))
+        random.Random(seed).shuffle(order)
+        return order
+
+    def next(self, pool):
+        bag = pool.bag
+        if self.seed is None or len(bag) != self.size or self.cursor >= self.size:
+            last = bag[self._order[-1]]['id'] if self._order and len(bag) == self.size else None
+            self.size, self.cursor = len(bag), 0
+            # No repeat across the cycle boundary either; by id, as a weighted
+            # item fills several slots of the bag
+            distinct = len({item['id'] for item in bag}) > 1
+            while True:
+                self.seed = random.getrandbits(32)
+                self._order = self._permutation(self.seed)
+                if not distinct or bag[self._order[0]]['id'] != last:
+                    break
+        elif self._order is None:
+            self._order = self._permutation(self.seed)
+        item = bag[self._order[self.cursor]]
+        self.cursor += 1
+        return item
+
+    def state(self):
+        return f"{self.seed}:{self.cursor}:{self.size}"
+
+
+class RandomSelector:
+    """Weighted draws, avoiding the last `window` items (by id) as far as
+    NO_REPEAT_TRIES draws allow. State: the recent ids"""
+
+    def __init__(self, window, state=None):
+        self.recent = collections.deque(state.split(',') if state else (), maxlen=window)
+
+    def next(self, pool):
+        recent = self.recent
+        for _ in range(NO_REPEAT_TRIES):
+            item = pool.draw()
+            if str(item['id']) not in recent:
+                break
+        if recent.maxlen:
+            recent.append(str(item['id']))
+        return item
+
+    def state(self):
+        return ','.join(self.recent)
+
+
+class AthkarCatalog:
+    """Default athkar (minus deletions, with edits applied) and custom athkar,
+    merged once and indexed by id and by category, plus the selection of
+    athkar and surahs for the reminders.
+
+    Edits go through add() / update() / delete() / set_favourite(), which
+    write the store and patch the indexes in place of a rebuild. Changes
+    from another process (the CLI) are noticed through the store's
+    data_version on the next read; reload() picks up a restored backup.
+    Indexes and pools are replaced, never mutated, so the reminder thread
+    reads them without a lock while the settings window edits. Items are
+    shared: treat them as read-only.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        # (order, no_repeat, pool name) -> (selector, meta key); kept across reloads
+        self._selectors = {}
+        # (category weights, favourite weight) as last passed to choice()
+        self._weights = ((), 1)
+        self._category_weights = {}
+        self.reload()
+
+    def reload(self):
+        with self._lock:
+            self._version = self.store.data_version()
+            deleted = self.store.deleted_default_athkar()
+            modified = self.store.modified_athkar()
+            by_id = {}
+            for thikr in DEFAULT_ATHKAR:
+                if thikr['id'] not in deleted:
+                    by_id[str(thikr['id'])] = dict(thikr, is_custom=False, **modified.get(thikr['id'], {}))
+            for thikr in self.store.custom_athkar():
+                thikr_id = f"custom_{thikr['id']}"
+                by_id[thikr_id] = dict(thikr, id=thikr_id, is_custom=True)
+            self._by_id = by_id
+            self._favourites = frozenset(self.store.favourite_athkar())
+            self._by_category = {}
+            self._reindex(set(_category(a) for a in by_id.values()))
+
+    def _reindex(self, categories):
+        """Rebuild the indexes an edit touched: the whole list and `categories`"""
+        self._all = tuple(self._by_id.values())
+        by_category = dict(self._by_category)
+        for category in categories:
+            pool = tuple(a for a in self._all if _category(a) == category)
+            if pool:
+                by_category[category] = pool
+            else:
+                by_category.pop(category, None)
+        self._by_category = by_category
+        # Weighted pools are built on first use; replaced, not cleared, for lock-free readers
+        self._pools = {}
+
+    def _sync(self):
+        if self.store.data_version() != self._version:
+            log_debug("Athkar changed by another process; reloading the catalog")
+            self.reload()
+
+    # --- reading ---
+
+    def all(self):
+        """Every thikr, defaults first, in display order"""
+        self._sync()
+        return self._all
+
+    def get(self, thikr_id):
+        """The thikr with this id (1, '1' or 'custom_3'), or None"""
+        return self._by_id.get(str(thikr_id))
+
+    def by_category(self, category):
+        self._sync()
+        return self._by_category.get(category, ())
+
+    def categories(self):
+        return sorted(self._by_category)
+
+    def is_favourite(self, thikr_id):
+        return str(thikr_id) in self._favourites
+
+    # --- selection ---
+
+    def set_weights(self, category_weights=(), favourite_weight=1):
+        """Weights from the settings (CategoryWeightConfig items); the pools are
+        rebuilt only when they differ from the last ones"""
+        weights = (tuple(category_weights), favourite_weight)
+        if weights != self._weights:
+            self._weights = weights
+            self._category_weights = {w.category: w.weight for w in category_weights}
+            self._pools = {}
+
+    def _weight(self, thikr):
+        weight = self._category_weights.get(_category(thikr), 1)
+        if str(thikr['id']) in self._favourites:
+            weight *= self._weights[1]
+        return weight
+
+    def choice(self, category='', ids=(), occasions=(), order='random', no_repeat=0):
+        """Next thikr from `category` and/or `ids` (a frozenset or tuple of
+        string ids), or from the whole catalog with the `occasions`' athkar
+        weighted in; an empty filter falls back to the whole catalog.
+        Category weights and favourites (see set_weights) apply throughout."""
+        self._sync()
+        key = (category, ids, occasions)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = self._athkar_pool(category, ids, occasions)
+        return self._pick(pool, order, no_repeat) if pool else DEFAULT_ATHKAR[0]
+
+    def _athkar_pool(self, category, ids, occasions):
+        if ids:
+            items = [a for a in (self._by_id.get(str(i)) for i in ids)
+                     if a is not None and (not category or _category(a) == category)]
+            name = f"ids:{','.join(sorted(ids))}"
+        else:
+            items = self._by_category.get(category, ()) if category else ()
+            name = f"category:{category}"
+        pool = WeightedPool(name, items, [self._weight(a) for a in items])
+        if pool:
+            return pool
+        extra = [a for occasion in occasions for a in OCCASION_CONTENT[occasion].get('athkar', ())]
+        return WeightedPool('all', self._all + tuple(extra),
+                            [self._weight(a) for a in self._all] +
+                            [self._weight(a) * OCCASION_WEIGHT for a in extra])
+
+    def surah(self, occasions=(), order='random', no_repeat=0):
+        """Next surah; an occasion's surahs (Al-Kahf on Friday) take the place
+        of the usual ones"""
+        key = ('surahs', occasions)
+        pool = self._pools.get(key)
+        if pool is None:
+            surahs = [s for name in occasions for s in OCCASION_CONTENT[name].get('surahs', ())]
+            name = f"surahs:{','.join(occasions)}" if surahs else 'surahs'
+            surahs = surahs or DEFAULT_SURAHS
+            pool = self._pools[key] = WeightedPool(name, surahs, [1] * len(surahs))
+        return self._pick(pool, order, no_repeat) if pool else None
+
+    def _pick(self, pool, order, no_repeat):
+        """`order` is one of ATHKAR_ORDERS. The selector's state is saved in
+        the store's meta table after each pick, so a restart carries on with
+        the cycle; a pick is O(1) whatever the size of the pool."""
+        with self._lock:
+            key = (order, no_repeat, pool.name)
+            cached = self._selectors.get(key)
+            if cached is None:
+                meta_key = f"{SELECTION_META_PREFIX}{order}.{pool.name}"
+                state = self.store.get_meta(meta_key)
+                if order == 'shuffle':
+                    selector = ShuffleBag(state)
+                elif order == 'sequential':
+                    selector = SequentialSelector(state)
+                else:
+                    selector = RandomSelector(no_repeat, state)
+                cached = self._selectors[key] = (selector, meta_key)
+            selector, meta_key = cached
+            item = selector.next(pool)
+            self.store.set_meta(meta_key, selector.state())
+        return item
+
+    # --- edits ---
+
+    def add(self, text, virtue='', category='مخصص'):
+        """New custom thikr; returns its catalog id ('custom_<n>')"""
+        with self._lock:
+            row_id = self.store.add_custom_athkar(text, virtue, category)
+            thikr_id = f"custom_{row_id}"
+            self._by_id[thikr_id] = {'id': thikr_id, 'text': text, 'virtue': virtue,
+                                     'category': category, 'is_custom': True}
+            self._reindex({category})
+        return thikr_id
+
+    def update(self, thikr_id, text, virtue, category):
+        with self._lock:
+            old = self._item(thikr_id)
+            if old['is_custom']:
+                self.store.update_custom_athkar(_custom_row_id(old['id']), text, virtue, category)
+            else:
+                self.store.modify_default_athkar(old['id'], text, virtue, category)
+            self._by_id[str(old['id'])] = dict(old, text=text, virtue=virtue, category=category)
+            self._reindex({_category(old), category})
+
+    def delete(self, thikr_id):
+        with self._lock:
+            old = self._item(thikr_id)
+            if old['is_custom']:
+                self.store.delete_custom_athkar(_custom_row_id(old['id']))
+            else:
+                self.store.delete_default_athkar(old['id'])
+            self.store.set_favourite(old['id'], False)
+            self._favourites = self._favourites - {str(old['id'])}
+            del self._by_id[str(old['id'])]
+            self._reindex({_category(old)})
+
+    def set_favourite(self, thikr_id, favourite=True):
+        with self._lock:
+            thikr_id = str(self._item(thikr_id)['id'])
+            self.store.set_favourite(thikr_id, favourite)
+            if favourite:
+                self._favourites = self._favourites | {thikr_id}
+            else:
+                self._favourites = self._favourites - {thikr_id}
+            self._pools = {}
+
+    def _item(self, thikr_id):
+        thikr = self._by_id.get(str(thikr_id))
+        if thikr is None:
+            raise KeyError(thikr_id)
+        return thikr
+
+
+def _category(thikr):
+    return thikr.get('category') or 'مخصص'
+
+
+def _custom_row_id(thikr_id):
+    return int(str(thikr_id)[len('custom_'):])
+
+
+# ============================================
+# Backups
+# ============================================
+
+BACKUP_DIR = "backups"
+BACKUP_KEEP_RECENT = 10    # newest snapshots, always kept
+BACKUP_KEEP_DAILY = 30     # plus the newest snapshot of each of the last N days
+BACKUP_KEEP_MONTHLY = 24   # plus the newest snapshot of each of the last N months
+
+
+class BackupStore:
+    """Rolling, content-addressed snapshots of the user's data.
+
+    Each section of a snapshot (the settings tree, the SQLite store export)
+    is serialized canonically and kept once in objects/ under its SHA-256;
+    a snapshot is a small manifest in snapshots/ naming one object per
+    section. Snapshotting unchanged data writes nothing, and sections that
+    did not change are shared between snapshots, so long histories cost
+    one copy of each distinct state rather than one copy per snapshot.
+    """
+
+    def __init__(self, root, keep_recent=BACKUP_KEEP_RECENT, keep_daily=BACKUP_KEEP_DAILY,
+                 keep_monthly=BACKUP_KEEP_MONTHLY):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.snapshots_dir = self.root / "snapshots"
+        self.keep_recent = keep_recent
+        self.keep_daily = keep_daily
+        self.keep_monthly = keep_monthly
+        self._lock = threading.Lock()
+        self._last_sections = None  # sections of the newest snapshot, once read
+
+    @staticmethod
+    def _encode(data):
+        return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'),
+                          default=_json_default).encode('utf-8')
+
+    def _object_path(self, digest):
+        return self.objects_dir / digest[:2] / digest
+
+    def _put(self, payload):
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_file_atomic(path, zlib.compress(payload, 9))
+        return digest
+
+    def _get(self, digest):
+        payload = zlib.decompress(self._object_path(digest).read_bytes())
+        if hashlib.sha256(payload).hexdigest() != digest:
+            raise ValueError(f"Backup object {digest} is corrupt")
+        return json.loads(payload.decode('utf-8'))
+
+    def list(self):
+        """Snapshot manifests, newest first"""
+        manifests = []
+        for path in sorted(self.snapshots_dir.glob('*.json'), reverse=True):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    manifests.append(json.load(f))
+            except (OSError, ValueError) as e:
+                log_debug(f"Skipping unreadable backup manifest {path}: {e}")
+        return manifests
+
+    def find(self, snapshot_id=None):
+        """Manifest by id (or unique id prefix); the newest one when id is None"""
+        manifests = self.list()
+        if snapshot_id is None:
+            return manifests[0] if manifests else None
+        matches = [m for m in manifests if m['id'].startswith(snapshot_id)]
+        return matches[0] if len(matches) == 1 else None
+
+    def create(self, sections, force=False):
+        """Store a snapshot of {section: data}. Returns its manifest, or None
+        when nothing changed since the newest snapshot (and not `force`)."""
+        encoded = {name: self._encode(data) for name, data in sections.items()}
+        digests = {name: hashlib.sha256(payload).hexdigest() for name, payload in encoded.items()}
+        with self._lock:
+            if self._last_sections is None:
+                newest = self.find()
+                self._last_sections = newest['sections'] if newest else {}
+            if digests == self._last_sections and not force:
+                return None
+            for payload in encoded.values():
+                self._put(payload)
+            now = datetime.now()
+            manifest = {
+                'id': now.strftime('%Y%m%dT%H%M%S%f'),
+                'created': now.isoformat(timespec='seconds'),
+                'app_version': APP_VERSION,
+                'sections': digests,
+            }
+            self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+            write_file_atomic(self.snapshots_dir / f"{manifest['id']}.json",
+                              json.dumps(manifest, indent=2).encode('utf-8'))
+            self._last_sections = digests
+        self.prune()
+        return manifest
+
+    def load(self, manifest, section):
+        """Data of one section of a snapshot, or None if it has no such section"""
+        digest = manifest['sections'].get(section)
+        return None if digest is None else self._get(digest)
+
+    def prune(self):
+        """Apply the retention policy, then drop objects no snapshot refers to"""
+        with self._lock:
+            manifests = self.list()
+            keep = {m['id'] for m in manifests[:self.keep_recent]}
+            days, months = {}, {}
+            for m in manifests:
+                day, month = m['id'][:8], m['id'][:6]
+                if day not in days and len(days) < self.keep_daily:
+                    days[day] = m['id']
+                if month not in months and len(months) < self.keep_monthly:
+                    months[month] = m['id']
+            keep.update(days.values())
+            keep.update(months.values())
+            live = set()
+            for m in manifests:
+                if m['id'] in keep:
+                    live.update(m['sections'].values())
+                else:
+                    (self.snapshots_dir / f"{m['id']}.json").unlink()
+            removed = 0
+            for path in self.objects_dir.glob('*/*'):
+                if path.name not in live:
+                    path.unlink()
+                    removed += 1
+        if removed or len(keep) < len(manifests):
+            log_debug(f"Backups pruned: {len(manifests) - len(keep)} snapshots, {removed} objects")
+
+
+# ============================================
+# Managed policy (fleet deployments)
+# ============================================
+
+POLICY_FILE_ENV = "THIKR_POLICY_FILE"
+POLICY_ABSENT = 'absent'  # PolicyLayer signature: no policy file (or none configured)
+
+
+def get_policy_path():
+    """Admin policy file: $THIKR_POLICY_FILE (a file, or a directory holding
+    policy.json), else %ProgramData%\\Thikr\\policy.json"""
+    override = os.environ.get(POLICY_FILE_ENV)
+    if override:
+        path = Path(override)
+        return path / "policy.json" if path.is_dir() else path
+    program_data = os.environ.get('PROGRAMDATA')
+    if program_data:
+        return Path(program_data) / "Thikr" / "policy.json"
+    return None
+
+
+class PolicyLayer:
+    """Administrator-pinned settings, layered above the user's own.
+
+    Every setting present in the policy file (nested like user_settings.json,
+    or as "dotted.path": value) overrides the user's value and is locked in
+    the settings window. refresh() costs one stat() unless the file's
+    (mtime, size) changed, so it can be polled from a timer; the last good
+    policy stays in force while the file is unreadable (e.g. share offline).
+    Locks are lifted only when the file is gone from a folder that can be
+    read, i.e. the administrator deleted it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.values = {}  # dotted path -> pinned value
+        self._signature = None
+
+    def _stat_signature(self):
+        """(mtime, size); POLICY_ABSENT if there is no policy; None if unknown"""
+        if self.path is None:
+            return POLICY_ABSENT
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # A missing file on an unreachable share is not a deletion
+            return POLICY_ABSENT if os.path.isdir(self.path.parent) else None
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def refresh(self):
+        """Re-read the policy if the file changed; True if the pinned values changed"""
+        signature = self._stat_signature()
+        if signature is None:
+            if self._signature is not None:
+                log_debug(f"Policy file {self.path} is unreachable; keeping the previous policy")
+                self._signature = None  # Re-read once it is back
+            return False
+        if signature == self._signature:
+            return False
+        values = {} if signature == POLICY_ABSENT else self._read()
+        if values is None:
+            return False  # Unreadable: try again on the next refresh
+        self._signature = signature
+        if values == self.values:
+            return False
+        self.values = values
+        log_debug(f"Policy {self.path}: {len(values)} locked settings {sorted(values)}")
+        return True
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log_debug(f"Cannot read policy file {self.path}: {e}; keeping the previous policy")
+            return None
+        if not isinstance(data, dict):
+            log_debug(f"Policy file {self.path} does not contain an object; keeping the previous policy")
+            return None
+        flat = {}
+        stack = [('', data)]
+        while stack:
+            prefix, node = stack.pop()
+            for k, v in node.items():
+                if isinstance(v, dict):
+                    stack.append((prefix + k + '.', v))
+                else:
+                    flat[prefix + k] = v
+        # Only real, valid settings can be pinned
+        defaults = SettingsSnapshot(DEFAULT_SETTINGS)
+        known = dict(defaults.leaves())
+        for path in sorted(flat):
+            if path not in known or path == 'schema_version':
+                log_debug(f"Policy setting {path} is not a known setting; ignored")
+                del flat[path]
+        try:
+            defaults.assoc(flat)
+        except ConfigError as e:
+            for path, msg in e.errors:
+                log_debug(f"Policy setting {path} is invalid ({msg}); ignored")
+                flat.pop(path.split('[')[0], None)
+        return flat
+
+    def is_locked(self, path):
+        return path in self.values
+
+
+class SettingsManager:
+    def __init__(self, flush_delay=SETTINGS_FLUSH_DELAY):
+        self.settings_file = DATA_DIR / "user_settings.json"
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._flush_timer = None
+        # Write amplification counters: logical changes vs physical writes
+        self.change_count = 0
+        self.write_count = 0
+        # pattern -> {token: callback}; see subscribe()
+        self._subscribers = {}
+        self._next_token = 0
+        self.backups = BackupStore(DATA_DIR / BACKUP_DIR)
+        self.policy = PolicyLayer(get_policy_path())
+        self.policy.refresh()
+        # _user is what the user chose (and what is saved); _snapshot is the
+        # published view with the admin policy applied on top
+        self._user = self._load_snapshot()
+        self._snapshot = self._apply_policy(self._user)
+        # Athkar edits and statistics live in SQLite; UI prefs stay in JSON
+        self.store = UserDataStore(DATA_DIR / USER_DATA_DB)
+        self._import_legacy_user_data()
+        # Merged, indexed athkar for the settings window and the reminders
+        self.athkar = AthkarCatalog(self.store)
+        # (settings key, HijriCalendar) and (day, calendar, occasions); see occasions_today()
+        self._hijri = None
+        self._occasions = None
+        # Never lose pending changes on interpreter exit
+        atexit.register(self.flush)
+
+    @property
+    def settings(self):
+        """Read-only settings tree of the currently published snapshot"""
+        return self._snapshot.tree
+
+    def snapshot(self):
+        """Current immutable snapshot; hold on to it for a consistent multi-key read"""
+        return self._snapshot
+    
+    def load_settings(self):
+        """Read, migrate and merge the saved settings over the defaults.
+        An unreadable file is replaced by the newest backup, not by defaults.
+        Returns (tree, needs_save)."""
+        defaults = copy.deepcopy(DEFAULT_SETTINGS)
+        if not self.settings_file.exists():
+            return defaults, False
+        saved, migrated = self._read_settings_file()
+        if saved is None:
+            saved = self._settings_from_backup()
+            if saved is None:
+                log_debug("No usable settings backup; using defaults")
+                return defaults, False
+            migrated = True  # rewrite the file from the restored tree
+        return self._merge(defaults, saved), migrated
+
+    def _read_settings_file(self):
+        """Parsed and migrated settings file: (saved, migrated), saved=None if unusable"""
+        try:
+            with open(self.settings_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except json.JSONDecodeError as e:
+            log_debug(f"Settings file is not valid JSON ({self.settings_file}, "
+                      f"line {e.lineno} column {e.colno}): {e.msg}")
+            return None, False
+        except (OSError, UnicodeDecodeError) as e:
+            log_debug(f"Cannot read settings file {self.settings_file}: {e}")
+            return None, False
+        if not isinstance(saved, dict):
+            log_debug(f"Settings file {self.settings_file} does not contain an object")
+            return None, False
+        try:
+            return migrate_settings(saved)
+        except ConfigError as e:
+            log_debug(f"Settings migration failed: {e}")
+            return None, False
+
+    def _settings_from_backup(self):
+        """Settings section of the newest backup (migrated), keeping the bad file aside"""
+        try:
+            shutil.copyfile(self.settings_file, self.settings_file.with_name(
+                self.settings_file.name + '.corrupt'))
+            for manifest in self.backups.list():
+                saved = self.backups.load(manifest, 'settings')
+                if isinstance(saved, dict):
+                    saved, _ = migrate_settings(saved)
+                    log_debug(f"Settings restored from backup {manifest['id']}")
+                    return saved
+        except (OSError, ValueError, zlib.error) as e:
+            log_debug(f"Cannot restore settings from backup: {e}")
+        return None
+
+    def _load_snapshot(self):
+        """Load once and validate once; invalid fields are reported by path and
+        replaced with their defaults rather than discarding the whole file."""
+        self._file_signature = self._stat_signature()
+        tree, needs_save = self.load_settings()
+        snap, repaired = self._validated_snapshot(tree)
+        # What the file on disk holds; external edits are diffed against it
+        self._disk = snap
+        if needs_save or repaired:
+            self.mark_dirty()
+        return snap
+
+    @staticmethod
+    def _validated_snapshot(tree):
+        """Snapshot of `tree` with invalid fields reset to defaults; returns (snapshot, repaired)"""
+        config, errors = build_config(tree)
+        snap = SettingsSnapshot(tree, config)
+        if not errors:
+            return snap, False
+        repaired = {}
+        bad_items = {}
+        for path, msg in errors:
+            match = re.match(r'([^\[]+)\[(\d+)\]', path)
+            if match:
+                # Invalid list item (e.g. one reminder stream): drop just that item
+                log_debug(f"Invalid setting {path}: {msg}; ignoring item")
+                bad_items.setdefault(match.group(1), set()).add(int(match.group(2)))
+                continue
+            log_debug(f"Invalid setting {path}: {msg}; using default")
+            node = DEFAULT_SETTINGS
+            for k in path.split('.'):
+                node = node[k]
+            repaired[path] = node
+        for path, bad in bad_items.items():
+            repaired[path] = [item for i, item in enumerate(snap.get(path, ())) if i not in bad]
+        return snap.assoc(repaired), True
+
+    def _stat_signature(self):
+        """(mtime, size, inode) of the settings file, or None if it is missing"""
+        try:
+            st = os.stat(self.settings_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def check_for_external_changes(self):
+        """Hot reload: if the file changed on disk (and not by our own write),
+        re-parse it and apply only the keys the edit changed through the normal
+        commit/notification path. The edit is diffed against what was last
+        written or loaded, not against memory, so changes still waiting in
+        the debounce window are kept. Returns the applied {path: (old, new)}."""
+        with self._write_lock:
+            signature = self._stat_signature()
+            if signature == self._file_signature or signature is None:
+                return {}
+            self._file_signature = signature
+            saved, _ = self._read_settings_file()
+            if saved is None:
+                # Half-written or broken edit: keep running on the current settings
+                return {}
+            tree = self._merge(copy.deepcopy(DEFAULT_SETTINGS), saved)
+            tree = {k: v for k, v in tree.items() if k not in LEGACY_USER_DATA_KEYS}
+            reloaded, _ = self._validated_snapshot(tree)
+            changed = self._disk.diff(reloaded)
+            self._disk = reloaded
+        # Keys that disappeared from the file keep their in-memory value
+        changed = {path: change for path, change in changed.items() if path in reloaded}
+        if changed:
+            log_debug(f"Settings file changed externally: {sorted(changed)}")
+            self._commit({path: new for path, (old, new) in changed.items()}, persist=False)
+        return changed
+
+    def _import_legacy_user_data(self):
+        """Move athkar edits/stats from user_settings.json into the store (once)"""
+        tree = self._user.tree
+        legacy = [k for k in LEGACY_USER_DATA_KEYS if k in tree]
+        if not legacy:
+            return
+        if self.store.import_legacy(tree) and self.store.persistent:
+            with self._lock:
+                self._publish(self._user.without(legacy))
+            self.mark_dirty()
+
+    @property
+    def config(self):
+        """Typed configuration of the current snapshot"""
+        return self._snapshot.config
+    
+    def _merge(self, defaults, saved):
+        result = defaults.copy()
+        for key, value in saved.items():
+            if key in result and isinstance(value, dict) and isinstance(result[key], dict):
+                result[key] = self._merge(result[key], value)
+            else:
+                result[key] = value
+        return result
+    
+    def save(self):
+        """Write the settings to disk immediately (bypasses the debounce window)"""
+        with self._lock:
+            self._dirty = True
+        self.flush()
+
+    def mark_dirty(self):
+        """Record a logical change and schedule a write-behind flush"""
+        with self._lock:
+            self.change_count += 1
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        """Write pending changes to disk (no-op when nothing is dirty)"""
+        with self._write_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty:
+                    return True
+                written = self._user
+                data = json.dumps(written.tree, ensure_ascii=False, indent=2,
+                                  default=_json_default)
+                self._dirty = False
+            try:
+                self._write_atomic(data)
+                # Remember our own write so the file watcher ignores it
+                self._file_signature = self._stat_signature()
+                self._disk = written
+                self.write_count += 1
+                return True
+            except Exception as e:
+                log_debug(f"Error saving settings: {e}")
+                with self._lock:
+                    self._dirty = True  # Retry on the next flush
+                return False
+
+    def _write_atomic(self, data):
+        write_file_atomic(self.settings_file, data.encode('utf-8'))
+
+    def write_stats(self):
+        """How many physical writes the logical changes actually cost"""
+        changes = self.change_count
+        return {
+            'changes': changes,
+            'writes': self.write_count,
+            'writes_per_change': (self.write_count / changes) if changes else 0.0,
+        }
+    
+    def get(self, path, default=None):
+        return self._snapshot.get(path, default)
+    
+    def set(self, path, value):
+        self.set_many({path: value})
+
+    def set_many(self, changes):
+        """Apply several dotted-path changes as one atomically published snapshot"""
+        self._commit(changes)
+
+    def _commit(self, changes, persist=True):
+        changes = self.unlocked_changes(changes)
+        if not changes:
+            return
+        with self._lock:
+            old = self._snapshot
+            new = self._publish(self._user.assoc(changes))
+        if persist:
+            self.mark_dirty()
+        self._notify(old.diff(new))
+
+    def _publish(self, user):
+        """Install a new user snapshot and its policy-applied view (caller holds _lock)"""
+        self._user = user
+        self._snapshot = self._apply_policy(user)
+        return self._snapshot
+
+    def _apply_policy(self, user):
+        # Computed once per change; get() then reads the published snapshot only
+        pinned = self.policy.values
+        return user.assoc(pinned) if pinned else user
+
+    def is_locked(self, path):
+        """True if the admin policy pins this setting"""
+        return self.policy.is_locked(path)
+
+    def unlocked_changes(self, changes):
+        """`changes` without the paths pinned by the policy"""
+        locked = [path for path in changes if self.policy.is_locked(path)]
+        if not locked:
+            return changes
+        overridden = sorted(p for p in locked if changes[p] != self.policy.values[p])
+        if overridden:
+            log_debug(f"Ignoring changes to policy-locked settings: {overridden}")
+        return {path: value for path, value in changes.items() if path not in locked}
+
+    def check_policy(self):
+        """Re-apply the admin policy if its file changed (a stat() otherwise).
+        Returns the published {path: (old, new)} changes."""
+        if not self.policy.refresh():
+            return {}
+        with self._lock:
+            old = self._snapshot
+            new = self._publish(self._user)
+        changed = old.diff(new)
+        self._notify(changed)
+        return changed
+
+    def subscribe(self, pattern, callback):
+        """Call `callback(changes)` after each commit that changes a matching path.
+
+        `pattern` is an exact dotted path ('reminder.interval_minutes'), a
+        prefix wildcard ('popup.*', 'reminder.quiet_hours.*') or '*'.
+        `changes` is {path: (old, new)} restricted to the matching leaf paths,
+        delivered once per commit on the committing thread. Returns a token
+        for unsubscribe().
+        """
+        with self._lock:
+            self._next_token += 1
+            token = self._next_token
+            self._subscribers.setdefault(pattern, {})[token] = callback
+        return token
+
+    def unsubscribe(self, token):
+        with self._lock:
+            for pattern, subs in list(self._subscribers.items()):
+                if subs.pop(token, None) is not None and not subs:
+                    del self._subscribers[pattern]
+
+    def _notify(self, changed):
+        """Batch changed paths per subscriber and deliver them"""
+        if not changed or not self._subscribers:
+            return
+        batches = {}
+        with self._lock:
+            for path, change in changed.items():
+                for key in _subscription_keys(path):
+                    for token, callback in self._subscribers.get(key, {}).items():
+                        batches.setdefault(token, (callback, {}))[1][path] = change
+        for callback, batch in batches.values():
+            try:
+                callback(batch)
+            except Exception as e:
+                log_debug(f"Settings subscriber error: {e}")
+
+    def backup(self, force=False):
+        """Snapshot settings + store into the backup store; None if unchanged"""
+        self.flush()
+        sections = {'settings': self._user.tree}
+        if self.store.persistent:
+            sections['user_data'] = self.store.export_data()
+        try:
+            manifest = self.backups.create(sections, force=force)
+        except (OSError, sqlite3.Error) as e:
+            log_debug(f"Backup failed: {e}")
+            return None
+        if manifest:
+            log_debug(f"Backup {manifest['id']} created")
+        return manifest
+
+    def restore_backup(self, snapshot_id=None):
+        """Restore settings and store from a backup (the newest by default).
+        The current state is backed up first, so a restore can be undone."""
+        manifest = self.backups.find(snapshot_id)
+        if manifest is None:
+            raise KeyError(snapshot_id or 'latest')
+        self.backup()
+        saved = self.backups.load(manifest, 'settings')
+        user_data = self.backups.load(manifest, 'user_data')
+        if saved is not None:
+            saved, _ = migrate_settings(saved)
+            tree = self._merge(copy.deepcopy(DEFAULT_SETTINGS), saved)
+            tree = {k: v for k, v in tree.items() if k not in LEGACY_USER_DATA_KEYS}
+            restored, _ = self._validated_snapshot(tree)
+            with self._lock:
+                old = self._snapshot
+                new = self._publish(restored)
+            self.save()
+            self._notify(old.diff(new))
+        if user_data is not None:
+            self.store.import_data(user_data)
+            self.athkar.reload()
+        log_debug(f"Restored backup {manifest['id']}")
+        return manifest
+
+    def begin(self):
+        """Start a SettingsTransaction (staged, uncommitted changes)"""
+        return SettingsTransaction(self)
+    
+    def get_theme(self):
+        return THEMES[self._snapshot.config.popup.theme]
+    
+    def get_all_athkar(self):
+        """Default (edited, minus deleted) + custom athkar; see AthkarCatalog"""
+        return list(self.athkar.all())
+
+    def hijri_calendar(self):
+        """HijriCalendar for the current hijri settings (rebuilt only when they change)"""
+        cfg = self.config.hijri
+        key = (cfg.adjust_days, cfg.month_starts)
+        cached = self._hijri
+        if cached is None or cached[0] != key:
+            overrides = [(m.year, m.month, m.start) for m in cfg.month_starts if m.start is not None]
+            cached = (key, HijriCalendar(cfg.adjust_days, overrides))
+            self._hijri = cached
+        return cached[1]
+
+    def occasions_today(self):
+        """Names of the occasions that apply today (worked out once per day)"""
+        cfg = self.config
+        if not cfg.hijri.occasions:
+            return ()
+        today = get_now(cfg.timezone).date()
+        calendar = self.hijri_calendar()
+        cached = self._occasions
+        if cached is None or cached[0] != today or cached[1] is not calendar:
+            cached = (today, calendar, occasions_on(today, calendar))
+            self._occasions = cached
+        return cached[2]
+
+    def get_random_thikr(self, category='', ids=()):
+        """Next thikr (per reminder.order and the weights), optionally only
+        from one category or a list of ids"""
+        cfg = self.config.reminder
+        self.athkar.set_weights(cfg.category_weights, cfg.favourite_weight)
+        return self.athkar.choice(category, ids, self.occasions_today(), cfg.order, cfg.no_repeat)
+    
+    def get_random_surah(self):
+        cfg = self.config.reminder
+        return self.athkar.surah(self.occasions_today(), cfg.order, cfg.no_repeat)
+    
+    def get_stats(self):
+        return self.store.get_stats()
+
+    def increment_counter(self):
+        today = get_now(self.config.timezone).strftime("%Y-%m-%d")
+        return self.store.increment_counter(today)
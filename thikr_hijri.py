@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذِكْر - التقويم الهجري
+Thikr Hijri calendar - table-driven date conversion and the occasion rules.
+
+Month starts for HIJRI_FIRST_YEAR..HIJRI_LAST_YEAR are precomputed once into
+a flat table, so converting a date is an index estimate plus at most a step
+or two, memoized per day. The table comes from the tabular (arithmetic)
+Islamic calendar, which can differ from Umm al-Qura / moon sighting by a
+day; `adjust_days` and the per-month `overrides` (from the official
+announcements) correct it. Nothing here depends on the rest of Thikr.
+"""
+
+import collections
+from datetime import date, timedelta
+
+HIJRI_FIRST_YEAR = 1356  # 1937 CE; tabular dates, off Umm al-Qura by a day at times (see adjust_days / overrides)
+HIJRI_LAST_YEAR = 1500   # 2077 CE
+# 1 Muharram 1 AH (Julian 16 July 622) as a proleptic Gregorian ordinal
+HIJRI_EPOCH = date(622, 7, 19).toordinal()
+MEAN_MONTH = 29.530588853
+HIJRI_MONTHS = ('محرم', 'صفر', 'ربيع الأول', 'ربيع الآخر', 'جمادى الأولى', 'جمادى الآخرة',
+                'رجب', 'شعبان', 'رمضان', 'شوال', 'ذو القعدة', 'ذو الحجة')
+MEMO_SIZE = 512  # days kept converted; a tray app asks about today and tomorrow
+
+HijriDate = collections.namedtuple('HijriDate', 'year month day')
+
+
+def tabular_month_start(year, month):
+    """Ordinal of the 1st of a Hijri month in the 30-year tabular calendar"""
+    days = (year - 1) * 354 + (3 + 11 * year) // 30 + -(-59 * (month - 1) // 2)
+    return HIJRI_EPOCH + days
+
+
+class HijriCalendar:
+    """Gregorian <-> Hijri conversion over a precomputed table of month starts"""
+
+    def __init__(self, adjust_days=0, overrides=()):
+        # overrides: [(year, month, date of the 1st)], e.g. an announced start of Ramadan
+        self.adjust_days = adjust_days
+        fixed = {(y, m): start.toordinal() for y, m, start in overrides}
+        starts = []
+        for year in range(HIJRI_FIRST_YEAR, HIJRI_LAST_YEAR + 2):
+            for month in range(1, 13):
+                starts.append(fixed.get((year, month), tabular_month_start(year, month) + adjust_days))
+        # An override a day off from its neighbours must not reorder months
+        for i in range(1, len(starts)):
+            if starts[i] <= starts[i - 1]:
+                starts[i] = starts[i - 1] + 29
+        self._starts = starts
+        self._memo = {}
+
+    def __contains__(self, day):
+        return self._starts[0] <= day.toordinal() < self._starts[-1]
+
+    def to_hijri(self, day):
+        """HijriDate for a Gregorian date (ValueError outside the table)"""
+        ordinal = day.toordinal()
+        cached = self._memo.get(ordinal)
+        if cached is not None:
+            return cached
+        starts = self._starts
+        if not starts[0] <= ordinal < starts[-1]:
+            raise ValueError(f"{day} is outside {HIJRI_FIRST_YEAR}-{HIJRI_LAST_YEAR} AH")
+        # Mean month length puts the estimate within a month of the answer
+        i = min(int((ordinal - starts[0]) / MEAN_MONTH), len(starts) - 2)
+        while starts[i] > ordinal:
+            i -= 1
+        while starts[i + 1] <= ordinal:
+            i += 1
+        result = HijriDate(HIJRI_FIRST_YEAR + i // 12, i % 12 + 1, ordinal - starts[i] + 1)
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[ordinal] = result
+        return result
+
+    def from_hijri(self, year, month, day):
+        i = (year - HIJRI_FIRST_YEAR) * 12 + month - 1
+        if not 0 <= i < len(self._starts) - 1:
+            raise ValueError(f"{year} AH is outside {HIJRI_FIRST_YEAR}-{HIJRI_LAST_YEAR}")
+        return date.fromordinal(self._starts[i]) + timedelta(days=day - 1)
+
+    def month_length(self, year, month):
+        i = (year - HIJRI_FIRST_YEAR) * 12 + month - 1
+        return self._starts[i + 1] - self._starts[i]
+
+    def format(self, day):
+        h = self.to_hijri(day)
+        return f"{h.day} {HIJRI_MONTHS[h.month - 1]} {h.year} هـ"
+
+
+# ---------- occasions ----------
+
+# name -> test(gregorian date, HijriDate); the content for each lives in thikr_core
+OCCASION_RULES = {
+    'friday': lambda day, h: day.weekday() == 4,
+    'ramadan': lambda day, h: h.month == 9,
+    'ramadan_last_ten': lambda day, h: h.month == 9 and h.day >= 21,
+    'dhul_hijjah_ten': lambda day, h: h.month == 12 and h.day <= 10,
+    'arafah': lambda day, h: h.month == 12 and h.day == 9,
+    # 13 Dhul Hijjah is a day of Tashreeq, when fasting is not allowed
+    'ayyam_al_bid': lambda day, h: 13 <= h.day <= 15 and not (h.month == 12 and h.day == 13),
+}
+
+
+def occasions_on(day, calendar):
+    """Names of the occasions that apply on a Gregorian date"""
+    try:
+        h = calendar.to_hijri(day)
+    except ValueError:
+        return tuple(name for name in ('friday',) if OCCASION_RULES[name](day, None))
+    return tuple(name for name, rule in OCCASION_RULES.items() if rule(day, h))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذِكْر - كشف الغياب عن الجهاز
+Thikr idle detection - how long since the user last touched the keyboard or mouse.
+
+The reminder thread asks before showing a popup; while the user is away,
+due reminders are held (see DeferralQueue in thikr_scheduler) instead of
+being rendered to an empty room. Backends share one small interface:
+
+    idle_seconds()  -> seconds since the last input, or None if unknown
+    is_away(secs)   -> idle for at least `secs` (never, when secs <= 0)
+
+Win32IdleDetector reads GetLastInputInfo; FakeIdleDetector is driven by
+hand (tests, simulations); NullIdleDetector reports a user who is always
+there, which is the old behaviour. Like thikr_core, never imports PyQt6.
+"""
+
+import ctypes
+import sys
+import time
+
+from thikr_core import log_debug
+
+
+class IdleDetector:
+    """Base interface; subclasses implement idle_seconds()"""
+
+    def idle_seconds(self):
+        raise NotImplementedError
+
+    def is_away(self, threshold):
+        if threshold <= 0:
+            return False
+        idle = self.idle_seconds()
+        return idle is not None and idle >= threshold
+
+
+class NullIdleDetector(IdleDetector):
+    """No idle information: the user always counts as present"""
+
+    def idle_seconds(self):
+        return None
+
+
+class FakeIdleDetector(IdleDetector):
+    """Idle time driven by hand: touch() is a keypress, idle_for() a walk away"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.last_input = clock()
+
+    def touch(self):
+        self.last_input = self.clock()
+
+    def idle_for(self, seconds):
+        self.last_input = self.clock() - seconds
+
+    def idle_seconds(self):
+        return max(0.0, self.clock() - self.last_input)
+
+
+class _LastInputInfo(ctypes.Structure):
+    _fields_ = [('cbSize', ctypes.c_uint), ('dwTime', ctypes.c_uint32)]
+
+
+class Win32IdleDetector(IdleDetector):
+    """GetLastInputInfo: session-wide last input, in GetTickCount milliseconds"""
+
+    def __init__(self):
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+        self._kernel32.GetTickCount.restype = ctypes.c_uint32
+
+    def idle_seconds(self):
+        info = _LastInputInfo()  # One per call: both threads ask
+        info.cbSize = ctypes.sizeof(info)
+        if not self._user32.GetLastInputInfo(ctypes.byref(info)):
+            return None
+        # Both are 32-bit tick counts that wrap every 49.7 days
+        return ((self._kernel32.GetTickCount() - info.dwTime) & 0xFFFFFFFF) / 1000
+
+
+def get_idle_detector():
+    """The best detector for this platform"""
+    if sys.platform == 'win32':
+        try:
+            return Win32IdleDetector()
+        except (AttributeError, OSError) as e:
+            log_debug(f"Idle detection unavailable: {e}")
+    return NullIdleDetector()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذِكْر - مواقيت الصلاة
+Thikr prayer times - a solar-position engine precomputed a year at a time.
+
+A year's table (Fajr, sunrise, Dhuhr, Asr, Maghrib, Isha for every day) is
+built in one batched pass: the sun's declination and equation of time are
+evaluated once per day at solar noon and shared by all the prayers, then
+each column is refined with the sun's position at its own time. Tables are
+cached under DATA_DIR/cache keyed by location and method, so looking up a
+day is an index into a list. The formulas are the ones behind the usual
+published timetables (praytimes.org); times are rounded to the minute as
+those tables are. Runs offline; like thikr_core, never imports PyQt6.
+"""
+
+import json
+import math
+import functools
+from datetime import date
+
+from thikr_core import DATA_DIR, PRAYER_NAMES, log_debug, write_file_atomic
+
+PRAYER_CACHE_DIR = "cache"
+PRAYER_TABLE_VERSION = 1  # Bump when the formulas change, to drop cached tables
+
+# Sun angle below the horizon at Fajr / Isha; an int Isha is minutes after Maghrib
+PRAYER_METHOD_PARAMS = {
+    'MWL': (18.0, 17.0),      # Muslim World League
+    'ISNA': (15.0, 15.0),     # Islamic Society of North America
+    'Egypt': (19.5, 17.5),    # Egyptian General Authority of Survey
+    'Makkah': (18.5, 90),     # Umm al-Qura, Makkah
+    'Karachi': (18.0, 18.0),  # University of Islamic Sciences, Karachi
+}
+TABLE_COLUMNS = ('fajr', 'sunrise', 'dhuhr', 'asr', 'maghrib', 'isha')
+SUNRISE_ANGLE = 0.833  # Refraction + the sun's radius
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+# ---------- solar position ----------
+
+def _dsin(d):
+    return math.sin(math.radians(d))
+
+
+def _dcos(d):
+    return math.cos(math.radians(d))
+
+
+def _dtan(d):
+    return math.tan(math.radians(d))
+
+
+def _fix(a, b):
+    a = a - b * math.floor(a / b)
+    return a + b if a < 0 else a
+
+
+def sun_position(jd):
+    """(declination in degrees, equation of time in hours) at Julian date `jd`"""
+    d = jd - 2451545.0
+    g = _fix(357.529 + 0.98560028 * d, 360)
+    q = _fix(280.459 + 0.98564736 * d, 360)
+    ecliptic = _fix(q + 1.915 * _dsin(g) + 0.020 * _dsin(2 * g), 360)
+    obliquity = 23.439 - 0.00000036 * d
+    ra = math.degrees(math.atan2(_dcos(obliquity) * _dsin(ecliptic), _dcos(ecliptic))) / 15
+    eqt = q / 15 - _fix(ra, 24)
+    decl = math.degrees(math.asin(_dsin(obliquity) * _dsin(ecliptic)))
+    return decl, eqt
+
+
+def _noon(eqt, longitude):
+    """Solar noon in UTC hours"""
+    return _fix(12 - eqt, 24) - longitude / 15
+
+
+def _hour_angle(altitude, decl, latitude):
+    """Hours between noon and the sun reaching `altitude`, or None if it never does"""
+    cos_h = (_dsin(altitude) - _dsin(decl) * _dsin(latitude)) / (_dcos(decl) * _dcos(latitude))
+    if not -1 <= cos_h <= 1:
+        return None  # Polar day/night, or twilight that never ends (high latitudes)
+    return math.degrees(math.acos(cos_h)) / 15
+
+
+def _asr_altitude(decl, latitude, factor):
+    return math.degrees(math.atan(1 / (factor + _dtan(abs(latitude - decl)))))
+
+
+class _Params:
+    __slots__ = ('latitude', 'longitude', 'fajr_angle', 'isha', 'asr_factor')
+
+    def __init__(self, latitude, longitude, method, asr_factor):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.fajr_angle, self.isha = PRAYER_METHOD_PARAMS[method]
+        self.asr_factor = asr_factor
+
+
+def _column_time(column, jd0, h, p):
+    """UTC hour of `column` on the day starting at Julian date `jd0`, with the
+    sun's position taken at UTC hour `h` (an estimate of that same time)"""
+    decl, eqt = sun_position(jd0 + h / 24)
+    noon = _noon(eqt, p.longitude)
+    if column == 'dhuhr':
+        return noon
+    if column == 'asr':
+        t = _hour_angle(_asr_altitude(decl, p.latitude, p.asr_factor), decl, p.latitude)
+        return None if t is None else noon + t
+    if column in ('sunrise', 'maghrib'):
+        t = _hour_angle(-SUNRISE_ANGLE, decl, p.latitude)
+    elif column == 'fajr':
+        t = _hour_angle(-p.fajr_angle, decl, p.latitude)
+    else:  # isha by angle; a fixed Isha is derived from Maghrib afterwards
+        t = _hour_angle(-p.isha, decl, p.latitude)
+    if t is None:
+        return None
+    return noon - t if column in ('fajr', 'sunrise') else noon + t
+
+
+def compute_year(year, latitude, longitude, method='MWL', asr_factor=1):
+    """{column: [UTC epoch seconds or None per day of `year`]}"""
+    p = _Params(latitude, longitude, method, asr_factor)
+    first = date(year, 1, 1).toordinal()
+    ordinals = range(first, date(year + 1, 1, 1).toordinal())
+    jd0s = [o + 1721424.5 for o in ordinals]  # Julian date at 00:00 UTC
+
+    # Pass 1: the sun at each day's approximate solar noon, shared by all prayers
+    approx_noon = 12 - longitude / 15
+    columns = {}
+    for column in TABLE_COLUMNS:
+        if column == 'isha' and isinstance(p.isha, int):
+            continue
+        first_pass = [_column_time(column, jd0, approx_noon, p) for jd0 in jd0s]
+        # Pass 2: the sun at the prayer's own time
+        columns[column] = [None if h is None else _column_time(column, jd0, h, p)
+                           for jd0, h in zip(jd0s, first_pass)]
+    if isinstance(p.isha, int):
+        columns['isha'] = [None if m is None else m + p.isha / 60 for m in columns['maghrib']]
+
+    # High latitudes: twilight that never ends gets the angle-based portion of the night
+    for column, angle, sign in (('fajr', p.fajr_angle, -1), ('isha', p.isha, 1)):
+        if isinstance(angle, int) and column == 'isha':
+            continue
+        base_column = 'sunrise' if column == 'fajr' else 'maghrib'
+        for i, (t, rise, sets) in enumerate(zip(columns[column], columns['sunrise'], columns['maghrib'])):
+            if rise is None or sets is None:
+                continue
+            portion = angle / 60 * (24 - (sets - rise))
+            base = columns[base_column][i]
+            if t is None or abs(t - base) > portion:
+                columns[column][i] = base + sign * portion
+
+    return {column: [None if h is None else (o - EPOCH_ORDINAL) * 86400 + round(h * 60) * 60
+                     for o, h in zip(ordinals, hours)]
+            for column, hours in columns.items()}
+
+
+# ---------- tables ----------
+
+class PrayerTimes:
+    """Prayer times for one location and method, a cached table per year"""
+
+    def __init__(self, latitude, longitude, method='MWL', asr_factor=1, cache_dir=None):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.method = method
+        self.asr_factor = asr_factor
+        self.cache_dir = cache_dir if cache_dir is not None else DATA_DIR / PRAYER_CACHE_DIR
+        self.key = f"{method}_{asr_factor}_{latitude:.4f}_{longitude:.4f}"
+        self._tables = {}
+
+    def __repr__(self):
+        return f"PrayerTimes({self.key})"
+
+    def _cache_file(self, year):
+        return self.cache_dir / f"prayer_{year}_{self.key}.json"
+
+    def table(self, year):
+        """{column: [epoch seconds or None per day]} for `year`, from memory, disk or computed"""
+        table = self._tables.get(year)
+        if table is not None:
+            return table
+        path = self._cache_file(year)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == PRAYER_TABLE_VERSION and data.get('key') == self.key:
+                table = data['columns']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        if table is None:
+            table = compute_year(year, self.latitude, self.longitude, self.method, self.asr_factor)
+            payload = {'version': PRAYER_TABLE_VERSION, 'key': self.key, 'year': year, 'columns': table}
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                write_file_atomic(path, json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+                self._prune_cache(year)
+            except OSError as e:
+                log_debug(f"Could not cache prayer times: {e}")
+        self._tables[year] = table
+        return table
+
+    def _prune_cache(self, year):
+        """Drop cached tables more than a year old"""
+        for path in self.cache_dir.glob('prayer_*.json'):
+            try:
+                if int(path.name.split('_')[1]) < year - 1:
+                    path.unlink()
+            except (ValueError, IndexError, OSError):
+                pass
+
+    def times_on(self, day):
+        """{column: epoch seconds or None} for date `day`"""
+        table = self.table(day.year)
+        i = day.toordinal() - date(day.year, 1, 1).toordinal()
+        return {column: table[column][i] for column in TABLE_COLUMNS}
+
+    def prayer_times_on(self, day):
+        """Like times_on() without sunrise (which is not a prayer)"""
+        times = self.times_on(day)
+        return {name: times[name] for name in PRAYER_NAMES}
+
+
+@functools.lru_cache(maxsize=4)
+def get_prayer_times(latitude, longitude, method, asr_factor):
+    return PrayerTimes(latitude, longitude, method, asr_factor)
+
+
+def compile_prayer_times(prayer_cfg):
+    """PrayerTimes for a PrayerConfig, or None until a location is set"""
+    if prayer_cfg.latitude is None or prayer_cfg.longitude is None:
+        return None
+    return get_prayer_times(prayer_cfg.latitude, prayer_cfg.longitude, prayer_cfg.method,
+                            prayer_cfg.asr_factor)
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذِكْر - خدمة التذكير
+Thikr reminder service - what the reminder thread does, without the thread or Qt.
+
+ReminderService owns the Scheduler and everything armed on it: the reminder
+streams, quiet hours, the busy calendar, morning/evening sessions, deferred
+(snoozed / held while away) reminders and DST re-arming. What it decides to
+show goes out through plain callbacks, which the tray app (thikr.py) turns
+into queued Qt signals. Both clocks are injectable, so the same code runs on
+a virtual clock in thikr_sim. Like thikr_core, never imports PyQt6.
+"""
+
+import functools
+import itertools
+import time
+
+from thikr_scheduler import (
+    Scheduler, RuleEngine, DeferralQueue, compile_streams, compile_quiet_calendar, compile_sessions,
+)
+from thikr_calendar import BusyCalendar
+from thikr_idle import NullIdleDetector
+from thikr_prayer import compile_prayer_times
+from thikr_core import log_debug, get_now, get_app_timezone, next_timezone_transition
+
+
+def _ignore(*args):
+    pass
+
+
+class ReminderService:
+    """Reminder scheduling state and callbacks; runs on one thread (the
+    scheduler's), apart from the methods marked (any thread)"""
+
+    FIRST_REMINDER_DELAY = 10  # seconds
+    ERROR_RETRY_DELAY = 5      # seconds
+    DIGEST_SIZE = 3            # athkar shown in a catch-up digest
+    IDLE_POLL_SECONDS = 20     # how often to look for the user's return while reminders are held
+    DEFERRED_GAP = 3           # seconds between deferred popups, after the previous one closes
+
+    def __init__(self, settings, idle=None, on_reminder=None, on_session=None, on_error=None,
+                 clock=time.monotonic, wall_clock=time.time):
+        self.settings = settings
+        self.idle = idle if idle is not None else NullIdleDetector()
+        # on_reminder(data, is_surah), on_session(name), on_error(message)
+        self.on_reminder = on_reminder or _ignore
+        self.on_session = on_session or _ignore
+        self.on_error = on_error or _ignore
+        self.running = True
+        self.paused = False
+        self.error_count = 0
+        self.max_errors = 5  # Max consecutive errors before giving up
+        self.first_run = True  # Flag for showing reminder sooner on first run
+        # Sleeps until the next due reminder instead of polling every second
+        self.scheduler = Scheduler(clock, wall_clock, on_clock_jump=self.on_clock_jump)
+        # Next-fire index over the reminder streams; only touched on the scheduler thread
+        self.engine = None
+        # Quiet periods as an interval index; the scheduler sleeps straight through them
+        self.quiet = None
+        # Events of the user's .ics file; kept across rebuilds so its parse cache survives
+        self.busy = BusyCalendar()
+        self.busy_mode = 'defer'
+        self.held_until = None  # End of the quiet/busy period the armed reminder was pushed to
+        self.sessions = []  # Daily morning/evening sessions, each its own scheduler event
+        # Snoozed popups, and reminders that came due while the user was away
+        self.deferred = DeferralQueue()
+        self._snooze_seq = itertools.count()
+
+    def start(self):
+        """Compile the schedule and arm the first events"""
+        # On first run, show reminder after a short delay instead of a full interval
+        self.rebuild_engine(first_delay=self.FIRST_REMINDER_DELAY if self.first_run else 0)
+
+    def run(self):
+        """start(), then dispatch events on the calling thread until stop()"""
+        self.start()
+        self.scheduler.run()
+
+    def rebuild_engine(self, first_delay=None, shift=0):
+        """Compile the streams from the current settings, keeping each interval
+        stream's last popup time, and arm the next reminder"""
+        cfg = self.settings.config
+        now = self.scheduler.wall_clock()
+        anchors, last_popup = {}, None
+        if self.engine is not None:
+            anchors = {name: t + shift for name, t in self.engine.anchors().items()}
+            last_popup = self.engine.last_popup
+            if last_popup is not None:
+                last_popup += shift
+        tz = get_app_timezone(cfg.timezone)
+        streams = compile_streams(cfg, tz, now, anchors, first_delay, compile_prayer_times(cfg.prayer))
+        self.engine = RuleEngine(streams, now, cfg.reminder.min_gap_minutes * 60, last_popup)
+        self.quiet = compile_quiet_calendar(cfg.reminder.quiet_hours, tz)
+        busy_cfg = cfg.reminder.busy_calendar
+        if (self.busy.path, self.busy.tz) != (busy_cfg.file, tz):
+            self.busy = BusyCalendar(busy_cfg.file, tz)
+        self.busy_mode = busy_cfg.mode
+        self.sessions = compile_sessions(cfg, tz)
+        self.arm()
+        self.arm_sessions()
+        self.arm_tz_transition(cfg.timezone, now)
+
+    def arm_tz_transition(self, tz_string, now):
+        """Recompile right as DST starts/ends, so local-time slots and the
+        quiet/busy indexes move with the clock instead of an interval later"""
+        t = next_timezone_transition(tz_string, now)
+        if t is None:
+            self.scheduler.cancel('tz-transition')
+            return
+        self.scheduler.schedule_in('tz-transition', max(0, t - now), self.on_tz_transition)
+
+    def on_tz_transition(self):
+        log_debug("UTC offset changed (daylight saving); recompiling the schedule")
+        self.busy.invalidate()
+        self.rebuild_engine()
+
+    def arm(self):
+        """Point the scheduler at the engine's next fire time"""
+        t = self.engine.next_time()
+        if t is None:
+            self.scheduler.cancel('reminder')
+            log_debug("No reminder streams active")
+            return
+        now = self.scheduler.wall_clock()
+        self.busy.refresh()
+        self.held_until = None
+        held = self.hold_until(max(t, now))
+        if held > max(t, now):
+            # Sleep until the quiet hours / meeting end rather than waking to skip each slot
+            self.held_until = held
+            log_debug(f"Next reminder falls in quiet hours or a busy event; deferred by {held - t:.0f} seconds")
+            t = held
+        delay = max(0, t - now)
+        self.scheduler.schedule_in('reminder', delay, self.on_reminder_due)
+        log_debug(f"Next reminder in {delay:.0f} seconds")
+
+    def arm_sessions(self):
+        """Schedule each daily session's next slot (one event per session, no polling)"""
+        for name in ('morning', 'evening'):
+            self.scheduler.cancel(f'session:{name}')
+        now = self.scheduler.wall_clock()
+        me = self.settings.config.morning_evening
+        for session in self.sessions:
+            t, day = session.next_fire(now, getattr(me, f'last_{session.name}'))
+            self.scheduler.schedule_in(f'session:{session.name}', max(0, t - now),
+                                       functools.partial(self.on_session_due, session))
+            log_debug(f"Next {session.name} session {day} in {max(0, t - now):.0f} seconds")
+
+    def on_session_due(self, session):
+        """Scheduler callback: start the session if its slot (or grace window) is now"""
+        now = self.scheduler.wall_clock()
+        last_day = getattr(self.settings.config.morning_evening, f'last_{session.name}')
+        t, day = session.next_fire(now, last_day)
+        if t <= now and not self.paused and self.user_away():
+            # Start it when the user is back, as long as that is within the grace window
+            self.scheduler.schedule_in(f'session:{session.name}', self.IDLE_POLL_SECONDS,
+                                       functools.partial(self.on_session_due, session))
+            return
+        if t <= now:
+            if self.paused:
+                log_debug(f"Skipped {session.name} session - paused")
+            else:
+                log_debug(f"Starting {session.name} session for {day}")
+                self.on_session(session.name)
+            # Once per day, across restarts
+            self.settings.set(f'morning_evening.last_{session.name}', day.isoformat())
+            t, day = session.next_fire(now, day)
+        # Woken past the grace window (long suspend) lands here with the next day's slot
+        self.scheduler.schedule_in(f'session:{session.name}', max(0, t - now),
+                                   functools.partial(self.on_session_due, session))
+
+    def hold_until(self, t):
+        """Earliest time from `t` outside quiet hours (and busy events, when deferring)"""
+        calendars = (self.quiet, self.busy) if self.busy_mode == 'defer' else (self.quiet,)
+        for _ in range(10):  # A meeting may end inside quiet hours and vice versa
+            start = t
+            for cal in calendars:
+                t = cal.end_of(t)
+            if t == start:
+                break
+        return t
+
+    def on_reminder_due(self):
+        """Scheduler callback: show (or skip) the due reminder, then arm the next"""
+        now = self.scheduler.wall_clock()
+        if self.busy.refresh() and self.hold_until(now) > now:
+            # The calendar file gained an event covering now since this reminder was armed
+            self.arm()
+            return
+        due = self.engine.pop_due(now)
+        if not due:
+            self.arm()
+            return
+        # The earliest due stream is shown; others due at the same time are coalesced into it
+        due_at, stream = due[0]
+        # Firing a whole period late means the machine was asleep (or the
+        # clock jumped): count every slot of the stream that passed in the gap.
+        # Slots that fell in quiet hours, meetings or the min_gap after the
+        # last popup were held back, not missed.
+        if self.held_until is not None:
+            due_at = max(due_at, self.held_until)
+        if self.engine.last_popup is not None and self.engine.min_gap:
+            due_at = max(due_at, self.engine.last_popup + self.engine.min_gap)
+        missed = stream.missed_between(due_at, now)
+        if missed > 1:
+            log_debug(f"Reminder '{stream.name}' fired {now - due_at:.0f}s late: {missed} slots missed")
+        if not self.paused and (self.user_away() or self.deferred.held_count()):
+            # Nobody to show it to (or others are already waiting): hold it without
+            # picking content; everything held comes out as one popup on return
+            self.deferred.hold(stream, missed)
+            for _, s in due:
+                self.engine.advance(s, now, False)
+            log_debug(f"Reminder '{stream.name}' held: {self.deferred.held_count()} waiting for the user")
+            self.arm()
+            self.arm_deferred(keep_sooner=True)
+            return
+        try:
+            shown = self.show_due_reminder(stream, missed)
+        except Exception as e:
+            self.error_count += 1
+            error_msg = f"Reminder error ({self.error_count}/{self.max_errors}): {str(e)}"
+            self.on_error(error_msg)
+
+            if self.error_count >= self.max_errors:
+                # Too many errors - signal for restart
+                self.on_error("CRITICAL: Max errors reached, thread needs restart")
+                self.stop()
+                return
+
+            # Retry shortly to avoid rapid error loops
+            for t, s in due:
+                self.engine.push(s, t + self.ERROR_RETRY_DELAY)
+            self.scheduler.schedule_in('reminder', self.ERROR_RETRY_DELAY, self.on_reminder_due)
+            return
+
+        # Next slots count from now, so a long gap never causes a burst
+        for _, s in due:
+            self.engine.advance(s, now, shown and s is stream)
+        if shown:
+            self.engine.last_popup = now
+        self.arm()
+
+    def user_away(self):
+        return self.idle.is_away(self.settings.config.reminder.idle.threshold_minutes * 60)
+
+    def arm_deferred(self, delay=None, keep_sooner=False):
+        """Point the scheduler at the next snoozed / held reminder. With
+        `keep_sooner`, a pending check that comes first is left alone (it
+        re-arms when it runs), so a popup's gap or an idle poll survives."""
+        now = self.scheduler.wall_clock()
+        t = self.deferred.next_time(now)
+        if t is None:
+            self.scheduler.cancel('deferred')
+            return
+        if delay is None:
+            delay = max(0, t - now)
+        pending = self.scheduler.pending('deferred')
+        if keep_sooner and pending is not None and pending.deadline <= self.scheduler.clock() + delay:
+            return
+        self.scheduler.schedule_in('deferred', delay, self.on_deferred_due)
+
+    def on_deferred_due(self):
+        """Scheduler callback: show one deferred reminder if the user is here"""
+        now = self.scheduler.wall_clock()
+        if self.paused:
+            log_debug(f"Dropped {len(self.deferred)} deferred reminders - paused")
+            self.deferred.clear()
+            return
+        if self.user_away():
+            # No event tells us when input resumes: look again shortly, without rendering
+            self.arm_deferred(self.IDLE_POLL_SECONDS)
+            return
+        held = self.hold_until(now)
+        if held > now:
+            self.arm_deferred(held - now)
+            return
+        snoozed = self.deferred.pop_snoozed(now)
+        if snoozed is not None:
+            log_debug("Emitting snoozed reminder")
+            self.on_reminder(*snoozed)
+            shown = True
+        else:
+            coalesced = self.deferred.pop_held()
+            if coalesced is None:
+                self.arm_deferred()
+                return
+            stream, count = coalesced
+            log_debug(f"User is back: showing {count} held reminders as one")
+            shown = self.show_due_reminder(stream, count)
+            if shown:
+                self.engine.reanchor(stream, now)
+        if shown:
+            self.engine.last_popup = now
+            self.arm()  # The next slot counts from this popup
+        # Anything else deferred follows once this popup has had its time on screen
+        gap = self.settings.config.popup.duration_seconds + self.DEFERRED_GAP if shown else 0
+        self.arm_deferred(gap if self.deferred.next_time(now) == now else None)
+
+    def snooze(self, data, is_surah, minutes):
+        """Bring a popup back `minutes` from now (any thread)"""
+        self.scheduler.schedule_in(f'snooze:{next(self._snooze_seq)}', 0,
+                                   functools.partial(self.queue_snooze, data, is_surah, minutes))
+
+    def queue_snooze(self, data, is_surah, minutes):
+        self.deferred.snooze(self.scheduler.wall_clock() + minutes * 60, data, is_surah)
+        log_debug(f"Reminder snoozed for {minutes} minutes")
+        self.arm_deferred(keep_sooner=True)
+
+    def on_clock_jump(self, skew):
+        """Scheduler callback: wall time moved `skew` seconds more than monotonic time"""
+        if skew > 0:
+            # Suspend on a monotonic clock that stops while asleep, or the clock was
+            # set forward: that time really passed, and the wall-time schedule
+            # already accounts for it
+            log_debug(f"Wall clock jumped {skew:.0f}s ahead of monotonic time (suspend/resume or clock change)")
+            self.arm()
+            self.arm_sessions()
+            self.arm_deferred()
+        else:
+            # Clock set back: keep interval streams' spacing instead of stretching it
+            log_debug(f"Wall clock moved back {-skew:.0f}s; shifting interval anchors")
+            self.rebuild_engine(shift=skew)
+
+    def build_digest(self, stream, missed):
+        """One popup standing in for several reminders missed while away"""
+        texts = []
+        for _ in range(self.DIGEST_SIZE * 2):
+            text = self.settings.get_random_thikr(stream.category, stream.ids).get('text', '')
+            if text and text not in texts:
+                texts.append(text)
+            if len(texts) >= min(missed, self.DIGEST_SIZE):
+                break
+        return {'text': '\n'.join(texts), 'virtue': f"فاتك {missed} من التذكيرات أثناء غيابك",
+                'missed': missed}
+
+    def show_due_reminder(self, stream, missed=1):
+        """Emit the popup for `stream` unless paused / quiet; True if shown"""
+        # One consistent snapshot per reminder; the GUI thread may publish
+        # a new one at any time without affecting this pass
+        cfg = self.settings.snapshot().config
+        paused = self.paused
+        now = self.scheduler.wall_clock()
+        quiet = self.quiet.contains(now)
+        busy = self.busy_mode == 'suppress' and self.busy.contains(now)
+
+        log_debug(f"Reminder '{stream.name}' due: paused={paused}, quiet={quiet}, missed={missed}")
+        self.first_run = False
+
+        if paused:
+            log_debug("Skipped reminder - paused")
+            return False
+        if quiet:
+            log_debug("Skipped reminder - quiet time")
+            return False
+        if busy:
+            log_debug("Skipped reminder - busy calendar event")
+            return False
+
+        if missed > 1 and cfg.reminder.catch_up == 'drop':
+            log_debug(f"Dropped {missed} missed reminders (catch_up=drop)")
+            return False
+        if stream.source == 'surah':
+            surah = self.settings.get_random_surah()
+            if not surah:
+                return False
+            log_debug(f"Emitting surah reminder: {surah.get('name', '')}")
+            self.on_reminder(surah, True)
+            if stream.name == 'surah':
+                self.settings.set('surah_reminder.last_shown', get_now(cfg.timezone, self.scheduler.wall_clock).isoformat())
+        elif missed > 1 and cfg.reminder.catch_up == 'digest':
+            log_debug(f"Emitting digest of {missed} missed reminders")
+            self.on_reminder(self.build_digest(stream, missed), False)
+        else:
+            thikr = self.settings.get_random_thikr(stream.category, stream.ids)
+            log_debug(f"Emitting thikr reminder: {thikr.get('text', '')[:30]}...")
+            self.on_reminder(thikr, False)
+        self.error_count = 0
+        return True
+
+    def upcoming(self, n=5):
+        """The next `n` reminders as [(epoch seconds, stream)] (any thread)"""
+        engine = self.engine
+        if engine is None:
+            return []
+        # Reminders held back by quiet hours / a meeting all come out as one popup when it ends
+        result = []
+        for t, stream in engine.upcoming(n, self.scheduler.wall_clock()):
+            t = self.hold_until(t)
+            if not result or result[-1][0] != t:
+                result.append((t, stream))
+        return result
+
+    def stop(self):
+        self.running = False
+        self.scheduler.stop()
+
+    def rearm(self):
+        """Recompile the streams from the current settings (any thread). Interval
+        streams count from their last reminder, so a shorter interval that has
+        already elapsed fires right away."""
+        self.scheduler.schedule_in('rearm', 0, self.rebuild_engine)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def reset_for_restart(self):
+        """Reset state for thread restart"""
+        self.running = True
+        self.paused = False
+        self.error_count = 0
+        self.first_run = False  # Don't show immediate reminder on restart
+        self.scheduler = Scheduler(self.scheduler.clock, self.scheduler.wall_clock,
+                                   on_clock_jump=self.on_clock_jump)
+        self.engine = None
+        self.quiet = None
+        self.held_until = None
+        self.sessions = []
+        self.deferred = DeferralQueue()
@@ -0,0 +1,763 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذِكْر - المُجدوِل
+Thikr scheduler - a priority queue of timed events driven by one condition wait.
+
+The scheduler thread sleeps until the earliest deadline (or until woken by
+schedule()/cancel()/stop()), so an idle app costs one wakeup per due event
+instead of one per second. Like thikr_core, this module never imports PyQt6.
+
+Deadlines are on the monotonic clock, which is immune to wall-clock changes
+but, depending on the platform, may or may not advance while the machine is
+suspended. The scheduler therefore also cross-checks wall time: when the two
+clocks drift apart by more than CLOCK_JUMP_THRESHOLD (suspend/resume on a
+clock that pauses, or the user/NTP changing the time) it reports the skew.
+"""
+
+import bisect
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta
+
+from thikr_core import WEEKDAYS, PRAYER_NAMES
+
+CLOCK_JUMP_THRESHOLD = 60   # seconds of wall/monotonic drift treated as a jump
+CLOCK_CHECK_INTERVAL = 300  # longest sleep while jumps are being watched for
+
+
+class ScheduledEvent:
+    """A pending callback; `name` identifies it for replace/cancel"""
+    __slots__ = ('deadline', 'name', 'callback', 'cancelled')
+
+    def __init__(self, deadline, name, callback):
+        self.deadline = deadline
+        self.name = name
+        self.callback = callback
+        self.cancelled = False
+
+    def __repr__(self):
+        return f"ScheduledEvent({self.name!r}, deadline={self.deadline:.3f})"
+
+
+class Scheduler:
+    """Min-heap of (deadline, seq, event) on a monotonic clock.
+
+    run() executes due callbacks on the calling thread, outside the lock,
+    so callbacks may schedule further events. Scheduling an event under a
+    name that is already pending replaces it atomically (lazy deletion:
+    the old heap entry is skipped when it surfaces), which is how a
+    reminder is re-armed from another thread without races.
+    """
+
+    def __init__(self, clock=time.monotonic, wall_clock=time.time, on_clock_jump=None,
+                 max_sleep=CLOCK_CHECK_INTERVAL):
+        self.clock = clock
+        self.wall_clock = wall_clock
+        # on_clock_jump(skew): wall time advanced `skew` seconds more (or, if
+        # negative, less) than monotonic time since the previous wakeup
+        self.on_clock_jump = on_clock_jump
+        self.max_sleep = max_sleep
+        self._mono_ref = clock()
+        self._wall_ref = wall_clock()
+        self._heap = []
+        self._pending = {}  # name -> ScheduledEvent
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        # Times run() woke up (deadline reached or notified); the idle cost metric
+        self.wakeups = 0
+
+    def schedule(self, name, deadline, callback):
+        """Run `callback()` at monotonic time `deadline`, replacing any pending
+        event called `name`. Returns the ScheduledEvent."""
+        event = ScheduledEvent(deadline, name, callback)
+        with self._cond:
+            old = self._pending.get(name)
+            if old is not None:
+                old.cancelled = True
+            self._pending[name] = event
+            heapq.heappush(self._heap, (deadline, next(self._seq), event))
+            # Only an earlier head needs the sleeper to recompute its timeout
+            if self._heap[0][2] is event:
+                self._cond.notify()
+        return event
+
+    def schedule_in(self, name, delay, callback):
+        return self.schedule(name, self.clock() + delay, callback)
+
+    def cancel(self, name):
+        """Drop the pending event called `name`; True if there was one"""
+        with self._cond:
+            event = self._pending.pop(name, None)
+            if event is None:
+                return False
+            event.cancelled = True
+            return True
+
+    def pending(self, name):
+        """The pending event called `name`, or None"""
+        with self._cond:
+            return self._pending.get(name)
+
+    def next_deadline(self):
+        with self._cond:
+            self._discard_cancelled()
+            return self._heap[0][0] if self._heap else None
+
+    def _discard_cancelled(self):
+        heap = self._heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    @property
+    def stopped(self):
+        return self._stopped
+
+    def _clock_skew(self):
+        """Wall-minus-monotonic drift since the last check, if it is a jump"""
+        mono, wall = self.clock(), self.wall_clock()
+        skew = (wall - self._wall_ref) - (mono - self._mono_ref)
+        self._mono_ref, self._wall_ref = mono, wall
+        if self.on_clock_jump is None or abs(skew) < CLOCK_JUMP_THRESHOLD:
+            return None
+        return skew
+
+    def _next(self):
+        """Block until an event is due or a clock jump is seen: (event, skew).
+        Returns (None, None) once stopped."""
+        with self._cond:
+            while not self._stopped:
+                self._discard_cancelled()
+                timeout = None
+                if self._heap:
+                    timeout = self._heap[0][0] - self.clock()
+                    if timeout <= 0:
+                        return self._pop_head(), None
+                if self.on_clock_jump is not None:
+                    timeout = self.max_sleep if timeout is None else min(timeout, self.max_sleep)
+                self._cond.wait(timeout)
+                self.wakeups += 1
+                skew = self._clock_skew()
+                if skew is not None:
+                    return None, skew
+            return None, None
+
+    def run(self):
+        """Dispatch events until stop(); sleeps until the next deadline"""
+        while True:
+            event, skew = self._next()
+            if skew is not None:
+                self.on_clock_jump(skew)
+            elif event is not None:
+                event.callback()
+            else:
+                return
+
+    def _pop_head(self):
+        """Remove the (live, due) head event; caller holds the lock"""
+        _, _, event = heapq.heappop(self._heap)
+        if self._pending.get(event.name) is event:
+            del self._pending[event.name]
+        return event
+
+    def run_pending(self):
+        """Dispatch every event already due, without waiting: one wakeup of
+        run() for a clock that is moved by hand (thikr_sim). Looks for a
+        clock jump first, as a real wakeup does. Returns the callbacks run."""
+        self.wakeups += 1
+        skew = self._clock_skew()
+        if skew is not None:
+            self.on_clock_jump(skew)
+        count = 0
+        while True:
+            with self._cond:
+                self._discard_cancelled()
+                if self._stopped or not self._heap or self._heap[0][0] > self.clock():
+                    return count
+                event = self._pop_head()
+            event.callback()
+            count += 1
+
+
+# ============================================
+# Housekeeping (periodic jobs on one timer)
+# ============================================
+
+class PeriodicTasks:
+    """Periodic jobs that share one timer instead of one timer each.
+
+    A job may run anywhere in the last `slack` seconds before it is due,
+    so one tick runs every job inside that window and jobs with different
+    periods fold into as few wakeups as possible. next_tick() also slides
+    the tick onto a wakeup that happens anyway (the reminder scheduler's
+    next deadline) when that falls inside the window. Times are on the
+    monotonic clock; the owner arms its own (GUI) timer.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._jobs = {}  # name -> [period, slack, callback, next due]
+        self.ticks = 0
+
+    def add(self, name, period, callback, first=None, slack=None):
+        """Run `callback()` every `period` seconds, the first time after `first`"""
+        slack = period / 4 if slack is None else slack
+        due = self.clock() + (period if first is None else first)
+        self._jobs[name] = [period, slack, callback, due]
+
+    def set_period(self, name, period, slack=None):
+        job = self._jobs[name]
+        job[3] += period - job[0]
+        job[0], job[1] = period, period / 4 if slack is None else slack
+
+    def next_tick(self, align=None):
+        """When to tick next: the earliest due job, moved earlier onto `align`
+        when every job that would run then is inside its window"""
+        if not self._jobs:
+            return None
+        t = min(job[3] for job in self._jobs.values())
+        if align is not None and self.clock() <= align <= t:
+            if all(due - slack <= align for _, slack, _, due in self._jobs.values() if due <= t):
+                return align
+        return t
+
+    def run_due(self):
+        """Run every job due (or within its slack); returns their names"""
+        self.ticks += 1
+        now = self.clock()
+        ran = []
+        for name, job in list(self._jobs.items()):
+            period, slack, callback, due = job
+            if due - slack <= now:
+                job[3] = now + period
+                callback()
+                ran.append(name)
+        return ran
+
+
+# ============================================
+# Reminder streams (rule engine)
+# ============================================
+
+MAX_MISSED_COUNT = 10000  # cap when counting slots missed during a long gap
+
+
+class ReminderStream:
+    """One compiled reminder rule: when it fires and what it shows.
+
+    Times are wall-clock epoch seconds. An 'interval' stream fires `period`
+    seconds after its anchor (its last popup); a 'schedule' stream fires at
+    fixed local times on the chosen weekdays; a 'prayer' stream fires
+    `offset` seconds after each of `prayer_names` in the `prayers` table
+    (a thikr_prayer.PrayerTimes). `retry` (if set) is how soon
+    an interval stream tries again after a skipped slot, for streams that
+    are "due since" rather than periodic (the surah reminder). When several
+    streams are due together the lowest `priority` is shown.
+    """
+    __slots__ = ('name', 'kind', 'period', 'anchor', 'weekdays', 'times', 'tz', 'prayers',
+                 'prayer_names', 'offset', 'source', 'category', 'ids', 'retry', 'not_before',
+                 'priority')
+
+    def __init__(self, name, kind='interval', period=None, anchor=None, weekdays=None,
+                 times=(), tz=None, prayers=None, prayer_names=PRAYER_NAMES, offset=0,
+                 source='athkar', category='', ids=(), retry=None, not_before=None, priority=0):
+        self.name = name
+        self.kind = kind
+        self.period = period
+        self.anchor = anchor
+        self.weekdays = weekdays  # set of date.weekday() values; None = every day
+        self.times = tuple(sorted(times))
+        self.tz = tz
+        self.prayers = prayers
+        self.prayer_names = tuple(prayer_names)
+        self.offset = offset
+        self.source = source
+        self.category = category
+        self.ids = frozenset(ids)
+        self.retry = retry
+        self.not_before = not_before
+        self.priority = priority
+
+    def __repr__(self):
+        return f"ReminderStream({self.name!r}, {self.kind})"
+
+    def first_fire(self, now):
+        if self.kind == 'interval':
+            t = now if self.anchor is None else self.anchor + self.period
+        else:
+            t = self.next_after(now)
+        if self.not_before is not None:
+            t = max(t, self.not_before)
+        return t
+
+    def next_after(self, t):
+        """Next fire strictly after `t` (schedule streams: next matching day/time)"""
+        if self.kind == 'interval':
+            return t + self.period
+        if self.kind == 'prayer':
+            return self._next_prayer_after(t)
+        local = datetime.fromtimestamp(t, self.tz)
+        for offset in range(8):
+            day = local.date() + timedelta(days=offset)
+            if self.weekdays is not None and day.weekday() not in self.weekdays:
+                continue
+            for at in self.times:
+                candidate = datetime.combine(day, at, tzinfo=self.tz).timestamp()
+                if candidate > t:
+                    return candidate
+        return None  # No weekdays / times: never fires
+
+    def _next_prayer_after(self, t):
+        today = datetime.fromtimestamp(t, self.tz).date()
+        # From yesterday: a late offset after Isha can fall past midnight
+        for offset in range(-1, 3):
+            times = self.prayers.prayer_times_on(today + timedelta(days=offset))
+            candidates = [times[name] + self.offset for name in self.prayer_names
+                          if times[name] is not None and times[name] + self.offset > t]
+            if candidates:
+                return min(candidates)
+        return None  # No such prayer for days (polar regions)
+
+    def following(self, now, shown):
+        """Next fire after a slot handled at `now` (interval streams count from it)"""
+        if self.kind != 'interval':
+            return self.next_after(now)
+        if shown or self.retry is None:
+            return now + self.period
+        return now + self.retry
+
+    def fires(self, start):
+        """Fire times from `start` on (lazy; used to list upcoming reminders)"""
+        t = start
+        while t is not None:
+            yield t
+            t = self.next_after(t)
+
+    def missed_between(self, due, now):
+        """How many of this stream's slots fell in [due, now]"""
+        count = 0
+        for t in self.fires(due):
+            if t > now or count >= MAX_MISSED_COUNT:
+                break
+            count += 1
+        return max(count, 1)
+
+
+class RuleEngine:
+    """Next-fire index over all reminder streams.
+
+    Streams sit in a min-heap keyed by their next fire time, so the next
+    reminder is heap[0] and rescheduling a stream is O(log n) however many
+    rules there are. min_gap spaces out consecutive popups: streams that
+    come due inside the gap are coalesced into the popup that ends it.
+    """
+
+    def __init__(self, streams, now, min_gap=0, last_popup=None):
+        self.min_gap = min_gap
+        self.last_popup = last_popup
+        self._seq = itertools.count()
+        self._heap = []
+        for stream in streams:
+            t = stream.first_fire(now)
+            if t is not None:
+                self._heap.append((t, next(self._seq), stream))
+        heapq.heapify(self._heap)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def next_time(self):
+        """When the next popup is due (after the min gap), or None"""
+        if not self._heap:
+            return None
+        t = self._heap[0][0]
+        if self.last_popup is not None and self.min_gap:
+            t = max(t, self.last_popup + self.min_gap)
+        return t
+
+    def pop_due(self, now):
+        """Remove and return the streams due by `now` as [(due_time, stream)];
+        the first one is the stream to show (lowest priority, then earliest)"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            t, seq, stream = heapq.heappop(self._heap)
+            due.append((stream.priority, t, seq, stream))
+        due.sort(key=lambda d: d[:3])
+        return [(t, stream) for _, t, _, stream in due]
+
+    def push(self, stream, t):
+        if t is not None:
+            heapq.heappush(self._heap, (t, next(self._seq), stream))
+
+    def advance(self, stream, now, shown):
+        """Put a popped stream back with its next fire after `now`"""
+        if stream.kind == 'interval' and (shown or stream.retry is None):
+            stream.anchor = now
+        self.push(stream, stream.following(now, shown))
+
+    def reanchor(self, stream, now):
+        """An interval stream was just shown outside the engine (a deferred
+        popup): count its next slot from `now`, as if it had fired then"""
+        if stream.kind != 'interval':
+            return
+        for i, (_, _, s) in enumerate(self._heap):
+            if s is stream:
+                self._heap[i] = self._heap[-1]
+                self._heap.pop()
+                heapq.heapify(self._heap)
+                self.advance(stream, now, True)
+                return
+
+    def anchors(self):
+        """{name: anchor} of the interval streams, to carry over a rebuild"""
+        return {s.name: s.anchor for _, _, s in self._heap
+                if s.kind == 'interval' and s.anchor is not None}
+
+    def upcoming(self, n, now):
+        """The next `n` popups as [(time, stream)], assuming each is shown.
+        Replays the heap on a copy (O(n log streams)); nothing is mutated
+        and no timers are involved."""
+        heap = list(self._heap)
+        out = []
+        last = self.last_popup
+        while heap and len(out) < n:
+            t = max(heap[0][0], now)
+            if last is not None and self.min_gap:
+                t = max(t, last + self.min_gap)
+            due = []
+            while heap and heap[0][0] <= t:
+                due_at, seq, stream = heapq.heappop(heap)
+                due.append((stream.priority, due_at, seq, stream))
+            due.sort(key=lambda d: d[:3])
+            shown = due[0][3]
+            out.append((t, shown))
+            for _, _, seq, stream in due:
+                following = stream.following(t, stream is shown)
+                if following is not None:
+                    heapq.heappush(heap, (following, seq, stream))
+            last = t
+        return out
+
+
+def compile_streams(cfg, tz, now, anchors=None, first_delay=None, prayers=None):
+    """Build the ReminderStreams for an AppConfig.
+
+    'main' is the global interval reminder and 'surah' the surah reminder;
+    each enabled item of reminder.streams becomes one more stream. `anchors`
+    carries the last popup time of interval streams across recompiles;
+    `first_delay` makes the main stream fire that soon after start-up.
+    Prayer streams need `prayers` (PrayerTimes) and are left out without it.
+    """
+    anchors = anchors or {}
+    reminder = cfg.reminder
+    if not reminder.enabled:
+        return []  # Master switch for every stream
+    main_period = reminder.interval_minutes * 60
+    anchor = anchors.get('main')
+    if anchor is None and first_delay is not None:
+        anchor = now - main_period + first_delay
+    # The global reminder is the filler: any other stream due at the same time wins
+    streams = [ReminderStream('main', period=main_period, anchor=anchor, priority=1)]
+    surah = cfg.surah_reminder
+    if surah.enabled:
+        last = surah.last_shown
+        if last is not None and last.tzinfo is None:
+            last = last.replace(tzinfo=tz)
+        # Due `interval_days` after the last one, taking the place of a regular
+        # reminder; never before the second one, so the first popup is a thikr
+        streams.append(ReminderStream(
+            'surah', period=surah.interval_days * 86400,
+            anchor=last.timestamp() if last is not None else None,
+            source='surah', retry=main_period,
+            not_before=now + (first_delay or 0) + main_period))
+    for i, rule in enumerate(reminder.streams):
+        if not rule.enabled:
+            continue
+        name = rule.name or f"stream{i + 1}"
+        if rule.kind == 'schedule':
+            if not rule.times:
+                continue
+            weekdays = {WEEKDAYS.index(d) for d in rule.days} if rule.days else None
+            stream = ReminderStream(name, kind='schedule', weekdays=weekdays, times=rule.times, tz=tz)
+        elif rule.kind == 'prayer':
+            if prayers is None:
+                continue  # No location configured yet
+            stream = ReminderStream(name, kind='prayer', tz=tz, prayers=prayers,
+                                    prayer_names=rule.prayers or PRAYER_NAMES,
+                                    offset=rule.offset_minutes * 60)
+        else:
+            stream = ReminderStream(name, period=rule.interval_minutes * 60,
+                                    anchor=anchors.get(name, now))
+        stream.source = rule.source
+        stream.category = rule.category
+        stream.ids = frozenset(rule.ids)
+        streams.append(stream)
+    return streams
+
+
+# ============================================
+# Deferred reminders (snoozed, or due while away)
+# ============================================
+
+class DeferralQueue:
+    """Reminders put off for later.
+
+    Snoozed popups wait in a min-heap keyed by when they come back.
+    Reminders that came due while nobody was at the computer are only
+    counted per stream - no content is picked for them - and come out as
+    one coalesced reminder (stream, count) once the user is back.
+    """
+
+    def __init__(self):
+        self._seq = itertools.count()
+        self._snoozed = []  # heap of (time, seq, data, is_surah)
+        self._held = {}     # stream name -> [stream, count], in the order they came due
+
+    def __len__(self):
+        return len(self._snoozed) + len(self._held)
+
+    def snooze(self, t, data, is_surah):
+        heapq.heappush(self._snoozed, (t, next(self._seq), data, is_surah))
+
+    def hold(self, stream, count=1):
+        entry = self._held.setdefault(stream.name, [stream, 0])
+        entry[1] += count
+
+    def held_count(self):
+        return sum(count for _, count in self._held.values())
+
+    def next_time(self, now):
+        """When something can next be shown: now while reminders are held,
+        else the earliest snooze (None when empty)"""
+        if self._held:
+            return now
+        return self._snoozed[0][0] if self._snoozed else None
+
+    def pop_snoozed(self, now):
+        """The earliest snoozed (data, is_surah) due by `now`, or None"""
+        if self._snoozed and self._snoozed[0][0] <= now:
+            _, _, data, is_surah = heapq.heappop(self._snoozed)
+            return data, is_surah
+        return None
+
+    def pop_held(self):
+        """(first stream held, total reminders held) and empty the hold, or None"""
+        if not self._held:
+            return None
+        count = self.held_count()
+        stream = next(iter(self._held.values()))[0]
+        self._held.clear()
+        return stream, count
+
+    def clear(self):
+        self._snoozed.clear()
+        self._held.clear()
+
+
+# ============================================
+# Daily athkar sessions (morning / evening)
+# ============================================
+
+class DailySession:
+    """A once-a-day session at a local time (morning / evening athkar).
+
+    A day's slot that passed while the machine was off or asleep still
+    fires on the next wake, as long as that is within `grace` seconds of
+    it; later than that, the day is skipped. `last_day` (the date of the
+    last slot that fired) is what makes it once per day across restarts.
+    """
+    __slots__ = ('name', 'at', 'grace', 'tz')
+
+    def __init__(self, name, at, grace, tz):
+        self.name = name
+        self.at = at
+        self.grace = grace
+        self.tz = tz
+
+    def __repr__(self):
+        return f"DailySession({self.name!r}, {self.at})"
+
+    def slot(self, day):
+        return datetime.combine(day, self.at, tzinfo=self.tz).timestamp()
+
+    def next_fire(self, now, last_day=None):
+        """(fire time, slot date) of the next slot to run; a time <= now means run it now"""
+        today = datetime.fromtimestamp(now, self.tz).date()
+        # Yesterday too: a late evening slot's grace may run past midnight
+        for offset in range(-1, 2):
+            day = today + timedelta(days=offset)
+            if last_day is not None and day <= last_day:
+                continue
+            t = self.slot(day)
+            if now < t:
+                return t, day
+            if now <= t + self.grace:
+                return now, day
+        day = today + timedelta(days=2)
+        return self.slot(day), day
+
+
+def compile_sessions(cfg, tz):
+    """DailySessions for the morning_evening settings ([] when switched off)"""
+    me = cfg.morning_evening
+    if not me.enabled:
+        return []
+    grace = me.grace_minutes * 60
+    return [DailySession('morning', me.morning_time, grace, tz),
+            DailySession('evening', me.evening_time, grace, tz)]
+
+
+# ============================================
+# Interval calendars (quiet hours, busy events)
+# ============================================
+
+CALENDAR_HORIZON_DAYS = 14  # days of periods expanded per (re)build
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _subtract_intervals(intervals, holes):
+    """Disjoint sorted `intervals` minus disjoint sorted `holes`"""
+    out = []
+    j = 0
+    for start, end in intervals:
+        while j < len(holes) and holes[j][1] <= start:
+            j += 1
+        k = j
+        while k < len(holes) and holes[k][0] < end:
+            if holes[k][0] > start:
+                out.append([start, holes[k][0]])
+            start = max(start, holes[k][1])
+            k += 1
+        if start < end:
+            out.append([start, end])
+    return out
+
+
+class IntervalCalendar:
+    """Periods compiled into sorted, disjoint [start, end) intervals.
+
+    Subclasses expand their rules over a rolling horizon in _expand();
+    contains() and end_of() are then a bisect over the interval starts, and
+    the horizon is rebuilt lazily when a query falls outside it.
+    """
+
+    def __init__(self):
+        # (lo, hi, starts, ends); replaced as a whole so readers on other threads
+        # never see a half-built index
+        self._index = (0.0, 0.0, (), ())
+
+    def _expand(self, t):
+        """(lo, hi, merged intervals) for a horizon [lo, hi) containing `t`"""
+        raise NotImplementedError
+
+    def invalidate(self):
+        self._index = (0.0, 0.0, (), ())
+
+    def _build(self, t):
+        lo, hi, intervals = self._expand(t)
+        self._index = (lo, hi, tuple(i[0] for i in intervals), tuple(i[1] for i in intervals))
+        return self._index
+
+    def _lookup(self, t):
+        """(interval end or None, horizon end) for the period containing `t`"""
+        index = self._index
+        if not index[0] <= t < index[1]:
+            index = self._build(t)
+        _, hi, starts, ends = index
+        i = bisect.bisect_right(starts, t) - 1
+        if i >= 0 and t < ends[i]:
+            return ends[i], hi
+        return None, hi
+
+    def contains(self, t):
+        if not self:
+            return False
+        return self._lookup(t)[0] is not None
+
+    def end_of(self, t):
+        """When the period containing `t` ends (`t` itself if none does)"""
+        if not self:
+            return t
+        for _ in range(CALENDAR_HORIZON_DAYS * 4):
+            end, hi = self._lookup(t)
+            if end is None:
+                return t
+            if end < hi:
+                return end
+            t = end  # Runs past the horizon: rebuild there and keep going
+        return t  # Covered for months on end; give up rather than spin
+
+
+class QuietCalendar(IntervalCalendar):
+    """Quiet hours: weekly windows plus dated exceptions, expanded in local
+    time so DST is handled by the timezone"""
+
+    def __init__(self, windows=(), exceptions=(), tz=None):
+        super().__init__()
+        # windows: [(weekdays or None, start, end)]
+        # exceptions: [(first_date, last_date, start, end, quiet)]
+        self.windows = tuple(windows)
+        self.exceptions = tuple(exceptions)
+        self.tz = tz
+
+    def __bool__(self):
+        return bool(self.windows or self.exceptions)
+
+    def _span(self, day, start, end, equal_is_whole_day=False):
+        """One occurrence [start, end) of a window beginning on `day` (epoch
+        seconds). start == end is the whole day for dated exceptions; for the
+        daily range and the weekly windows it keeps its old meaning, just
+        that minute (it never silenced a whole day)."""
+        t0 = datetime.combine(day, start, tzinfo=self.tz).timestamp()
+        if end == start and not equal_is_whole_day:
+            return [t0, t0 + 60]
+        end_day = day + timedelta(days=1) if end <= start else day
+        return [t0, datetime.combine(end_day, end, tzinfo=self.tz).timestamp()]
+
+    def _expand(self, t):
+        today = datetime.fromtimestamp(t, self.tz).date()
+        # Start a day early: yesterday's overnight window may still be running
+        first = today - timedelta(days=1)
+        days = [first + timedelta(days=i) for i in range(CALENDAR_HORIZON_DAYS + 1)]
+        quiet, loud = [], []
+        for weekdays, start, end in self.windows:
+            quiet.extend(self._span(day, start, end) for day in days
+                         if weekdays is None or day.weekday() in weekdays)
+        for first_date, last_date, start, end, is_quiet in self.exceptions:
+            target = quiet if is_quiet else loud
+            target.extend(self._span(day, start, end, equal_is_whole_day=True) for day in days
+                          if first_date <= day <= last_date)
+        lo = datetime.combine(today, datetime.min.time(), tzinfo=self.tz).timestamp()
+        hi = datetime.combine(days[-1], datetime.min.time(), tzinfo=self.tz).timestamp()
+        return lo, hi, _subtract_intervals(_merge_intervals(quiet), _merge_intervals(loud))
+
+
+def compile_quiet_calendar(quiet_cfg, tz):
+    """QuietCalendar for a QuietHoursConfig (empty when quiet hours are off)"""
+    if not quiet_cfg.enabled:
+        return QuietCalendar(tz=tz)
+    windows = [(None, quiet_cfg.start, quiet_cfg.end)]
+    for window in quiet_cfg.windows:
+        weekdays = {WEEKDAYS.index(d) for d in window.days} if window.days else None
+        windows.append((weekdays, window.start, window.end))
+    exceptions = [(exc.start_date, exc.end_date or exc.start_date, exc.start, exc.end, exc.quiet)
+                  for exc in quiet_cfg.exceptions if exc.start_date is not None]
+    return QuietCalendar(windows, exceptions, tz)
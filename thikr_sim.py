@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذِكْر - محاكاة الجدولة
+Thikr simulation - replay days (or a year) of reminder scheduling in seconds.
+
+The real ReminderService runs on a VirtualClock: instead of sleeping, the
+runner moves the clock straight to the next deadline (or scripted event)
+and dispatches what is due, so a year at a 30-minute interval is some
+20,000 steps. Suspends (wall time jumps while the monotonic clock stands
+still), time away from the keyboard and the daily counter rollover are
+all part of the replay, and the result is a list of TimelineEvents to
+print or assert on:
+
+    tz = get_app_timezone('UTC+3')
+    timeline = simulate(days=365, overrides={'reminder.interval_minutes': 30},
+                        suspends=[(datetime(2026, 3, 1, 22, 0, tzinfo=tz), 8 * 3600)])
+    sessions = [e for e in timeline if e.kind == 'session']
+
+Settings are a private snapshot and statistics an in-memory store, so the
+user's files are never touched. Like thikr_core, never imports PyQt6.
+"""
+
+import heapq
+import collections
+from datetime import datetime, time as dt_time
+
+import thikr_core
+from thikr_core import (
+    DEFAULT_SETTINGS, SettingsSnapshot, UserDataStore, get_app_timezone, get_now,
+)
+from thikr_idle import FakeIdleDetector
+from thikr_reminders import ReminderService
+
+SPIN_LIMIT = 1000  # Steps without the clock moving before the schedule counts as stuck
+
+# time: aware datetime in the app's time zone; detail depends on kind:
+#   reminder  'thikr' / 'surah' / 'digest:<missed>'
+#   counter   (daily, total) after the popup was counted
+#   session   'morning' / 'evening'
+#   suspend / away   seconds;  back  None;  error  message
+TimelineEvent = collections.namedtuple('TimelineEvent', 'time kind detail')
+
+
+class VirtualClock:
+    """Wall (epoch seconds) and monotonic time that only move when told to"""
+
+    def __init__(self, start):
+        self.wall = float(start)
+        self.mono = 0.0
+
+    def time(self):
+        return self.wall
+
+    def monotonic(self):
+        return self.mono
+
+    def advance(self, seconds):
+        self.wall += seconds
+        self.mono += seconds
+
+    def suspend(self, seconds):
+        """Machine asleep: wall time passes, the monotonic clock does not"""
+        self.wall += seconds
+
+
+class SimulatedSettings:
+    """The part of SettingsManager the reminder service uses, over a private
+    snapshot and an in-memory statistics store"""
+
+    def __init__(self, tree, clock):
+        self._snapshot = SettingsSnapshot(tree)
+        self.clock = clock
+        self.store = UserDataStore(':memory:')
+
+    @property
+    def config(self):
+        return self._snapshot.config
+
+    def snapshot(self):
+        return self._snapshot
+
+    def get(self, path, default=None):
+        return self._snapshot.get(path, default)
+
+    def set(self, path, value):
+        self._snapshot = self._snapshot.assoc({path: value})
+
+    def get_random_thikr(self, category='', ids=()):
+        return {'text': category or 'thikr', 'virtue': ''}
+
+    def get_random_surah(self):
+        return {'name': 'surah', 'verses': [], 'virtue': ''}
+
+    def increment_counter(self):
+        today = get_now(self.config.timezone, self.clock).strftime("%Y-%m-%d")
+        return self.store.increment_counter(today)
+
+
+def _epoch(t):
+    return t.timestamp() if isinstance(t, datetime) else float(t)
+
+
+def simulate(tree=None, overrides=None, days=7, start=None, suspends=(), away=(), first_run=True):
+    """Replay `days` of scheduling from `start` (default: today's local
+    midnight) and return the timeline.
+
+    tree       full settings tree (default DEFAULT_SETTINGS), e.g. a
+               SettingsManager's snapshot().tree
+    overrides  {dotted path: value} applied on top of it
+    suspends   [(when, seconds)] the machine sleeps
+    away       [(when, seconds)] nobody touches the keyboard or mouse
+    """
+    snapshot = SettingsSnapshot(tree if tree is not None else DEFAULT_SETTINGS).assoc(overrides or {})
+    tz = get_app_timezone(snapshot.config.timezone)
+    if start is None:
+        start = datetime.combine(get_now(snapshot.config.timezone).date(), dt_time(0), tzinfo=tz)
+    clock = VirtualClock(_epoch(start))
+    settings = SimulatedSettings(snapshot.tree, clock.time)
+    idle = FakeIdleDetector(clock.time)
+    timeline = []
+
+    def record(kind, detail=None):
+        timeline.append(TimelineEvent(datetime.fromtimestamp(clock.wall, tz), kind, detail))
+
+    def on_reminder(data, is_surah):
+        record('reminder', 'surah' if is_surah else f"digest:{data['missed']}" if 'missed' in data else 'thikr')
+        # The app counts a popup once it was seen; the user is present when one is emitted
+        record('counter', settings.increment_counter())
+
+    service = ReminderService(settings, idle, on_reminder,
+                              on_session=lambda name: record('session', name),
+                              on_error=lambda message: record('error', message),
+                              clock=clock.monotonic, wall_clock=clock.time)
+    service.first_run = first_run
+    script = [(_epoch(t), 'suspend', seconds) for t, seconds in suspends]
+    script += [(_epoch(t), 'away', seconds) for t, seconds in away]
+    heapq.heapify(script)
+    end = clock.wall + days * 86400
+    back_at = None
+
+    # A year of debug lines would cost more than the simulation itself
+    debug_enabled, thikr_core.DEBUG_ENABLED = thikr_core.DEBUG_ENABLED, False
+    try:
+        service.start()
+        stuck = 0
+        while not service.scheduler.stopped:
+            deadline = service.scheduler.next_deadline()
+            candidates = [end]
+            if deadline is not None:
+                candidates.append(clock.wall + max(0, deadline - clock.mono))
+            if script:
+                candidates.append(script[0][0])
+            if back_at is not None:
+                candidates.append(back_at)
+            t = min(candidates)
+            stuck = stuck + 1 if t <= clock.wall else 0
+            if stuck > SPIN_LIMIT:
+                raise RuntimeError(f"Schedule stuck at {datetime.fromtimestamp(clock.wall, tz)}: "
+                                   f"{service.scheduler.next_deadline()!r}")
+            clock.advance(max(0, t - clock.wall))
+            if clock.wall >= end:
+                break
+            if back_at is not None and clock.wall >= back_at:
+                back_at = None
+                record('back')
+            while script and script[0][0] <= clock.wall:
+                _, kind, seconds = heapq.heappop(script)
+                record(kind, seconds)
+                if kind == 'suspend':
+                    clock.suspend(seconds)
+                else:
+                    idle.touch()  # The last input is when the user left
+                    back_at = clock.wall + seconds
+            if back_at is None:
+                idle.touch()
+            service.scheduler.run_pending()
+    finally:
+        thikr_core.DEBUG_ENABLED = debug_enabled
+        settings.store.close()
+    return timeline